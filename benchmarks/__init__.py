@@ -0,0 +1,130 @@
+"""
+Benchmarks of the analysis hot paths.
+
+The benchmarks run on synthetic ensembles of perturbed copies of the
+example complexes, so they need neither CNS nor a previous run.
+"""
+from pathlib import Path
+
+import numpy as np
+
+
+DATA_DIR = Path(Path(__file__).parent.parent, "examples", "data")
+
+COMPLEXES = {
+    "2oob": ("2oob.pdb",),
+    "1a2k": ("1a2k_r_u.pdb", "1a2k_l_u.pdb"),
+    }
+"""The PDB files of each complex, merged when making the ensembles."""
+
+ENSEMBLE_SIZES = (100, 1_000, 10_000)
+"""Ensemble sizes selectable with `--bench-sizes`."""
+
+
+def read_complex(name: str) -> tuple[list[str], np.ndarray]:
+    """
+    Read the atoms of an example complex.
+
+    Returns
+    -------
+    lines : list of str
+        The ATOM lines of all the files of the complex.
+    coords : np.ndarray
+        The (n_atoms, 3) coordinates of these atoms.
+    """
+    lines = [
+        line.rstrip("\n")
+        for fname in COMPLEXES[name]
+        for line in Path(DATA_DIR, fname).read_text().splitlines()
+        if line.startswith("ATOM")
+        ]
+    coords = np.array(
+        [(line[30:38], line[38:46], line[46:54]) for line in lines],
+        dtype=float,
+        )
+    return lines, coords
+
+
+def random_rotation(rng: np.random.Generator, max_angle: float) -> np.ndarray:
+    """Get a rotation matrix of a random axis by up to `max_angle` rad."""
+    axis = rng.normal(size=3)
+    axis /= np.linalg.norm(axis)
+    angle = rng.uniform(-max_angle, max_angle)
+    cross = np.array([
+        [0, -axis[2], axis[1]],
+        [axis[2], 0, -axis[0]],
+        [-axis[1], axis[0], 0],
+        ])
+    return (
+        np.eye(3)
+        + np.sin(angle) * cross
+        + (1 - np.cos(angle)) * cross @ cross
+        )
+
+
+def make_ensemble(
+        name: str,
+        nmodels: int,
+        dest: Path,
+        seed: int = 917,
+        noise: float = 0.3,
+        max_angle: float = 0.2,
+        max_shift: float = 2.0,
+        ) -> list[Path]:
+    """
+    Write an ensemble of perturbed copies of an example complex.
+
+    Each copy moves the last chain as a rigid body, mimicking docking
+    poses, and adds Gaussian noise to all coordinates.
+
+    Parameters
+    ----------
+    name : str
+        The complex, a key of :py:data:`COMPLEXES`.
+    nmodels : int
+        The number of models.
+    dest : pathlib.Path
+        The folder of the models, created if needed.
+    seed : int
+        Seed of the random generator, the ensembles are reproducible.
+    noise : float
+        Standard deviation of the noise, in Angstrom.
+    max_angle : float
+        Maximum rotation of the moving chain, in radians.
+    max_shift : float
+        Maximum translation of the moving chain, in Angstrom.
+
+    Returns
+    -------
+    list of pathlib.Path
+        The PDB files of the models.
+    """
+    lines, coords = read_complex(name)
+    chains = np.array([line[21] for line in lines])
+    moving = chains == chains[-1]
+    center = coords[moving].mean(axis=0)
+    # the fixed-width prefix and suffix of each line do not change
+    prefixes = [line[:30] for line in lines]
+    suffixes = [line[54:] for line in lines]
+
+    rng = np.random.default_rng(seed)
+    dest.mkdir(parents=True, exist_ok=True)
+    models: list[Path] = []
+    for idx in range(1, nmodels + 1):
+        new_coords = coords + rng.normal(scale=noise, size=coords.shape)
+        rotation = random_rotation(rng, max_angle)
+        shift = rng.uniform(-max_shift, max_shift, size=3)
+        new_coords[moving] = (
+            (new_coords[moving] - center) @ rotation.T + center + shift
+            )
+        model = Path(dest, f"model_{idx}.pdb")
+        model.write_text(
+            "".join(
+                f"{prefix}{x:8.3f}{y:8.3f}{z:8.3f}{suffix}\n"
+                for prefix, (x, y, z), suffix
+                in zip(prefixes, new_coords, suffixes)
+                )
+            + "END\n"
+            )
+        models.append(model)
+    return models
@@ -0,0 +1,212 @@
+"""Fixtures and reporting of the benchmarks."""
+import json
+import tempfile
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+
+from haddock.core.typing import Any, Callable
+from haddock.libs.libontology import PDBFile
+from haddock.libs.libtimer import get_usage, get_usage_since
+
+from . import COMPLEXES, ENSEMBLE_SIZES, make_ensemble
+
+
+MODELS_FOLDER = "0_models"
+"""Step folder of the synthetic models, in the run of each ensemble."""
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Add the options of the benchmarks."""
+    group = parser.getgroup("haddock3 benchmarks")
+    group.addoption(
+        "--bench-sizes",
+        default="100",
+        help=(
+            "Comma-separated ensemble sizes, among "
+            f"{', '.join(map(str, ENSEMBLE_SIZES))} (default: 100)."
+            ),
+        )
+    group.addoption(
+        "--bench-complexes",
+        default=",".join(COMPLEXES),
+        help="Comma-separated example complexes to perturb.",
+        )
+    group.addoption(
+        "--bench-rounds",
+        type=int,
+        default=1,
+        help="Timed rounds of each benchmark, the best one is reported.",
+        )
+    group.addoption(
+        "--bench-skip-memory",
+        action="store_true",
+        help="Do not run the extra round tracing the memory allocations.",
+        )
+    group.addoption(
+        "--bench-json",
+        default=None,
+        help="Save the results to this JSON file.",
+        )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """Prepare the list of results."""
+    config._bench_results = []  # type: ignore
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    """Parametrize the benchmarks by complex and ensemble size."""
+    if "ensemble" not in metafunc.fixturenames:
+        return
+    config = metafunc.config
+    sizes = [int(s) for s in config.getoption("bench_sizes").split(",")]
+    complexes = config.getoption("bench_complexes").split(",")
+    for size in sizes:
+        if size not in ENSEMBLE_SIZES:
+            raise pytest.UsageError(f"Invalid ensemble size: {size}")
+    for name in complexes:
+        if name not in COMPLEXES:
+            raise pytest.UsageError(f"Invalid complex: {name}")
+    params = [(name, size) for size in sizes for name in complexes]
+    metafunc.parametrize(
+        "ensemble",
+        params,
+        ids=[f"{name}-{size}" for name, size in params],
+        indirect=True,
+        )
+
+
+class Ensemble:
+    """A run folder with synthetic models."""
+
+    def __init__(self, name: str, size: int, run_dir: Path) -> None:
+        self.name = name
+        self.size = size
+        self.run_dir = run_dir
+        models_dir = Path(run_dir, MODELS_FOLDER)
+        if not models_dir.exists():
+            make_ensemble(name, size, models_dir)
+        self.models = [
+            PDBFile(f"model_{idx}.pdb", path=models_dir)
+            for idx in range(1, size + 1)
+            ]
+
+
+@pytest.fixture(scope="session")
+def ensembles_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Provide the folder of the ensembles, shared by all benchmarks."""
+    return tmp_path_factory.mktemp("ensembles")
+
+
+@pytest.fixture
+def ensemble(
+        request: pytest.FixtureRequest,
+        ensembles_dir: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        ) -> Ensemble:
+    """
+    Provide an ensemble, in a fresh step folder of its run.
+
+    Ensembles are generated once and shared by all benchmarks.
+    """
+    name, size = request.param
+    ensemble = Ensemble(name, size, Path(ensembles_dir, f"{name}_{size}"))
+    step_dir = tempfile.mkdtemp(
+        prefix=f"{request.node.originalname}_",
+        dir=ensemble.run_dir,
+        )
+    monkeypatch.chdir(step_dir)
+    return ensemble
+
+
+@pytest.fixture
+def bench(request: pytest.FixtureRequest) -> Callable[..., Any]:
+    """
+    Provide a function benchmarking a call.
+
+    `bench(func, *args, items=n, label=None, **kwargs)` calls
+    `func(*args, **kwargs)`, records its wall and CPU time, the
+    throughput in `items` per second and its memory usage, and returns
+    the value of the call.
+    """
+    config = request.config
+    rounds = config.getoption("bench_rounds")
+    trace_memory = not config.getoption("bench_skip_memory")
+    ensemble = request.node.funcargs.get("ensemble")
+
+    def _bench(
+            func: Callable[..., Any],
+            *args: Any,
+            items: int,
+            label: str = "",
+            **kwargs: Any,
+            ) -> Any:
+        timings = []
+        for _ in range(rounds):
+            start = get_usage()
+            wall = perf_counter()
+            result = func(*args, **kwargs)
+            wall = perf_counter() - wall
+            timings.append((wall, get_usage_since(start)["cpu"]))
+        wall, cpu = min(timings)
+
+        peak = None
+        if trace_memory:
+            tracemalloc.start()
+            func(*args, **kwargs)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        config._bench_results.append({  # type: ignore
+            "benchmark": request.node.originalname + (
+                f"[{label}]" if label else ""
+                ),
+            "complex": ensemble.name if ensemble else None,
+            "size": ensemble.size if ensemble else None,
+            "items": items,
+            "wall": wall,
+            "cpu": cpu,
+            "throughput": items / wall if wall else None,
+            "peak_memory": peak,
+            "max_rss": get_usage()["max_rss"],
+            })
+        return result
+
+    return _bench
+
+
+def _mb(value: Any) -> str:
+    return "-" if value is None else f"{value / 2**20:.1f}"
+
+
+def pytest_terminal_summary(
+        terminalreporter: Any,
+        config: pytest.Config,
+        ) -> None:
+    """Report the results and save them if requested."""
+    results = config._bench_results  # type: ignore
+    if not results:
+        return
+    header = (
+        f"{'benchmark':<36} {'complex':<8} {'size':>6} {'items':>9} "
+        f"{'wall (s)':>9} {'cpu (s)':>9} {'items/s':>11} "
+        f"{'peak (MB)':>10} {'rss (MB)':>9}"
+        )
+    terminalreporter.section("haddock3 benchmarks")
+    terminalreporter.write_line(header)
+    for res in results:
+        throughput = res["throughput"]
+        terminalreporter.write_line(
+            f"{res['benchmark']:<36} {res['complex'] or '-':<8} "
+            f"{res['size'] or '-':>6} {res['items']:>9} "
+            f"{res['wall']:>9.3f} {res['cpu']:>9.3f} "
+            f"{'-' if throughput is None else f'{throughput:.1f}':>11} "
+            f"{_mb(res['peak_memory']):>10} {_mb(res['max_rss']):>9}"
+            )
+    json_f = config.getoption("bench_json")
+    if json_f:
+        Path(json_f).write_text(json.dumps(results, indent=2))
+        terminalreporter.write_line(f"Results saved to {json_f}")
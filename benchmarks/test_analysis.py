@@ -0,0 +1,164 @@
+"""Benchmark the analysis modules and their library functions."""
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from haddock.libs.libalign import get_atoms, load_coords
+from haddock.libs.libclust import create_matrix_file, open_matrix_file
+from haddock.libs.libontology import RMSDFile
+from haddock.modules.analysis.caprieval.capri import load_contacts
+from haddock.modules.analysis.clustrmsd.clustrmsd import (
+    get_clusters,
+    get_dendrogram,
+    read_matrix,
+    )
+from haddock.modules.analysis.rmsdmatrix import DEFAULT_CONFIG as rmsd_pars
+from haddock.modules.analysis.rmsdmatrix import HaddockModule as RMSDModule
+from haddock.modules.analysis.rmsdmatrix.rmsd import RMSD, load_coords_array
+
+
+def _all_atoms(models):
+    atoms = {}
+    for model in models:
+        atoms.update(get_atoms(model))
+    return atoms
+
+
+def test_load_coords(ensemble, bench):
+    """Benchmark parsing the coordinates of each model."""
+    atoms = _all_atoms(ensemble.models[:1])
+    coords = bench(
+        lambda: [load_coords(model, atoms) for model in ensemble.models],
+        items=ensemble.size,
+        )
+    assert len(coords) == ensemble.size
+
+
+def test_load_coords_array(ensemble, bench):
+    """Benchmark parsing the coordinates of all models into an array."""
+    atoms = _all_atoms(ensemble.models[:1])
+    coords, mask = bench(
+        load_coords_array,
+        ensemble.models,
+        atoms,
+        items=ensemble.size,
+        )
+    assert coords.shape[0] == ensemble.size
+    assert mask.all()
+
+
+def test_load_contacts(ensemble, bench):
+    """Benchmark the residue contacts used by caprieval."""
+    contacts = bench(
+        lambda: [load_contacts(model) for model in ensemble.models],
+        items=ensemble.size,
+        )
+    assert len(contacts) == ensemble.size
+
+
+def test_rmsd_run(ensemble, bench):
+    """Benchmark the pairwise RMSD values of a single core."""
+    atoms = _all_atoms(ensemble.models[:1])
+    coords, mask = load_coords_array(ensemble.models, atoms)
+    npairs = ensemble.size * (ensemble.size - 1) // 2
+    create_matrix_file("rmsd.npy", npairs)
+    rmsd_obj = RMSD(
+        ensemble.models,
+        0,
+        npairs,
+        0,
+        1,
+        "rmsd.npy",
+        path=Path("."),
+        coords=coords,
+        coords_mask=mask,
+        )
+    bench(rmsd_obj.run, items=npairs)
+    assert np.all(rmsd_obj.data[:, 2] > 0)
+
+
+def test_rmsdmatrix_module(ensemble, bench):
+    """Benchmark the rmsdmatrix module, from the models to the matrix."""
+    ncores = int(os.environ.get("HADDOCK3_BENCH_NCORES", 1))
+    module = RMSDModule(
+        order=1,
+        path=Path("1_rmsdmatrix"),
+        initial_params=rmsd_pars,
+        )
+    module.previous_io.output = ensemble.models
+    module.update_params(ncores=ncores)
+    npairs = ensemble.size * (ensemble.size - 1) // 2
+    bench(module._run, items=npairs, label=f"ncores={ncores}")
+    assert not np.isnan(open_matrix_file("rmsd.npy")).any()
+
+
+@pytest.mark.parametrize("fname", ["rmsd.npy", "rmsd.matrix"])
+def test_read_matrix(ensemble, bench, fname):
+    """Benchmark reading the binary and the text RMSD matrices."""
+    npairs = ensemble.size * (ensemble.size - 1) // 2
+    values = np.random.default_rng(917).uniform(0, 20, npairs)
+    if fname.endswith(".npy"):
+        create_matrix_file(fname, npairs)
+        matrix = open_matrix_file(fname, mode="r+")
+        matrix[:] = values
+        matrix.flush()
+        del matrix
+    else:
+        i, j = np.triu_indices(ensemble.size, k=1)
+        np.savetxt(
+            fname,
+            np.column_stack((i + 1, j + 1, values)),
+            fmt=("%d", "%d", "%.3f"),
+            )
+    rmsd_file = RMSDFile(fname, npairs=npairs)
+    # the values are loaded, not only memory-mapped
+    matrix = bench(
+        lambda: np.array(read_matrix(rmsd_file)),
+        items=npairs,
+        label=Path(fname).suffix[1:],
+        )
+    np.testing.assert_allclose(matrix, values, atol=1e-3)
+
+
+def test_clustrmsd_clusters(ensemble, bench):
+    """Benchmark the hierarchical clustering of an RMSD matrix."""
+    npairs = ensemble.size * (ensemble.size - 1) // 2
+    matrix = np.random.default_rng(917).uniform(0, 20, npairs)
+    clusters = bench(
+        lambda: get_clusters(get_dendrogram(matrix, "average"), 5, "maxclust"),
+        items=ensemble.size,
+        )
+    assert len(clusters) == ensemble.size
+
+
+def test_fcc(ensemble, bench):
+    """Benchmark the contacts, fingerprints and neighbors of clustfcc."""
+    pytest.importorskip("fcc")
+    from haddock.modules.analysis.clustfcc.clustfcc import (
+        get_contacts,
+        get_fingerprints,
+        get_neighbors,
+        )
+    files = [model.rel_path for model in ensemble.models]
+    contacts = bench(
+        lambda: [get_contacts(pdb_f, 5.0) for pdb_f in files],
+        items=ensemble.size,
+        label="contacts",
+        )
+    fingerprints = bench(
+        get_fingerprints,
+        contacts,
+        items=ensemble.size,
+        label="fingerprints",
+        )
+    neighbors = bench(
+        get_neighbors,
+        fingerprints,
+        0.6,
+        0.75,
+        items=ensemble.size * (ensemble.size - 1) // 2,
+        label="neighbors",
+        )
+    assert len(neighbors) == ensemble.size
@@ -12,7 +12,8 @@ files are compressed to `.gz`.
 
 The <run_directory> can either be a whole HADDOCK3 run folder or a
 specific folder of the workflow step. <ncores> defines the number of
-threads to use; by default uses a single core.
+threads to use; by default uses a single core. <compresslevel> defines
+the gzip compression level, from 1 (fastest) to 9 (smallest files).
 
 Usage::
 
@@ -22,6 +23,7 @@ Usage::
     haddock3-clean run1/1_rigidbody
     haddock3-clean run1 -n  # uses all cores
     haddock3-clean run1 -n 2  # uses 2 cores
+    haddock3-clean run1 -l 9  # smallest files
 """
 import argparse
 import sys
@@ -46,6 +48,19 @@ libcli.add_rundir_arg(ap)
 libcli.add_ncores_arg(ap)
 libcli.add_version_arg(ap)
 
+ap.add_argument(
+    "-l",
+    "--compresslevel",
+    dest="compresslevel",
+    help=(
+        "The gzip compression level, from 1 (fastest) to 9 (smallest "
+        "files). Defaults to 6."
+    ),
+    type=int,
+    choices=range(1, 10),
+    default=None,
+)
+
 
 def _ap() -> ArgumentParser:
     return ap
@@ -67,7 +82,11 @@ def maincli() -> None:
     cli(ap, main)
 
 
-def main(run_dir: FilePath, ncores: Optional[int] = 1) -> None:
+def main(
+    run_dir: FilePath,
+    ncores: Optional[int] = 1,
+    compresslevel: Optional[int] = None,
+) -> None:
     """
     Clean a HADDOCK3 directory.
 
@@ -83,6 +102,10 @@ def main(run_dir: FilePath, ncores: Optional[int] = 1) -> None:
         The number of cores to use. If ``None``, use all possible threads.
         Defaults to 1.
 
+    compresslevel : int, or None
+        The gzip compression level. If ``None``, uses
+        :py:data:`haddock.gear.clean_steps.CLEAN_COMPRESSLEVEL`.
+
     See Also
     --------
     :py:module:`haddock.gear.clean_steps`
@@ -91,23 +114,25 @@ def main(run_dir: FilePath, ncores: Optional[int] = 1) -> None:
     from pathlib import Path
 
     from haddock import log
-    from haddock.gear.clean_steps import clean_output
+    from haddock.gear.clean_steps import CLEAN_COMPRESSLEVEL, clean_output
     from haddock.libs.libtimer import log_time
     from haddock.libs.libutil import parse_ncores
     from haddock.modules import get_module_steps_folders, is_step_folder
 
     log.info(f"Compressing {str(run_dir)!r} folder")
     ncores = parse_ncores(ncores)
+    if compresslevel is None:
+        compresslevel = CLEAN_COMPRESSLEVEL
 
     if is_step_folder(run_dir):
         with log_time("compressing took"):
-            clean_output(run_dir, ncores)
+            clean_output(run_dir, ncores, compresslevel)
 
     else:
         step_folders = get_module_steps_folders(run_dir)
         for folder in step_folders:
             with log_time("compressing took"):
-                clean_output(Path(run_dir, folder), ncores)
+                clean_output(Path(run_dir, folder), ncores, compresslevel)
 
     return
 
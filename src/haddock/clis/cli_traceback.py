@@ -184,43 +184,46 @@ def main(run_dir):
                 data_dict[key][-1] = f"../{sel_step[n]}/{data_dict[key][-1]}"
 
         delta = len(sel_step) - n - 1  # how many steps have we gone back?
-        # loading the .json file
+        # loading the .json file, only the output models are decoded
         json_path = Path(run_dir, sel_step[n], "io.json")
         io = ModuleIO()
         io.load(json_path)
-        # list all the values in the data_dict
-        ls_values = [x for val in data_dict.values() for x in val]
-        # getting and sorting the ranks for the current step folder
-        ranks = [pdbfile.score for pdbfile in io.output]
-        ranks_argsort = np.argsort(ranks)
+        # models of this step already seen in the following steps, mapped
+        # to their data_dict key
+        seen_models: dict[str, Any] = {}
+        for key, values in data_dict.items():
+            seen_models.setdefault(values[-1], key)
+        # getting the rank of each pdbfile in the current step folder
+        step_models = io.output
+        ranks = np.empty(len(step_models), dtype=np.int64)
+        ranks[np.argsort([pdbfile.score for pdbfile in step_models])] = (
+            np.arange(1, len(step_models) + 1)
+        )
 
         # iterating through the pdbfiles to fill data_dict and rank_dict
-        for i, pdbfile in enumerate(io.output):
-            rank = np.where(ranks_argsort == i)[0][0] + 1
+        for pdbfile, rank in zip(step_models, ranks):
+            rel_path = str(pdbfile.rel_path)
             # getting the original names
             ori_names, max_topo_len = get_ori_names(n, pdbfile, max_topo_len)
             if n != len(sel_step) - 1:
-                if str(pdbfile.rel_path) not in ls_values:
+                key = seen_models.get(rel_path)
+                if key is None:
                     # this is the first step in which the pdbfile appears.
                     # This means that it was discarded for the subsequent steps
                     # We need to add the pdbfile to the data_dict
                     key = f"unk{unk_idx}"
                     data_dict[key] = ["-" for el in range(delta - 1)]
-                    data_dict[key].append(str(pdbfile.rel_path))
+                    data_dict[key].append(rel_path)
                     rank_dict[key] = ["-" for el in range(delta)]
                     unk_idx += 1
-                else:
-                    # we've already seen this pdb before.
-                    idx = ls_values.index(str(pdbfile.rel_path))
-                    key = list(data_dict.keys())[idx // delta]
 
                 # assignment
                 for el in ori_names:
                     data_dict[key].append(el)
                 rank_dict[key].append(rank)
             else:  # last step of the workflow
-                data_dict[str(pdbfile.rel_path)] = [on for on in ori_names]
-                rank_dict[str(pdbfile.rel_path)] = [rank]
+                data_dict[rel_path] = [on for on in ori_names]
+                rank_dict[rel_path] = [rank]
 
         # print(f"rank_dict {rank_dict}")
         # print(f"data_dict {data_dict}, maxtopo {max_topo_len}")
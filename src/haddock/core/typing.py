@@ -26,6 +26,7 @@ from typing import (
     Any,
     Callable,
     Container,
+    ContextManager,
     Generator,
     Generic,
     Iterable,
@@ -14,8 +14,10 @@ See also the command-line clients ``haddock3-clean`` and
 ``haddock3-unpack``.
 """
 import gzip
+import os
 import shutil
 import tarfile
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from multiprocessing import Pool
 from pathlib import Path
@@ -23,17 +25,60 @@ from pathlib import Path
 from haddock import log
 from haddock.core.typing import FilePath, FilePathT, Iterable
 from haddock.libs.libio import (
-    archive_files_ext,
-    compress_files_ext,
+    archive_files,
+    clean_suffix,
     glob_folder,
-    remove_files_with_ext,
+    gzip_files,
     )
+from haddock.libs.libutil import sort_numbered_paths
 
 
 UNPACK_FOLDERS: list[FilePath] = []
 
+CLEAN_COMPRESSLEVEL = 6
+"""Default gzip compression level of :py:func:`clean_output`.
 
-def clean_output(path: FilePath, ncores: int = 1) -> None:
+Level 6 compresses the text files of the steps almost as well as level 9
+in a fraction of the time.
+"""
+
+COMPRESS_BLOCK_SIZE = 2**20
+"""Size of the blocks read when compressing a file, in bytes."""
+
+# add any formats generated to
+# `unpack_compressed_and_archived_files` so that the
+# uncompressing routines when restarting the run work.
+
+# Files to delete
+# deletes all except the first one
+FILES_TO_DELETE = (
+    '.inp',
+    '.inp.gz',
+    '.out',
+    '.out.gz',
+    )
+
+# files to archive (all files in single .tgz)
+FILES_TO_ARCHIVE = (
+    '.seed',
+    '.seed.gz',
+    '.con',
+    )
+
+# files to compress in .gz
+FILES_TO_COMPRESS = (
+    '.inp',
+    '.out',
+    '.pdb',
+    '.psf',
+    )
+
+
+def clean_output(
+        path: FilePath,
+        ncores: int = 1,
+        compresslevel: int = CLEAN_COMPRESSLEVEL,
+        ) -> None:
     """
     Clean the output of step folders.
 
@@ -45,6 +90,10 @@ def clean_output(path: FilePath, ncores: int = 1) -> None:
     Files with ``.pdb`` and ``.psf`` extension are compressed to `.gz`
     files.
 
+    The folder is listed only once. The archives and the compressed
+    files are then created concurrently by `ncores` threads, each
+    original file being deleted as soon as it is compressed.
+
     Parameters
     ----------
     path : str or pathlib.Path
@@ -52,58 +101,83 @@ def clean_output(path: FilePath, ncores: int = 1) -> None:
 
     ncores : int
         The number of cores.
+
+    compresslevel : int
+        The gzip compression level, from 1 (fastest) to 9 (smallest).
     """
     log.info(f"Cleaning output for {str(path)!r} using {ncores} cores.")
-    # add any formats generated to
-    # `unpack_compressed_and_archived_files` so that the
-    # uncompressing routines when restarting the run work.
-
-    # Files to delete
-    # deletes all except the first one
-    files_to_delete = [
-        '.inp',
-        '.inp.gz',
-        '.out',
-        '.out.gz',
-        ]
-
-    for extension in files_to_delete:
-        flist = glob_folder(path, extension)
-        for file_ in flist[1:]:
-            Path(file_).unlink()
-
-    # files to archive (all files in single .gz)
-    files_to_archive = [
-        '.seed',
-        '.seed.gz',
-        '.con',
-        ]
-
-    archive_ready = partial(_archive_and_remove_files, path=path)
-    _ncores = min(ncores, len(files_to_archive))
-    with Pool(_ncores) as pool:
-        imap = pool.imap_unordered(archive_ready, files_to_archive)
-        for _ in imap:
-            pass
-
-    # files to compress in .gz
-    files_to_compress = [
-        '.inp',
-        '.out',
-        '.pdb',
-        '.psf',
-        ]
+    files = scan_folder(
+        path,
+        FILES_TO_DELETE + FILES_TO_ARCHIVE + FILES_TO_COMPRESS,
+        )
+
+    for extension in FILES_TO_DELETE:
+        for file_ in files[extension][1:]:
+            file_.unlink()
+        del files[extension][1:]
+
+    compress_ready = partial(
+        gzip_files,
+        block_size=COMPRESS_BLOCK_SIZE,
+        compresslevel=compresslevel,
+        remove_original=True,
+        )
+    # zlib releases the GIL, threads compress files in parallel
+    with ThreadPoolExecutor(max_workers=max(1, ncores)) as executor:
+        futures = [
+            executor.submit(
+                archive_files,
+                files[extension],
+                Path(path, f"{clean_suffix(extension)}.tgz"),
+                compresslevel=compresslevel,
+                remove_original=True,
+                )
+            for extension in FILES_TO_ARCHIVE
+            if files[extension]
+            ]
+        futures.extend(
+            executor.submit(compress_ready, file_)
+            for extension in FILES_TO_COMPRESS
+            for file_ in files[extension]
+            )
+        for future in futures:
+            future.result()
+
+
+def scan_folder(
+        folder: FilePath,
+        extensions: Iterable[str],
+        ) -> dict[str, list[Path]]:
+    """
+    List the files of a folder by extension, in a single scan.
 
-    for ftc in files_to_compress:
-        found = compress_files_ext(path, ftc, ncores=ncores)
-        if found:
-            remove_files_with_ext(path, ftc)
+    Parameters
+    ----------
+    folder : str or pathlib.Path
+        The folder to list. Not recursive.
 
+    extensions : list of str
+        The extensions to look for, with the dot prefix. A file is
+        assigned to the longest extension it ends with.
 
-def _archive_and_remove_files(fta: str, path: FilePath) -> None:
-    found = archive_files_ext(path, fta)
-    if found:
-        remove_files_with_ext(path, fta)
+    Returns
+    -------
+    dict
+        The sorted list of files of each extension, as given by
+        :py:func:`haddock.libs.libio.glob_folder`.
+    """
+    found: dict[str, list[Path]] = {ext: [] for ext in extensions}
+    by_length = sorted(found, key=len, reverse=True)
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            # same as glob, hidden files are ignored
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            for ext in by_length:
+                if entry.name.endswith(ext):
+                    found[ext].append(Path(folder, entry.name))
+                    break
+    return {ext: sort_numbered_paths(*files) for ext, files in found.items()}
 
 
 # eventually this function can be moved to `libs.libio` in case of future need.
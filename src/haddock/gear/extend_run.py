@@ -16,9 +16,14 @@ from haddock.core.typing import (
     )
 from haddock.gear.clean_steps import UNPACK_FOLDERS, clean_output
 from haddock.gear.zerofill import zero_fill
+from haddock.libs.libalign import remove_structure_store
 from haddock.libs.libontology import ModuleIO
-from haddock.libs.libtimer import log_time
-from haddock.libs.libworkflow import Workflow, WorkflowManager
+from haddock.libs.libtimer import log_time, write_run_summary
+from haddock.libs.libworkflow import (
+    Workflow,
+    WorkflowManager,
+    get_worker_pool,
+    )
 from haddock.modules import get_module_steps_folders
 
 
@@ -34,6 +39,7 @@ class WorkflowManagerExtend(WorkflowManager):
                  **other_params: Any) -> None:
         self.start = start
         self.recipe = Workflow(workflow_params, start=start, **other_params)
+        self.general_params = other_params
         # terminate is used to synchronize the `clean` option with the
         # `exit` module. If the `exit` module is removed in the future,
         # you can also remove and clean the `terminate` part here.
@@ -41,12 +47,17 @@ class WorkflowManagerExtend(WorkflowManager):
 
     def run(self) -> None:
         """High level workflow composer."""
-        for i, step in enumerate(self.recipe.steps, start=0):
-            try:
-                step.execute()
-            except HaddockTermination:
-                self._terminated = i
-                break
+        try:
+            with get_worker_pool(self.general_params):
+                for i, step in enumerate(self.recipe.steps, start=0):
+                    try:
+                        step.execute()
+                    except HaddockTermination:
+                        self._terminated = i
+                        break
+        finally:
+            remove_structure_store(Path.cwd())
+        write_run_summary(get_module_steps_folders(Path.cwd()))
 
     def clean(self) -> None:
         """Clean the step output."""
@@ -1,63 +1,145 @@
 """Represent an Haddock model."""
+import re
 
+from haddock.core.typing import FilePath, Iterable, Optional
 
-from haddock.core.typing import FilePath
+
+ENERGY_TERMS = (
+    "total",
+    "bonds",
+    "angles",
+    "improper",
+    "dihe",
+    "vdw",
+    "elec",
+    "air",
+    "cdih",
+    "coup",
+    "rdcs",
+    "vean",
+    "dani",
+    "xpcs",
+    "rg",
+    )
+"""Terms of the ``REMARK energies:`` line written by CNS, in order."""
+
+_ENERGY_REMARK_REGEX = re.compile(
+    r"^REMARK\s.*?"
+    r"(?P<term>energies|buried surface area|Desolvation energy"
+    r"|Symmetry energy)"
+    r".*:(?P<values>[^:]*)$"
+    )
+_SINGLE_TERMS = {
+    "buried surface area": "bsa",
+    "Desolvation energy": "desolv",
+    "Symmetry energy": "sym",
+    }
+
+
+def read_energies(pdb_f: FilePath) -> dict[str, float]:
+    """
+    Read the energy terms from the REMARK header of a PDB file.
+
+    The file is streamed and reading stops at the first coordinate
+    record, so only the header written by CNS is parsed.
+
+    Parameters
+    ----------
+    pdb_f : str or pathlib.Path
+        The PDB file.
+
+    Returns
+    -------
+    dict
+        The energy terms. Empty if the file has no HADDOCK energies.
+    """
+    energy_dic: dict[str, float] = {}
+    with open(pdb_f) as fh:
+        for line in fh:
+            if line.startswith(("ATOM", "HETATM")):
+                break
+            match = _ENERGY_REMARK_REGEX.match(line.rstrip())
+            if match is None:
+                continue
+            term = match.group("term")
+            values = match.group("values")
+            if term == "energies":
+                energy_dic.update(
+                    zip(ENERGY_TERMS, map(float, values.split(",")))
+                    )
+            else:
+                energy_dic[_SINGLE_TERMS[term]] = float(values)
+
+    return energy_dic
+
+
+def calc_haddock_score(energies: dict[str, float], **weights: float) -> float:
+    """Calculate the haddock score based on the weights and energies."""
+    weighted_terms: list[float] = []
+    for key, weight in weights.items():
+        component_id = key.split('_')[1]
+        value = energies[component_id]
+        weighted_terms.append(value * weight)
+
+    # the haddock score is simply the sum of the weighted terms
+    haddock_score = sum(weighted_terms)
+    return haddock_score
+
+
+def collect_energies(
+        results: Iterable[Optional[dict[str, dict[str, float]]]],
+        ) -> dict[str, dict[str, float]]:
+    """
+    Merge the energies read by the CNS jobs into a single dictionary.
+
+    Parameters
+    ----------
+    results : iterable
+        The values returned by
+        :py:meth:`haddock.libs.libsubprocess.CNSJob.run`. `None` values,
+        from failed jobs or engines not returning results, are ignored.
+
+    Returns
+    -------
+    dict
+        The energies of each PDB file, keyed by file name.
+    """
+    energies: dict[str, dict[str, float]] = {}
+    for result in results:
+        if result:
+            energies.update(result)
+    return energies
 
 
 class HaddockModel:
     """Represent HADDOCK model."""
 
-    def __init__(self, pdb_f: FilePath) -> None:
-        self.energies = self._load_energies(pdb_f)
+    def __init__(
+            self,
+            pdb_f: FilePath,
+            energies: Optional[dict[str, float]] = None,
+            ) -> None:
+        """
+        Load the energies of a model.
+
+        Parameters
+        ----------
+        pdb_f : str or pathlib.Path
+            The PDB file of the model.
+
+        energies : dict, optional
+            The energies already read from `pdb_f`, for example by the
+            CNS job that generated it. If not given, they are read from
+            the file.
+        """
+        if energies is None:
+            energies = self._load_energies(pdb_f)
+        self.energies = energies
 
     @staticmethod
     def _load_energies(pdb_f: FilePath) -> dict[str, float]:
-        energy_dic: dict[str, float] = {}
-        with open(pdb_f) as fh:
-            for line in fh.readlines():
-                if line.startswith('REMARK'):
-                    # TODO: use regex to do this
-                    if 'energies' in line:
-                        energy_values = map(
-                            float,
-                            line.rstrip().split(':')[-1].split(',')
-                            )
-                        total, bonds, angles, improper, dihe, vdw, elec, air, cdih, coup, rdcs, vean, dani, xpcs, rg = energy_values  # noqa: E501
-                        energy_dic['total'] = total
-                        energy_dic['bonds'] = bonds
-                        energy_dic['angles'] = angles
-                        energy_dic['improper'] = improper
-                        energy_dic['dihe'] = dihe
-                        energy_dic['vdw'] = vdw
-                        energy_dic['elec'] = elec
-                        energy_dic['air'] = air
-                        energy_dic['cdih'] = cdih
-                        energy_dic['coup'] = coup
-                        energy_dic['rdcs'] = rdcs
-                        energy_dic['vean'] = vean
-                        energy_dic['dani'] = dani
-                        energy_dic['xpcs'] = xpcs
-                        energy_dic['rg'] = rg
-                    if 'buried surface area' in line:
-                        bsa = float(line.rstrip().split(':')[-1])
-                        energy_dic['bsa'] = bsa
-                    if 'Desolvation energy' in line:
-                        desolv = float(line.rstrip().split(':')[-1])
-                        energy_dic['desolv'] = desolv
-                    if 'Symmetry energy' in line:
-                        sym = float(line.rstrip().split(':')[-1])
-                        energy_dic['sym'] = sym
-
-        return energy_dic
+        return read_energies(pdb_f)
 
     def calc_haddock_score(self, **weights: float) -> float:
         """Calculate the haddock score based on the weights and energies."""
-        weighted_terms: list[float] = []
-        for key, weight in weights.items():
-            component_id = key.split('_')[1]
-            value = self.energies[component_id]
-            weighted_terms.append(value * weight)
-
-        # the haddock score is simply the sum of the weighted terms
-        haddock_score = sum(weighted_terms)
-        return haddock_score
+        return calc_haddock_score(self.energies, **weights)
@@ -8,7 +8,10 @@ Main functions
 * :py:func:`centroid`
 * :py:func:`kabsch`
 * :py:func:`load_coords`
+* :py:func:`parse_pdb`
+* :py:func:`shared_structure_store`
 * :py:func:`pdb2fastadic`
+* :py:func:`get_seq_signature`
 * :py:func:`get_atoms`
 * :py:func:`get_align`
 * :py:func:`align_struct`
@@ -16,10 +19,16 @@ Main functions
 * :py:func:`make_range`
 * :py:func:`dump_as_izone`
 """
+import fcntl
+import hashlib
+import json
 import os
 import shlex
+import shutil
 import subprocess
-from functools import partial
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache, partial
 from pathlib import Path
 
 import numpy as np
@@ -28,14 +37,40 @@ from Bio.Align import substitution_matrices
 from Bio.Seq import Seq
 
 from haddock import log
-from haddock.core.typing import AtomsDict, FilePath, Literal, NDFloat, Optional
+from haddock.core.typing import (
+    Any,
+    AtomsDict,
+    FilePath,
+    Generator,
+    Iterable,
+    Literal,
+    NDFloat,
+    Optional,
+    Sequence,
+    )
+from haddock.libs.libclust import CACHE_DIR
 from haddock.libs.libio import pdb_path_exists
 from haddock.libs.libontology import PDBFile, PDBPath
+from haddock.libs.libparallel import (
+    Scheduler,
+    get_shared_data,
+    share_data,
+    unshare_data,
+    )
 from haddock.libs.libpdb import split_by_chain
 
 
 RES_TO_BE_IGNORED = ["SHA", "WAT"]
 
+PDB_CACHE_SIZE = 64
+"""Maximum number of parsed PDB files kept in memory by `parse_pdb`."""
+
+STRUCTURE_STORE_DIR = Path(CACHE_DIR, "structures")
+"""Default folder of the :py:class:`StructureStore` of a run."""
+
+STRUCTURE_STORE_KEY = "structure_store"
+"""Name of the active :py:class:`StructureStore` in the shared data."""
+
 PROT_RES = [
     "ALA",
     "ARG",
@@ -401,6 +436,445 @@ def centroid(X: NDFloat) -> NDFloat:
     return C
 
 
+STRUCTURE_RECORD_DTYPE = np.dtype([
+    ("hetatm", bool),
+    ("chains", "S1"),
+    ("resnums", np.int32),
+    ("resnames", "S3"),
+    ("atom_names", "S4"),
+    ("elements", "S2"),
+    ("segids", "S4"),
+    ("coords", float, (3,)),
+    ])
+"""Atom records of the :py:class:`StructureStore`, one field per attribute
+of :py:class:`PDBStructure`. Text fields are stored as ASCII bytes, so an
+atom takes 43 bytes."""
+
+
+class PDBStructure:
+    """
+    Array-backed representation of the atoms in a PDB file.
+
+    Only ATOM and HETATM records are kept, in file order.
+
+    Attributes
+    ----------
+    hetatm : np.ndarray
+        (n_atoms,) boolean array, `True` for HETATM records.
+    chains : np.ndarray
+        (n_atoms,) chain identifiers.
+    resnums : np.ndarray
+        (n_atoms,) residue numbers.
+    resnames : np.ndarray
+        (n_atoms,) residue names.
+    atom_names : np.ndarray
+        (n_atoms,) atom names.
+    elements : np.ndarray
+        (n_atoms,) element symbols.
+    segids : np.ndarray
+        (n_atoms,) segment identifiers.
+    coords : np.ndarray
+        (n_atoms, 3) coordinates.
+    """
+
+    def __init__(self, lines: Iterable[str]) -> None:
+        hetatm: list[bool] = []
+        chains: list[str] = []
+        resnums: list[int] = []
+        resnames: list[str] = []
+        atom_names: list[str] = []
+        elements: list[str] = []
+        segids: list[str] = []
+        coords: list[tuple[float, float, float]] = []
+        for line in lines:
+            if line.startswith("ATOM"):
+                is_hetatm = False
+            elif line.startswith("HETATM"):
+                is_hetatm = True
+            else:
+                continue
+            try:
+                resnum = int(line[22:26])
+                xyz = (
+                    float(line[30:38]),
+                    float(line[38:46]),
+                    float(line[46:54]),
+                    )
+            except ValueError:
+                # HETATM records are only used to identify atom names
+                if not is_hetatm:
+                    raise
+                resnum, xyz = 0, (np.nan, np.nan, np.nan)
+            hetatm.append(is_hetatm)
+            chains.append(line[21])
+            resnums.append(resnum)
+            resnames.append(line[17:20].strip())
+            atom_names.append(line[12:16].strip())
+            elements.append(line[76:78].strip())
+            segids.append(line[72:76].strip())
+            coords.append(xyz)
+
+        self.hetatm = np.array(hetatm, dtype=bool)
+        self.chains = np.array(chains, dtype="U1")
+        self.resnums = np.array(resnums, dtype=int)
+        self.resnames = np.array(resnames, dtype="U3")
+        self.atom_names = np.array(atom_names, dtype="U4")
+        self.elements = np.array(elements, dtype="U2")
+        self.segids = np.array(segids, dtype="U4")
+        self.coords = np.array(coords, dtype=float).reshape(-1, 3)
+
+    def __len__(self) -> int:
+        return len(self.hetatm)
+
+    @classmethod
+    def from_records(cls, records: np.ndarray) -> "PDBStructure":
+        """
+        Wrap an array of :py:data:`STRUCTURE_RECORD_DTYPE` records.
+
+        The coordinates are views of `records`, no data is copied. The
+        text fields are decoded to strings.
+        """
+        structure = cls.__new__(cls)
+        structure.hetatm = records["hetatm"]
+        structure.chains = records["chains"].astype("U1")
+        structure.resnums = records["resnums"]
+        structure.resnames = records["resnames"].astype("U3")
+        structure.atom_names = records["atom_names"].astype("U4")
+        structure.elements = records["elements"].astype("U2")
+        structure.segids = records["segids"].astype("U4")
+        structure.coords = records["coords"]
+        return structure
+
+    def to_records(self) -> np.ndarray:
+        """Pack the atoms in an array of :py:data:`STRUCTURE_RECORD_DTYPE`."""
+        records = np.empty(len(self), dtype=STRUCTURE_RECORD_DTYPE)
+        for name in STRUCTURE_RECORD_DTYPE.names:
+            records[name] = getattr(self, name)
+        return records
+
+
+@lru_cache(maxsize=PDB_CACHE_SIZE)
+def _parse_pdb(pdb_f: str, mtime: int, size: int) -> PDBStructure:
+    """Parse a PDB file; `mtime` and `size` are part of the cache key."""
+    with open(pdb_f) as fh:
+        return PDBStructure(fh)
+
+
+def parse_pdb(pdb_f: PDBPath) -> PDBStructure:
+    """
+    Parse the atoms of a PDB file.
+
+    Parsed files are kept in a least-recently-used cache of
+    :py:data:`PDB_CACHE_SIZE` entries, keyed by the absolute path, the
+    modification time and the size of the file. A file is therefore
+    parsed again only if it changed on disk or was evicted.
+
+    Files found in the active :py:class:`StructureStore`, see
+    :py:func:`shared_structure_store`, are not parsed, their atoms are
+    read from the memory-mapped store.
+
+    Parameters
+    ----------
+    pdb_f : PosixPath or :py:class:`haddock.libs.libontology.PDBFile`
+
+    Returns
+    -------
+    :py:class:`PDBStructure`
+        The parsed structure, shared by all callers. Do not modify it.
+    """
+    if isinstance(pdb_f, PDBFile):
+        pdb_f = pdb_f.rel_path
+    path = os.path.abspath(pdb_f)
+    stat = os.stat(path)
+    store = get_active_structure_store()
+    if store is not None:
+        structure = store.get(path, stat.st_mtime_ns, stat.st_size)
+        if structure is not None:
+            return structure
+    return _parse_pdb(path, stat.st_mtime_ns, stat.st_size)
+
+
+def clear_pdb_cache() -> None:
+    """Empty the cache of parsed PDB files."""
+    _parse_pdb.cache_clear()
+
+
+class StructureChunkJob:
+    """Parse PDB files into a chunk of a :py:class:`StructureStore`."""
+
+    def __init__(self, pdb_files: Sequence[str], chunk_f: Path) -> None:
+        self.pdb_files = pdb_files
+        self.chunk_f = chunk_f
+        self.output = chunk_f
+
+    def run(self) -> dict[str, list[int]]:
+        """
+        Parse the files and save their atoms.
+
+        Returns
+        -------
+        dict
+            The entries of the index of the store: the modification
+            time, the size and the first and last atoms of each file.
+        """
+        entries: dict[str, list[int]] = {}
+        chunks: list[np.ndarray] = []
+        start = 0
+        for path in self.pdb_files:
+            stat = os.stat(path)
+            with open(path) as fh:
+                records = PDBStructure(fh).to_records()
+            chunks.append(records)
+            entries[path] = [
+                stat.st_mtime_ns,
+                stat.st_size,
+                start,
+                start + len(records),
+                ]
+            start += len(records)
+
+        tmp_f = self.chunk_f.with_name(f".tmp-{self.chunk_f.name}")
+        np.save(tmp_f, np.concatenate(chunks))
+        os.replace(tmp_f, self.chunk_f)
+        return entries
+
+
+class StructureStore:
+    """
+    Parsed atoms of many PDB files, memory-mapped from disk.
+
+    Files are parsed once, in parallel, and their atoms saved in chunk
+    files of :py:data:`STRUCTURE_RECORD_DTYPE` records. Any process can
+    then get the atoms of a file from the memory-mapped chunks,
+    see :py:meth:`get`. Entries are keyed like the cache of
+    :py:func:`parse_pdb`, so changed files are parsed again.
+
+    Files are added under a lock of the store folder, and the chunks no
+    longer referenced by the index are then deleted. The store is meant
+    to live as long as a run, see :py:func:`remove_structure_store`.
+
+    Only the path of the store is pickled, the workers of a
+    :py:class:`haddock.libs.libparallel.WorkerPool` open the chunks
+    themselves.
+    """
+
+    def __init__(self, path: FilePath = STRUCTURE_STORE_DIR) -> None:
+        """
+        Open the store, creating its folder if needed.
+
+        Parameters
+        ----------
+        path : str or pathlib.Path
+            The folder of the store. Relative paths are resolved now, so
+            the store can be used from any working directory.
+        """
+        self.path = Path(path).resolve()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._index: Optional[dict[str, list[Any]]] = None
+        self._chunks: dict[str, np.ndarray] = {}
+
+    @property
+    def index_f(self) -> Path:
+        """The JSON index of the stored files."""
+        return Path(self.path, "index.json")
+
+    @property
+    def lock_f(self) -> Path:
+        """The file locked while the store is updated."""
+        return Path(self.path, "index.lock")
+
+    @property
+    def index(self) -> dict[str, list[Any]]:
+        """The chunk and the atom range of each file, see :py:meth:`get`."""
+        if self._index is None:
+            if self.index_f.exists():
+                self._index = json.loads(self.index_f.read_text())
+            else:
+                self._index = {}
+        return self._index  # type: ignore
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.path = state["path"]
+        self._index = None
+        self._chunks = {}
+
+    def get(self, path: str, mtime: int, size: int) -> Optional[PDBStructure]:
+        """
+        Get the atoms of a stored file.
+
+        Parameters
+        ----------
+        path : str
+            The absolute path of the file.
+        mtime, size : int
+            The modification time, in nanoseconds, and the size of the
+            file. If they differ from the stored ones, the file changed.
+
+        Returns
+        -------
+        :py:class:`PDBStructure` or None
+            The atoms, backed by the memory-mapped chunk. `None` if the
+            file is not stored or changed.
+        """
+        entry = self.index.get(path)
+        if entry is None or entry[:2] != [mtime, size]:
+            return None
+        _, _, chunk, start, stop = entry
+        if chunk not in self._chunks:
+            self._chunks[chunk] = np.load(
+                Path(self.path, chunk),
+                mmap_mode="r",
+                )
+        return PDBStructure.from_records(self._chunks[chunk][start:stop])
+
+    def add(self, pdb_files: Iterable[PDBPath], ncores: int = 1) -> int:
+        """
+        Store the files that are not stored yet or changed.
+
+        The store is locked meanwhile, so processes adding files to the
+        same store wait for each other and do not overwrite the entries
+        of each other in the index.
+
+        Parameters
+        ----------
+        pdb_files : iterable
+            The PDB files, paths or :py:class:`PDBFile` objects.
+        ncores : int
+            Number of processes parsing the files.
+
+        Returns
+        -------
+        int
+            The number of files stored.
+        """
+        paths = [
+            os.path.abspath(
+                pdb_f.rel_path if isinstance(pdb_f, PDBFile) else pdb_f
+                )
+            for pdb_f in pdb_files
+            ]
+        with open(self.lock_f, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # read the entries added by other processes
+            self._index = None
+            return self._add(list(dict.fromkeys(paths)), ncores)
+
+    def _add(self, paths: list[str], ncores: int) -> int:
+        """Store the files, the lock of the store must be held."""
+        missing: list[str] = []
+        for path in paths:
+            stat = os.stat(path)
+            entry = self.index.get(path)
+            if entry is None or entry[:2] != [stat.st_mtime_ns, stat.st_size]:
+                missing.append(path)
+        if not missing:
+            return 0
+
+        ncores = max(min(ncores, len(missing)), 1)
+        jobs = [
+            StructureChunkJob(
+                files.tolist(),
+                Path(self.path, f"{uuid.uuid4().hex}.npy"),
+                )
+            for files in np.array_split(missing, ncores)
+            ]
+        engine = Scheduler(jobs, ncores=ncores, return_results=True)
+        engine.run()
+
+        index = dict(self.index)
+        nstored = 0
+        for job, entries in zip(jobs, engine.results):
+            if entries is None:
+                log.warning(f"Could not store the files of {job.chunk_f}")
+                continue
+            index.update(
+                (path, entry[:2] + [job.chunk_f.name] + entry[2:])
+                for path, entry in entries.items()
+                )
+            nstored += len(entries)
+        tmp_f = self.index_f.with_name(f".tmp-{self.index_f.name}")
+        tmp_f.write_text(json.dumps(index))
+        os.replace(tmp_f, self.index_f)
+        self._index = index
+
+        # chunks of files stored again, or of failed jobs
+        used = {entry[2] for entry in index.values()}
+        for chunk_f in self.path.glob("*.npy"):
+            if chunk_f.name not in used:
+                chunk_f.unlink(missing_ok=True)
+        log.info(f"{nstored} files stored in {self.path}")
+        return nstored
+
+
+def remove_structure_store(run_dir: FilePath) -> None:
+    """
+    Remove the :py:class:`StructureStore` of a run, if any.
+
+    The parsed models are only reused by the steps of a run, the store
+    is removed when the run ends so it does not grow across runs.
+
+    Parameters
+    ----------
+    run_dir : str or pathlib.Path
+        The run directory.
+    """
+    store_dir = Path(run_dir, CACHE_DIR.name, STRUCTURE_STORE_DIR.name)
+    shutil.rmtree(store_dir, ignore_errors=True)
+
+
+def get_active_structure_store() -> Optional[StructureStore]:
+    """Get the :py:class:`StructureStore` shared with the workers, if any."""
+    try:
+        return get_shared_data(STRUCTURE_STORE_KEY)
+    except KeyError:
+        return None
+
+
+@contextmanager
+def shared_structure_store(
+        pdb_files: Iterable[PDBPath],
+        path: FilePath = STRUCTURE_STORE_DIR,
+        ncores: int = 1,
+        ) -> Generator[StructureStore, None, None]:
+    """
+    Store PDB files and share the store while the context is active.
+
+    Inside the context, :py:func:`parse_pdb` reads the stored files from
+    the store, in this process and in the workers of the
+    :py:class:`haddock.libs.libparallel.Scheduler` and
+    :py:class:`haddock.libs.libparallel.WorkerPool`, instead of parsing
+    them again. The store is kept on disk, so later steps of the run
+    reuse it.
+
+    Parameters
+    ----------
+    pdb_files : iterable
+        The PDB files, paths or :py:class:`PDBFile` objects.
+    path : str or pathlib.Path
+        The folder of the store.
+    ncores : int
+        Number of processes parsing the files not stored yet.
+
+    Yields
+    ------
+    :py:class:`StructureStore`
+        The store.
+    """
+    store = StructureStore(path)
+    store.add(pdb_files, ncores=ncores)
+    share_data(STRUCTURE_STORE_KEY, store)
+    try:
+        yield store
+    finally:
+        unshare_data(STRUCTURE_STORE_KEY)
+
+
 def load_coords(
     pdb_f, atoms, filter_resdic=None, numbering_dic=None, model2ref_chain_dict=None
 ):
@@ -433,50 +907,52 @@ def load_coords(
     idx = 0
     if isinstance(pdb_f, PDBFile):
         pdb_f = pdb_f.rel_path
-    with open(pdb_f, "r") as fh:
-        for line in fh.readlines():
-            if line.startswith("ATOM"):
-                atom_name = line[12:16].strip()
-                resname = line[17:20].strip()
-                if resname in RES_TO_BE_IGNORED:
-                    continue
-                if model2ref_chain_dict:
-                    chain = model2ref_chain_dict[line[21]]
-                else:
-                    chain = line[21]
-                resnum = int(line[22:26])
-                x = float(line[30:38])
-                y = float(line[38:46])
-                z = float(line[46:54])
-                coords = np.asarray([x, y, z])
-                if numbering_dic and model2ref_chain_dict:
-                    try:
-                        resnum = numbering_dic[chain][resnum]
-                    except KeyError:
-                        # this residue is not matched, and so it should
-                        #  not be considered
-                        # self.log(
-                        #     f"WARNING: {chain}.{resnum}.{atom_name}"
-                        #     " was not matched!"
-                        #     )
-                        continue
-                # identifier = f"{chain}.{resnum}.{atom_name}"
-                identifier = (chain, resnum, atom_name)
-                if atom_name not in atoms[resname]:
-                    continue
-                if chain not in chain_dic:
-                    chain_dic[chain] = []
-                if filter_resdic:
-                    # Only retrieve coordinates from the filter_resdic
-                    if chain in filter_resdic and resnum in filter_resdic[chain]:
-                        coord_dic[identifier] = coords
-                        chain_dic[chain].append(idx)
-                        idx += 1
-                else:
-                    # retrieve everything
-                    coord_dic[identifier] = coords
-                    chain_dic[chain].append(idx)
-                    idx += 1
+    structure = parse_pdb(pdb_f)
+    # copy, so that the cached structure is never modified by the caller
+    all_coords = structure.coords.copy()
+    records = zip(
+        structure.hetatm.tolist(),
+        structure.atom_names.tolist(),
+        structure.resnames.tolist(),
+        structure.chains.tolist(),
+        structure.resnums.tolist(),
+        all_coords,
+        )
+    for hetatm, atom_name, resname, chain, resnum, coords in records:
+        if hetatm:
+            continue
+        if resname in RES_TO_BE_IGNORED:
+            continue
+        if model2ref_chain_dict:
+            chain = model2ref_chain_dict[chain]
+        if numbering_dic and model2ref_chain_dict:
+            try:
+                resnum = numbering_dic[chain][resnum]
+            except KeyError:
+                # this residue is not matched, and so it should
+                #  not be considered
+                # self.log(
+                #     f"WARNING: {chain}.{resnum}.{atom_name}"
+                #     " was not matched!"
+                #     )
+                continue
+        # identifier = f"{chain}.{resnum}.{atom_name}"
+        identifier = (chain, resnum, atom_name)
+        if atom_name not in atoms[resname]:
+            continue
+        if chain not in chain_dic:
+            chain_dic[chain] = []
+        if filter_resdic:
+            # Only retrieve coordinates from the filter_resdic
+            if chain in filter_resdic and resnum in filter_resdic[chain]:
+                coord_dic[identifier] = coords
+                chain_dic[chain].append(idx)
+                idx += 1
+        else:
+            # retrieve everything
+            coord_dic[identifier] = coords
+            chain_dic[chain].append(idx)
+            idx += 1
     chain_ranges: ChainsRange = {}
     for chain, indice in chain_dic.items():
         if not indice:
@@ -520,31 +996,32 @@ def get_atoms(pdb: PDBPath, full: bool = False) -> AtomsDict:
     if not exists:
         raise Exception(msg)
 
-    with open(pdb) as fh:
-        for line in fh.readlines():
-            if line.startswith(("ATOM", "HETATM")):
-                resname = line[17:20].strip()
-                atom_name = line[12:16].strip()
-                element = line[76:78].strip()
-                if (
-                    resname not in PROT_RES
-                    and resname not in DNA_RES
-                    and resname not in RNA_RES
-                    and resname not in RES_TO_BE_IGNORED
-                ):
-                    # its neither DNA/RNA nor protein, use the heavy atoms
-                    # WARNING: Atoms that belong to unknown residues must
-                    #  be bound to a residue name;
-                    #   For example: residue NEP, also contains
-                    #  CB and CG atoms, if we do not bind it to the
-                    #  residue name, the next functions will include
-                    #  CG and CG atoms in the calculations for all
-                    #  other residue names
-                    if element != "H":
-                        if resname not in atom_dic:
-                            atom_dic[resname] = []
-                        if atom_name not in atom_dic[resname]:
-                            atom_dic[resname].append(atom_name)
+    structure = parse_pdb(pdb)
+    records = zip(
+        structure.resnames.tolist(),
+        structure.atom_names.tolist(),
+        structure.elements.tolist(),
+        )
+    for resname, atom_name, element in records:
+        if (
+            resname not in PROT_RES
+            and resname not in DNA_RES
+            and resname not in RNA_RES
+            and resname not in RES_TO_BE_IGNORED
+        ):
+            # its neither DNA/RNA nor protein, use the heavy atoms
+            # WARNING: Atoms that belong to unknown residues must
+            #  be bound to a residue name;
+            #   For example: residue NEP, also contains
+            #  CB and CG atoms, if we do not bind it to the
+            #  residue name, the next functions will include
+            #  CG and CG atoms in the calculations for all
+            #  other residue names
+            if element != "H":
+                if resname not in atom_dic:
+                    atom_dic[resname] = []
+                if atom_name not in atom_dic[resname]:
+                    atom_dic[resname].append(atom_name)
     return atom_dic
 
 
@@ -655,24 +1132,53 @@ def pdb2fastadic(pdb_f: PDBPath) -> dict[str, dict[int, str]]:
     if isinstance(pdb_f, PDBFile):
         pdb_f = pdb_f.rel_path
 
-    with open(pdb_f) as fh:
-        for line in fh.readlines():
-            if line.startswith("ATOM"):
-                res_num = int(line[22:26])
-                res_name = line[17:20].strip()
-                chain = line[21]
-                if res_name in RES_TO_BE_IGNORED:
-                    continue
-                try:
-                    one_letter = res_codes[res_name]
-                except KeyError:
-                    one_letter = "X"
-                if chain not in seq_dic:
-                    seq_dic[chain] = {}
-                seq_dic[chain][res_num] = one_letter
+    structure = parse_pdb(pdb_f)
+    records = zip(
+        structure.hetatm.tolist(),
+        structure.resnums.tolist(),
+        structure.resnames.tolist(),
+        structure.chains.tolist(),
+        )
+    for hetatm, res_num, res_name, chain in records:
+        if hetatm:
+            continue
+        if res_name in RES_TO_BE_IGNORED:
+            continue
+        try:
+            one_letter = res_codes[res_name]
+        except KeyError:
+            one_letter = "X"
+        if chain not in seq_dic:
+            seq_dic[chain] = {}
+        seq_dic[chain][res_num] = one_letter
     return seq_dic
 
 
+def get_seq_signature(pdb_f: PDBPath) -> tuple[tuple[str, str], ...]:
+    """
+    Get the sequence signature of a structure.
+
+    The signature holds, for each chain, a hash of its numbered sequence.
+    Structures with the same signature have the same sequence alignment
+    to a given reference.
+
+    Parameters
+    ----------
+    pdb_f : PosixPath or :py:class:`haddock.libs.libontology.PDBFile`
+
+    Returns
+    -------
+    signature : tuple
+        Pairs of chain and sequence hash, in the order of the chains.
+    """
+    signature: list[tuple[str, str]] = []
+    for chain, seq in pdb2fastadic(pdb_f).items():
+        numbered_seq = ",".join(f"{num}{res}" for num, res in seq.items())
+        digest = hashlib.md5(numbered_seq.encode()).hexdigest()
+        signature.append((chain, digest))
+    return tuple(signature)
+
+
 def get_align(
     method: str, lovoalign_exec: FilePath
 ) -> partial[dict[str, dict[int, int]]]:
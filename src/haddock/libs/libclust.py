@@ -5,15 +5,36 @@ Main functions
 --------------
 
 * :py:func:`write_unclustered_list`
+* :py:func:`create_matrix_file`
+* :py:func:`open_matrix_file`
+* :py:func:`get_cache_file`
+* :py:func:`fill_matrix_from_cache`
+* :py:func:`save_matrix_cache`
 """
+import hashlib
+import json
 import os
+import pickle
 from pathlib import Path
 
+import numpy as np
+
 from haddock import log
-from haddock.core.typing import FilePath
+from haddock.core.typing import Any, Callable, FilePath
 from haddock.libs.libontology import PDBFile
 
 
+MATRIX_DTYPE = np.float32
+"""Data type of the binary condensed distance matrices."""
+
+CACHE_DIR = Path("..", "cache")
+"""Folder of the distance caches, relative to the step folders.
+
+It lives in the run directory, outside of the step folders, so that the
+caches survive restarting a run from an earlier step.
+"""
+
+
 def write_structure_list(input_models: list[PDBFile],
                          clustered_models: list[PDBFile],
                          out_fname: FilePath) -> None:
@@ -48,3 +69,198 @@ def write_structure_list(input_models: list[PDBFile],
     log.info(f'Saving structure list to {out_fname}')
     with open(output_fname, 'w') as out_fh:
         out_fh.write(output_str)
+
+
+def create_matrix_file(fname: FilePath, npairs: int) -> Path:
+    """
+    Preallocate a binary condensed distance matrix.
+
+    The matrix is stored as a `.npy` file, so its small header records
+    the data type and the number of pairs. All values are initialised
+    to NaN, allowing to check later whether all distances were written.
+
+    Parameters
+    ----------
+    fname : str or Path
+        Path to the `.npy` file to create.
+    npairs : int
+        Number of pairs in the condensed matrix.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the created file.
+    """
+    matrix = np.lib.format.open_memmap(
+        fname,
+        mode="w+",
+        dtype=MATRIX_DTYPE,
+        shape=(npairs,),
+        )
+    matrix[:] = np.nan
+    matrix.flush()
+    del matrix
+    return Path(fname)
+
+
+def open_matrix_file(fname: FilePath, mode: str = "r") -> np.memmap:
+    """
+    Memory-map a binary condensed distance matrix.
+
+    Parameters
+    ----------
+    fname : str or Path
+        Path to the `.npy` file created by :py:func:`create_matrix_file`.
+    mode : str
+        Memory-map mode, `"r"` to read or `"r+"` to write a slice.
+
+    Returns
+    -------
+    np.memmap
+        The condensed matrix, no values are read until accessed.
+    """
+    return np.load(fname, mmap_mode=mode)
+
+
+def get_model_md5(model: PDBFile) -> str:
+    """
+    Get the MD5 hash of the content of a model file.
+
+    The hash identifies the model in the distance caches, regardless of
+    its name or of the step that generated it.
+    """
+    return hashlib.md5(Path(model.rel_path).read_bytes()).hexdigest()
+
+
+def get_cache_file(
+        name: str,
+        signature: Any,
+        suffix: str = ".npz",
+        cache_dir: FilePath = CACHE_DIR,
+        ) -> Path:
+    """
+    Get the path of a distance cache.
+
+    Parameters
+    ----------
+    name : str
+        Name of the module owning the cache.
+    signature : Any
+        JSON serialisable parameters the cached values depend on. Each
+        distinct signature has its own cache file.
+    suffix : str
+        Suffix of the cache file.
+    cache_dir : str or Path
+        Folder of the caches.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the cache file, which may not exist yet.
+    """
+    digest = hashlib.md5(
+        json.dumps(signature, sort_keys=True, default=str).encode()
+        ).hexdigest()
+    return Path(cache_dir, f"{name}_{digest}{suffix}")
+
+
+def fill_matrix_from_cache(
+        cache_f: FilePath,
+        keys: list[str],
+        matrix: np.ndarray,
+        ) -> int:
+    """
+    Copy the cached distances into a condensed distance matrix.
+
+    Models are matched to the cached ones by their key, so the cached
+    distances are reused whatever the order of the models. Pairs of models
+    absent from the cache are left untouched.
+
+    Parameters
+    ----------
+    cache_f : str or Path
+        Cache file written by :py:func:`save_matrix_cache`.
+    keys : list
+        Keys of the models of `matrix`, see :py:func:`get_model_md5`.
+    matrix : np.ndarray
+        Condensed distance matrix of the models, filled in place.
+
+    Returns
+    -------
+    int
+        Number of pairs filled from the cache.
+    """
+    if not Path(cache_f).exists():
+        return 0
+    with np.load(cache_f) as cache:
+        cached_keys = cache["keys"].tolist()
+        cached_matrix = cache["matrix"]
+
+    ncached = len(cached_keys)
+    index = {key: idx for idx, key in enumerate(cached_keys)}
+    old_idx = np.array([index.get(key, -1) for key in keys], dtype=np.int64)
+    nmodels = len(keys)
+    nfilled = 0
+    start = 0
+    for i in range(nmodels - 1):
+        stop = start + nmodels - i - 1
+        if old_idx[i] >= 0:
+            ref = np.full(stop - start, old_idx[i])
+            mod = old_idx[i + 1:]
+            low = np.minimum(ref, mod)
+            high = np.maximum(ref, mod)
+            # duplicated models share the same key, they are not cached
+            known = (mod >= 0) & (low != high)
+            low, high = low[known], high[known]
+            cached_idx = low * (2 * ncached - low - 1) // 2 + high - low - 1
+            matrix[start:stop][known] = cached_matrix[cached_idx]
+            nfilled += int(known.sum())
+        start = stop
+    return nfilled
+
+
+def save_matrix_cache(
+        cache_f: FilePath,
+        keys: list[str],
+        matrix: np.ndarray,
+        ) -> Path:
+    """
+    Save a condensed distance matrix and the keys of its models.
+
+    The cache is written to a temporary file first, so an interrupted
+    run never leaves a truncated cache behind.
+    """
+    return _replace_cache(
+        cache_f,
+        lambda fh: np.savez(
+            fh,
+            keys=np.array(keys, dtype=str),
+            matrix=np.asarray(matrix, dtype=MATRIX_DTYPE),
+            ),
+        )
+
+
+def load_model_cache(cache_f: FilePath) -> dict[str, Any]:
+    """Load values cached per model key, empty if there is no cache."""
+    if not Path(cache_f).exists():
+        return {}
+    with open(cache_f, "rb") as fh:
+        return pickle.load(fh)
+
+
+def save_model_cache(cache_f: FilePath, values: dict[str, Any]) -> Path:
+    """Save values cached per model key."""
+    return _replace_cache(cache_f, lambda fh: pickle.dump(values, fh))
+
+
+def _replace_cache(
+        cache_f: FilePath,
+        write: Callable[[Any], Any],
+        ) -> Path:
+    cache_f = Path(cache_f)
+    cache_f.parent.mkdir(parents=True, exist_ok=True)
+    tmp_f = cache_f.with_name(f".{cache_f.name}.{os.getpid()}")
+    with open(tmp_f, "wb") as fh:
+        write(fh)
+    os.replace(tmp_f, cache_f)
+    return cache_f
@@ -7,7 +7,14 @@ from pathlib import Path
 
 from haddock import EmptyPath, log
 from haddock.core import cns_paths
-from haddock.core.typing import Any, FilePath, FilePathT, Optional, Union
+from haddock.core.typing import (
+    Any,
+    Callable,
+    FilePath,
+    FilePathT,
+    Optional,
+    Union,
+    )
 from haddock.libs import libpdb
 from haddock.libs.libfunc import false, true
 from haddock.libs.libmath import RandomNumberGenerator
@@ -17,6 +24,8 @@ from haddock.libs.libutil import transform_to_list
 
 RND = RandomNumberGenerator()
 
+ChainsegFunc = Callable[..., tuple[list[str], list[str]]]
+
 
 def generate_default_header(
         path: Optional[FilePath] = None
@@ -190,9 +199,17 @@ def load_boxtyp20(waterbox_param: Path) -> str:
 
 
 # This is used by docking
-def prepare_multiple_input(pdb_input_list: list[FilePath],
-                           psf_input_list: list[FilePath]) -> str:
-    """Prepare multiple input files."""
+def prepare_multiple_input(
+        pdb_input_list: list[FilePath],
+        psf_input_list: list[FilePath],
+        get_chainseg: ChainsegFunc = libpdb.identify_chainseg,
+        ) -> str:
+    """
+    Prepare multiple input files.
+
+    `get_chainseg` identifies the segIDs and chainIDs of each PDB, see
+    :py:func:`haddock.libs.libpdb.identify_chainseg`.
+    """
     input_str = f"{linesep}! Input structure{linesep}"
     for psf in psf_input_list:
         input_str += f"structure{linesep}"
@@ -208,7 +225,7 @@ def prepare_multiple_input(pdb_input_list: list[FilePath],
     # check how many chains there are across all the PDBs
     chain_l: list[list[str]] = []
     for pdb in pdb_input_list:
-        for element in libpdb.identify_chainseg(pdb):
+        for element in get_chainseg(pdb):
             chain_l.append(element)
     ncomponents = len(set(itertools.chain(*chain_l)))
     input_str += write_eval_line('ncomponents', ncomponents)
@@ -259,75 +276,131 @@ def prepare_single_input(
     return input_str
 
 
-def prepare_cns_input(
-        model_number: int,
-        input_element: Union[PDBFile, list[PDBFile]],
-        step_path: FilePath,
-        recipe_str: str,
-        defaults: Any,
-        identifier: str,
-        ambig_fname: FilePath = "",
-        native_segid: bool = False,
-        default_params_path: Optional[Path] = None,
-        ) -> Path:
+class CNSInputTemplate:
     """
-    Generate the .inp file needed by the CNS engine.
-
-    Parameters
-    ----------
-    model_number : int
-        The number of the model. Will be used as file name suffix.
+    Template of the CNS input files of a step.
 
-    input_element : `libs.libontology.Persisten`, list of those
+    The parameter header and the recipe are rendered once, and the segIDs
+    and chainIDs of each input PDB are identified once, so that the input
+    of each model only requires filling its own fields.
     """
-    # read the default parameters
-    default_params = load_workflow_params(**defaults)
-    default_params += write_eval_line('ambig_fname', ambig_fname)
-
-    # write the PDBs
-    pdb_list = [
-        pdb.rel_path
-        for pdb in transform_to_list(input_element)
-        ]
-
-    # write the PSFs
-    psf_list: list[Path] = []
-    if isinstance(input_element, (list, tuple)):
-        for pdb in input_element:
-            if isinstance(pdb.topology, (list, tuple)):
-                for psf in pdb.topology:
-                    psf_fname = psf.rel_path
+
+    def __init__(
+            self,
+            recipe_str: str,
+            defaults: Any,
+            identifier: str,
+            native_segid: bool = False,
+            ) -> None:
+        """
+        Render the invariant parts of the CNS input files.
+
+        Parameters
+        ----------
+        recipe_str : str
+            The CNS recipe.
+
+        defaults : dict
+            The parameters of the step, written to the header.
+
+        identifier : str
+            The prefix of the input and output file names.
+
+        native_segid : bool
+            Whether to write the segIDs of the input PDBs.
+        """
+        self.header = load_workflow_params(**defaults)
+        self.recipe_str = recipe_str
+        self.identifier = identifier
+        self.native_segid = native_segid
+        self._chainsegs: dict[
+            tuple[str, bool],
+            tuple[list[str], list[str]],
+            ] = {}
+
+    def identify_chainseg(
+            self,
+            pdb_f: FilePath,
+            sort: bool = True,
+            ) -> tuple[list[str], list[str]]:
+        """Identify the segIDs and chainIDs of a PDB, once per file."""
+        key = (str(pdb_f), sort)
+        if key not in self._chainsegs:
+            self._chainsegs[key] = libpdb.identify_chainseg(pdb_f, sort=sort)
+        return self._chainsegs[key]
+
+    def render(
+            self,
+            model_number: int,
+            input_element: Union[PDBFile, list[PDBFile]],
+            ambig_fname: FilePath = "",
+            ) -> Path:
+        """
+        Generate the .inp file of a model.
+
+        Parameters
+        ----------
+        model_number : int
+            The number of the model. Will be used as file name suffix.
+
+        input_element : `libs.libontology.Persisten`, list of those
+
+        ambig_fname : str or Path
+            The restraints file of the model.
+
+        Returns
+        -------
+        Path
+            The path to the .inp file.
+        """
+        ambig_line = write_eval_line('ambig_fname', ambig_fname)
+
+        # write the PDBs
+        pdb_list = [
+            pdb.rel_path
+            for pdb in transform_to_list(input_element)
+            ]
+
+        # write the PSFs
+        psf_list: list[Path] = []
+        if isinstance(input_element, (list, tuple)):
+            for pdb in input_element:
+                if isinstance(pdb.topology, (list, tuple)):
+                    for psf in pdb.topology:
+                        psf_fname = psf.rel_path
+                        psf_list.append(psf_fname)
+                else:
+                    psf_fname = pdb.topology.rel_path
                     psf_list.append(psf_fname)
-            else:
-                psf_fname = pdb.topology.rel_path
-                psf_list.append(psf_fname)
 
-    elif isinstance(input_element.topology, (list, tuple)):
-        pdb = input_element  # for clarity
-        for psf in pdb.topology:
-            psf_fname = psf.rel_path
+        elif isinstance(input_element.topology, (list, tuple)):
+            pdb = input_element  # for clarity
+            for psf in pdb.topology:
+                psf_fname = psf.rel_path
+                psf_list.append(psf_fname)
+        else:
+            pdb = input_element  # for clarity
+            psf_fname = pdb.topology.rel_path
             psf_list.append(psf_fname)
-    else:
-        pdb = input_element  # for clarity
-        psf_fname = pdb.topology.rel_path
-        psf_list.append(psf_fname)
-
-    input_str = prepare_multiple_input(pdb_list, psf_list)
 
-    output_pdb_filename = f"{identifier}_{model_number}.pdb"
+        input_str = prepare_multiple_input(
+            pdb_list,
+            psf_list,
+            get_chainseg=self.identify_chainseg,
+            )
 
-    output = f"{linesep}! Output structure{linesep}"
-    output += write_eval_line('output_pdb_filename', output_pdb_filename)
+        output_pdb_filename = f"{self.identifier}_{model_number}.pdb"
 
-    # prepare chain/seg IDs
-    segid_str = ""
-    if native_segid:
-        chainid_list: list[str] = []
-        if isinstance(input_element, (list, tuple)):
-            for pdb in input_element:
+        output = f"{linesep}! Output structure{linesep}"
+        output += write_eval_line('output_pdb_filename', output_pdb_filename)
 
+        # prepare chain/seg IDs
+        segid_str = ""
+        if self.native_segid:
+            chainid_list: list[str] = []
+            for pdb in transform_to_list(input_element):
                 segids, chains = \
-                    libpdb.identify_chainseg(pdb.rel_path, sort=False)
+                    self.identify_chainseg(pdb.rel_path, sort=False)
 
                 chainsegs = sorted(list(set(segids) | set(chains)))
                 chainid_list.extend(chainsegs)
@@ -335,28 +408,52 @@ def prepare_cns_input(
             for i, _chainseg in enumerate(chainid_list, start=1):
                 segid_str += write_eval_line(f'prot_segid_{i}', _chainseg)
 
-        else:
-            segids, chains = \
-                libpdb.identify_chainseg(input_element.rel_path, sort=False)
+        output += write_eval_line('count', model_number)
 
-            chainsegs = sorted(list(set(segids) | set(chains)))
+        inp_file = Path(f"{self.identifier}_{model_number}.inp")
+        with open(inp_file, "w") as fout:
+            fout.writelines((
+                self.header,
+                ambig_line,
+                input_str,
+                output,
+                segid_str,
+                self.recipe_str,
+                ))
+        return inp_file
 
-            for i, _chainseg in enumerate(chainsegs, start=1):
-                segid_str += write_eval_line(f'prot_segid_{i}', _chainseg)
 
-    output += write_eval_line('count', model_number)
+def prepare_cns_input(
+        model_number: int,
+        input_element: Union[PDBFile, list[PDBFile]],
+        step_path: FilePath,
+        recipe_str: str,
+        defaults: Any,
+        identifier: str,
+        ambig_fname: FilePath = "",
+        native_segid: bool = False,
+        default_params_path: Optional[Path] = None,
+        ) -> Path:
+    """
+    Generate the .inp file needed by the CNS engine.
+
+    To prepare the inputs of many models, create a
+    :py:class:`CNSInputTemplate` once and use its `render` method.
 
-    inp = (
-        default_params
-        + input_str
-        + output
-        + segid_str
-        + recipe_str
-        )
+    Parameters
+    ----------
+    model_number : int
+        The number of the model. Will be used as file name suffix.
 
-    inp_file = Path(f"{identifier}_{model_number}.inp")
-    inp_file.write_text(inp)
-    return inp_file
+    input_element : `libs.libontology.Persisten`, list of those
+    """
+    template = CNSInputTemplate(
+        recipe_str,
+        defaults,
+        identifier,
+        native_segid=native_segid,
+        )
+    return template.render(model_number, input_element, ambig_fname)
 
 
 def prepare_expected_pdb(model_obj: Union[PDBFile, tuple[PDBFile,
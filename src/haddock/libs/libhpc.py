@@ -4,16 +4,26 @@ import re
 import shlex
 import subprocess
 import time
+from collections import deque
 from pathlib import Path
 
 from haddock import log, modules_defaults_path
-from haddock.core.typing import Any, Container, FilePath, Optional
+from haddock.core.typing import (
+    Any,
+    Container,
+    FilePath,
+    Iterable,
+    Optional,
+    )
 from haddock.gear.yaml2cfg import read_from_yaml_config
 from haddock.libs.libsubprocess import CNSJob
+from haddock.libs.libtimer import record_phase, record_task
 
 
 STATE_REGEX = r"JobState=(\w*)"
 
+SCONTROL_REGEX = re.compile(r"JobId=(\d+)\s.*?JobState=(\w+)")
+
 JOB_STATUS_DIC = {
     "PENDING": "submitted",
     "RUNNING": "running",
@@ -21,14 +31,43 @@ JOB_STATUS_DIC = {
     "COMPLETING": "running",
     "COMPLETED": "finished",
     "FAILED": "failed",
+    "CANCELLED": "failed",
+    "TIMEOUT": "failed",
+    "NODE_FAIL": "failed",
+    "OUT_OF_MEMORY": "failed",
+    "PREEMPTED": "failed",
+    "BOOT_FAIL": "failed",
+    "DEADLINE": "failed",
+    "REVOKED": "failed",
+    "CONFIGURING": "running",
+    "RESIZING": "running",
+    "SIGNALING": "running",
+    "STAGE_OUT": "running",
+    "REQUEUED": "submitted",
+    "REQUEUE_FED": "submitted",
+    "REQUEUE_HOLD": "hold",
+    "SPECIAL_EXIT": "hold",
+    "RESV_DEL_HOLD": "hold",
+    "STOPPED": "hold",
     }
 
+JOB_ENDED_STATUS = ("finished", "failed")
+"""Status of the jobs that left the queue. States missing from
+`JOB_STATUS_DIC` are considered running, so the jobs are queried again."""
+
+HPC_POLL_INTERVAL = 10
+"""Seconds between two status queries in the sliding window mode."""
+
+HPC_UNKNOWN_POLLS_LIMIT = 30
+"""Status queries after which a job that Slurm does not report is failed."""
+
 # if you change these defaults, chage also the values in the
 # modules/defaults.cfg file
 _tmpcfg = read_from_yaml_config(modules_defaults_path)
 HPCScheduler_CONCAT_DEFAULT: int = _tmpcfg["concat"]  # original value 1
 HPCWorker_QUEUE_LIMIT_DEFAULT: int = _tmpcfg["queue_limit"]  # original value 100 # noqa: E501
 HPCWorker_QUEUE_DEFAULT: str = _tmpcfg["queue"]  # original value ""
+HPCScheduler_SLIDING_WINDOW_DEFAULT: bool = _tmpcfg["sliding_window"]
 del _tmpcfg
 
 
@@ -58,6 +97,7 @@ class HPCWorker:
         self.job_num = num
         self.job_id = job_id
         self.job_status = "unknown"
+        self.submit_time: Optional[float] = None
 
         self.moddir = Path(tasks[0].envvars['MODDIR'])
         self.toppar = tasks[0].envvars['TOPPAR']
@@ -102,6 +142,7 @@ class HPCWorker:
         p = subprocess.run(shlex.split(cmd), capture_output=True)
         self.job_id = int(p.stdout.decode("utf-8").split()[-1])
         self.job_status = "submitted"
+        self.submit_time = time.time()
 
     def update_status(self) -> str:
         """Retrieve the status of this worker."""
@@ -128,6 +169,93 @@ class HPCWorker:
             _ = subprocess.run(shlex.split(cmd), capture_output=True)
 
 
+def parse_job_states(output: str) -> dict[int, str]:
+    """
+    Parse the states of the jobs reported by `squeue` or `sacct`.
+
+    Parameters
+    ----------
+    output : str
+        Lines with the job id and the Slurm state of each job, for
+        example, ``123 RUNNING`` or ``124|CANCELLED by 42``. Job steps,
+        such as ``124.batch``, are ignored.
+
+    Returns
+    -------
+    dict
+        The status of each job, one of the values of `JOB_STATUS_DIC`.
+        Unknown states are considered running, only the states listed
+        as ended by `JOB_STATUS_DIC` end a job.
+    """
+    states: dict[int, str] = {}
+    for line in output.splitlines():
+        fields = line.replace("|", " ").split()
+        if len(fields) < 2 or not fields[0].isdigit():
+            continue
+        states[int(fields[0])] = JOB_STATUS_DIC.get(fields[1], "running")
+    return states
+
+
+def _query_job_states(cmd: str) -> Optional[dict[int, str]]:
+    """
+    Run a Slurm query and parse the states of the jobs.
+
+    Returns `None` if the command failed, the jobs missing from its
+    output are then not known to have left the queue.
+    """
+    p = subprocess.run(shlex.split(cmd), capture_output=True)
+    if p.returncode != 0:
+        err = p.stderr.decode("utf-8").strip()
+        log.warning(f"{cmd!r} failed with code {p.returncode}: {err}")
+        return None
+    output = p.stdout.decode("utf-8")
+    if cmd.startswith("scontrol"):
+        output = os.linesep.join(
+            " ".join(match) for match in SCONTROL_REGEX.findall(output)
+            )
+    return parse_job_states(output)
+
+
+def get_jobs_status(job_ids: Iterable[int]) -> dict[int, str]:
+    """
+    Retrieve the status of several jobs at once.
+
+    Jobs in the queue are queried with a single `squeue` call. Those not
+    reported are queried with a single `sacct` call and, for clusters
+    without accounting, with a single `scontrol` call, which knows the
+    jobs that ended recently. Jobs that none of them reports, for
+    example because a query failed, have the ``"unknown"`` status and
+    should be queried again later.
+
+    Parameters
+    ----------
+    job_ids : list of int
+        The ids of the jobs.
+
+    Returns
+    -------
+    dict
+        The status of each job.
+    """
+    job_ids = list(job_ids)
+    if not job_ids:
+        return {}
+    ids = ",".join(str(job_id) for job_id in job_ids)
+    states = _query_job_states(f"squeue -h -o '%i %T' -j {ids}") or {}
+
+    missing = [job_id for job_id in job_ids if job_id not in states]
+    if missing:
+        ids = ",".join(str(job_id) for job_id in missing)
+        cmd = f"sacct -n -X -P -o JobID,State -j {ids}"
+        states.update(_query_job_states(cmd) or {})
+
+    missing = [job_id for job_id in job_ids if job_id not in states]
+    if missing:
+        states.update(_query_job_states("scontrol -o show job") or {})
+
+    return {job_id: states.get(job_id, "unknown") for job_id in job_ids}
+
+
 class HPCScheduler:
     """Schedules tasks to run in HPC."""
 
@@ -137,10 +265,41 @@ class HPCScheduler:
             target_queue: str = HPCWorker_QUEUE_DEFAULT,
             queue_limit: int = HPCWorker_QUEUE_LIMIT_DEFAULT,
             concat: int = HPCScheduler_CONCAT_DEFAULT,
+            sliding_window: bool = HPCScheduler_SLIDING_WINDOW_DEFAULT,
+            poll_interval: float = HPC_POLL_INTERVAL,
             ) -> None:
+        """
+        Schedule tasks to the batch system.
+
+        Parameters
+        ----------
+        task_list : list of libs.libcns.CNSJob objects
+
+        target_queue : str
+            The name of the queue to submit the jobs to.
+
+        queue_limit : int
+            Maximum number of jobs in the queue at once.
+
+        concat : int
+            Number of tasks per job.
+
+        sliding_window : bool
+            If `False` (default), jobs are submitted in batches of
+            `queue_limit` and each batch must finish before the next is
+            submitted. If `True`, `queue_limit` jobs are kept in the
+            queue at all times, submitting a new job as soon as one
+            finishes. The status of all jobs is retrieved with a single
+            query every `poll_interval` seconds.
+
+        poll_interval : float
+            Seconds between status queries in `sliding_window` mode.
+        """
         self.num_tasks = len(task_list)
         self.queue_limit = queue_limit
         self.concat = concat
+        self.sliding_window = sliding_window
+        self.poll_interval = poll_interval
 
         # split tasks according to concat level
         if concat > 1:
@@ -162,10 +321,45 @@ class HPCScheduler:
             for worker in self.worker_list:
                 worker.queue = target_queue
 
+        self._recorded: set[int] = set()
+
         log.debug(f"{self.num_tasks} HPC tasks ready.")
 
     def run(self) -> None:
         """Run tasks in the Queue."""
+        with record_phase("execution"):
+            self._run()
+
+    def _record_job(self, worker: HPCWorker) -> None:
+        """
+        Record a job once it is found to be finished.
+
+        The wall time goes from the submission of the job to the status
+        query that found it finished, so it includes the time spent
+        waiting in the queue.
+        """
+        if worker.job_id in self._recorded or worker.submit_time is None:
+            return
+        self._recorded.add(worker.job_id)  # type: ignore
+        record_task({
+            "task": worker.job_fname.name,
+            "job_id": worker.job_id,
+            "ntasks": len(worker.tasks),
+            "success": worker.job_status == "finished",
+            "start": worker.submit_time,
+            "wall": time.time() - worker.submit_time,
+            })
+
+    def _run(self) -> None:
+        """Run tasks in batches or in a sliding window."""
+        if self.sliding_window:
+            try:
+                self._run_sliding_window()
+            except KeyboardInterrupt as err:
+                self.terminate()
+                raise err
+            return
+
         # split by maximum number of submission so we do it in batches
         adaptive_l: list[float] = []
         batch = [
@@ -185,6 +379,8 @@ class HPCScheduler:
                 while not completed:
                     for worker in worker_list:
                         worker.update_status()
+                        if worker.job_status in ("finished", "failed"):
+                            self._record_job(worker)
                         if worker.job_status != "finished":
                             log.info(
                                 f">> {worker.job_fname.name}"
@@ -230,6 +426,53 @@ class HPCScheduler:
             self.terminate()
             raise err
 
+    def _run_sliding_window(self) -> None:
+        """Keep `queue_limit` jobs in the queue until all are done."""
+        start = time.time()
+        to_submit = deque(self.worker_list)
+        in_queue: dict[int, HPCWorker] = {}
+        unknown_polls: dict[int, int] = {}
+        done = 0
+        while to_submit or in_queue:
+            # backfill the queue
+            while to_submit and len(in_queue) < self.queue_limit:
+                worker = to_submit.popleft()
+                worker.run()
+                in_queue[worker.job_id] = worker  # type: ignore
+
+            log.info(
+                f">> {len(in_queue)} jobs in the queue, "
+                f"{len(to_submit)} waiting, waiting... "
+                f"({self.poll_interval:.2f}s)"
+                )
+            time.sleep(self.poll_interval)
+
+            for job_id, status in get_jobs_status(in_queue).items():
+                worker = in_queue[job_id]
+                if status == "unknown":
+                    # the job may still run, query it again
+                    unknown_polls[job_id] = unknown_polls.get(job_id, 0) + 1
+                    if unknown_polls[job_id] < HPC_UNKNOWN_POLLS_LIMIT:
+                        continue
+                    log.warning(
+                        f"The status of {worker.job_fname.name} could not "
+                        f"be retrieved in {HPC_UNKNOWN_POLLS_LIMIT} queries, "
+                        "considering it failed"
+                        )
+                    status = "failed"
+                unknown_polls.pop(job_id, None)
+                worker.job_status = status
+                if status not in JOB_ENDED_STATUS:
+                    continue
+                del in_queue[job_id]
+                self._record_job(worker)
+                done += 1
+                per = done / len(self.worker_list) * 100
+                log.info(f">> {worker.job_fname.name} {status} {per:.0f}%")
+
+        elapsed = time.time() - start
+        log.info(f">> {done} jobs took {elapsed:.2f}s to finish")
+
     def terminate(self) -> None:
         """Terminate all jobs in the queue in a controlled way."""
         log.info("Terminate signal received, removing jobs from the queue...")
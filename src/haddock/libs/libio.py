@@ -175,6 +175,36 @@ def add_suffix_to_files(
         yield path
 
 
+def format_value(value: Any) -> str:
+    """
+    Format a value as a table field.
+
+    Paths and :py:class:`haddock.libs.libontology.PDBFile` objects are
+    written as (relative) paths, `None` as "-" and floats with three
+    decimals.
+
+    Parameters
+    ----------
+    value : Any
+        The value to format.
+
+    Returns
+    -------
+    str
+        The formatted value.
+    """
+    if isinstance(value, Path):
+        return str(value)
+    elif isinstance(value, PDBFile):
+        return str(value.rel_path)
+    elif isinstance(value, (int, str)):
+        return f"{value}"
+    elif value is None:
+        return "-"
+    else:
+        return f"{value:.3f}"
+
+
 def write_dic_to_file(
     data_dict: Mapping[Any, Any],
     output_fname: FilePath,
@@ -200,21 +230,7 @@ def write_dic_to_file(
 
     with open(output_fname, "w") as out_fh:
         out_fh.write(header + os.linesep)
-        row_l: list[str] = []
-        for element in data_dict:
-            value = data_dict[element]
-            if isinstance(value, Path):
-                row_l.append(str(value))
-            elif isinstance(value, PDBFile):
-                row_l.append(str(value.rel_path))
-            elif isinstance(value, int):
-                row_l.append(f"{value}")
-            elif isinstance(value, str):
-                row_l.append(f"{value}")
-            elif value is None:
-                row_l.append("-")
-            else:
-                row_l.append(f"{value:.3f}")
+        row_l = [format_value(value) for value in data_dict.values()]
         out_fh.write(sep.join(row_l) + os.linesep)
 
 
@@ -248,21 +264,7 @@ def write_nested_dic_to_file(
     with open(output_fname, "w") as out_fh:
         out_fh.write(header + os.linesep)
         for row in data_dict:
-            row_l: list[str] = []
-            for element in data_dict[row]:
-                value = data_dict[row][element]
-                if isinstance(value, Path):
-                    row_l.append(str(value))
-                elif isinstance(value, PDBFile):
-                    row_l.append(str(value.rel_path))
-                elif isinstance(value, int):
-                    row_l.append(f"{value}")
-                elif isinstance(value, str):
-                    row_l.append(f"{value}")
-                elif value is None:
-                    row_l.append("-")
-                else:
-                    row_l.append(f"{value:.3f}")
+            row_l = [format_value(value) for value in data_dict[row].values()]
             out_fh.write(sep.join(row_l) + os.linesep)
 
 
@@ -381,18 +383,54 @@ def archive_files_ext(path: FilePath, ext: str, compresslevel: int = 9) -> bool:
     ext = clean_suffix(ext)
 
     if files:
-        with tarfile.open(
-            Path(path, f"{ext}.tgz"),
-            mode="w:gz",
-            compresslevel=compresslevel,
-        ) as tarout:
-            for file_ in files:
-                tarout.add(file_, arcname=file_.name)
-
+        archive_files(files, Path(path, f"{ext}.tgz"), compresslevel)
         return True
     return False
 
 
+def archive_files(
+    files: Iterable[Path],
+    tar_file: FilePath,
+    compresslevel: int = 9,
+    remove_original: bool = False,
+) -> Path:
+    """
+    Archive files in a `.tgz` file, by their names.
+
+    Parameters
+    ----------
+    files : list of :external:py:class:`pathlib.Path`
+        The files to archive.
+
+    tar_file : str or :external:py:class:`pathlib.Path`
+        The archive to create.
+
+    compresslevel : int
+        The compression level.
+
+    remove_original : bool
+        Whether to remove the files once the archive is complete.
+
+    Returns
+    -------
+    :external:py:class:`pathlib.Path`
+        The path to the archive.
+    """
+    files = list(files)
+    with tarfile.open(
+        tar_file,
+        mode="w:gz",
+        compresslevel=compresslevel,
+    ) as tarout:
+        for file_ in files:
+            tarout.add(file_, arcname=file_.name)
+
+    if remove_original:
+        for file_ in files:
+            file_.unlink()
+    return Path(tar_file)
+
+
 def glob_folder(folder: FilePath, ext: str) -> list[Path]:
     """
     List files with extention `ext` in `folder`.
@@ -7,6 +7,7 @@ from pathlib import Path
 from typing import Any, Optional
 
 from haddock import log
+from haddock.libs.libtimer import record_phase
 
 
 class MPIScheduler:
@@ -27,9 +28,13 @@ class MPIScheduler:
             f"Executing tasks with the haddock3-mpitask runner using "
             f"{self.ncores} processors..."
             )
-        p = subprocess.run(
-            shlex.split(cmd), stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
+        # the tasks run in other processes, only the total is recorded
+        with record_phase("execution"):
+            p = subprocess.run(
+                shlex.split(cmd),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                )
 
         # out = p.stdout.decode("utf-8")
         err = p.stderr.decode("utf-8")
@@ -1,15 +1,29 @@
 """Describe the Haddock3 ontology used for communicating between modules."""
 import datetime
+import importlib
 import itertools
+import json
+import os
+import sys
+import time
 from enum import Enum
+from functools import lru_cache
 from os import linesep
-from pathlib import Path
+from pathlib import Path, PurePath
 
 
 import jsonpickle
 
 from haddock.core.defaults import MODULE_IO_FILE
-from haddock.core.typing import FilePath, Literal, Optional, TypeVar, Union
+from haddock.core.typing import (
+    Callable,
+    FilePath,
+    Literal,
+    Optional,
+    TypeVar,
+    Union,
+    )
+from haddock.libs.libtimer import record_phase
 from typing import List, Any
 
 
@@ -30,8 +44,47 @@ class Format(Enum):
         return str(self.value)
 
 
+@lru_cache(maxsize=1024)
+def _resolve_dir(path: str, cwd: str) -> str:
+    """Resolve a directory, relative to `cwd`, once per directory."""
+    return sys.intern(str(Path(cwd, path).resolve()))
+
+
+_TIMESTAMP: list[Any] = [None, ""]
+
+
+def _timestamp() -> str:
+    """Give the current time, formatted once per second."""
+    now = int(time.time())
+    if now != _TIMESTAMP[0]:
+        created = datetime.datetime.fromtimestamp(now).isoformat(" ", "seconds")
+        _TIMESTAMP[:] = [now, created]
+    return _TIMESTAMP[1]
+
+
 class Persistent:
-    """Any persistent file generated by this framework."""
+    """
+    Any persistent file generated by this framework.
+
+    Instances use `__slots__`. Directories are resolved once and shared
+    between instances, and `full_name` and `rel_path` are computed when
+    first accessed. Attributes not declared in the slots can still be
+    added to instances.
+    """
+
+    __slots__ = (
+        "created",
+        "file_name",
+        "file_type",
+        "path",
+        "md5",
+        "restr_fname",
+        "_dir",
+        "_name",
+        "_full_name",
+        "_rel_path",
+        "__dict__",
+    )
 
     def __init__(
         self,
@@ -41,15 +94,56 @@ class Persistent:
         md5: Optional[str] = None,
         restr_fname: Optional[FilePath] = None,
     ) -> None:
-        self.created = datetime.datetime.now().isoformat(" ", "seconds")
+        self.created = _timestamp()
         self.file_name = Path(file_name).name
         self.file_type = file_type
-        self.path = str(Path(path).resolve())
-        self.full_name = str(Path(path, self.file_name))
-        self.rel_path = Path("..", Path(self.path).name, file_name)
+        self._dir = sys.intern(str(path))
+        self._name = file_name
+        self.path = _resolve_dir(self._dir, os.getcwd())
+        self._full_name: Optional[str] = None
+        self._rel_path: Optional[Path] = None
         self.md5 = md5
         self.restr_fname = restr_fname
 
+    @property
+    def full_name(self) -> str:
+        """Path to the file, relative to the given `path`."""
+        if getattr(self, "_full_name", None) is None:
+            directory = getattr(self, "_dir", None) or self.path
+            self._full_name = str(Path(directory, self.file_name))
+        return self._full_name  # type: ignore
+
+    @full_name.setter
+    def full_name(self, full_name: str) -> None:
+        self._full_name = full_name
+
+    @property
+    def rel_path(self) -> Path:
+        """Path to the file, relative to a sibling step folder."""
+        if getattr(self, "_rel_path", None) is None:
+            name = getattr(self, "_name", None) or self.file_name
+            self._rel_path = Path("..", Path(self.path).name, name)
+        return self._rel_path  # type: ignore
+
+    @rel_path.setter
+    def rel_path(self, rel_path: Path) -> None:
+        self._rel_path = rel_path
+
+    def __getstate__(self) -> dict[str, Any]:
+        state: dict[str, Any] = {}
+        for cls in reversed(type(self).__mro__):
+            for name in cls.__dict__.get("__slots__", ()):
+                if not name.startswith("_") and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        state["full_name"] = self.full_name
+        state["rel_path"] = self.rel_path
+        state.update(self.__dict__)
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __repr__(self) -> str:
         rep = (
             f"[{self.file_type}|{self.created}] " f"{Path(self.path) / self.file_name}"
@@ -64,6 +158,17 @@ class Persistent:
 class PDBFile(Persistent):
     """Represent a PDB file."""
 
+    __slots__ = (
+        "topology",
+        "score",
+        "ori_name",
+        "clt_id",
+        "clt_rank",
+        "clt_model_rank",
+        "len",
+        "unw_energies",
+    )
+
     def __init__(
         self,
         file_name: Union[Path, str],
@@ -101,6 +206,8 @@ class PDBFile(Persistent):
 class RMSDFile(Persistent):
     """Represents a RMSD matrix file."""
 
+    __slots__ = ("npairs",)
+
     def __init__(self, file_name: FilePath, npairs: int, path: FilePath = ".") -> None:
         super().__init__(file_name, Format.MATRIX, path)
         self.npairs = npairs
@@ -112,17 +219,184 @@ class RMSDFile(Persistent):
 class TopologyFile(Persistent):
     """Represent a CNS-generated topology file."""
 
+    __slots__ = ()
+
     def __init__(self, file_name: FilePath, path: FilePath = ".") -> None:
         super().__init__(file_name, Format.TOPOLOGY, path)
 
 
+IO_REGISTRY_FORMAT = "haddock3-io"
+"""Identifier of the columnar format written by :py:meth:`ModuleIO.save`."""
+
+IO_REGISTRY_VERSION = 1
+
+_ABSENT = {"$u": 1}
+"""Marks a row of a column that does not have the attribute."""
+
+
+class _RegistryEncoder:
+    """
+    Encode the content of a :py:class:`ModuleIO` in a columnar layout.
+
+    Each :py:class:`Persistent` object is stored once, as a row of the
+    table of its class, whatever the number of times it is referenced.
+    The attributes of the objects are stored in columns, and columns
+    with a single value for all rows are stored once. Values that are
+    not JSON types are tagged with a one-key dictionary.
+    """
+
+    def __init__(self) -> None:
+        self.tables: dict[str, list[Optional[dict[str, Any]]]] = {}
+        self.index: dict[int, list[Any]] = {}
+
+    def encode(self, value: Any) -> Any:
+        """Encode a value, registering the persistent objects found."""
+        if value is None or type(value) in (str, int, bool, float):
+            return value
+        elif isinstance(value, Persistent):
+            return {"$r": self._register(value)}
+        elif isinstance(value, list):
+            return [self.encode(v) for v in value]
+        elif isinstance(value, tuple):
+            return {"$t": [self.encode(v) for v in value]}
+        elif isinstance(value, PurePath):
+            return {"$p": str(value)}
+        elif isinstance(value, Format):
+            return {"$f": value.name}
+        elif isinstance(value, dict):
+            plain_keys = all(type(k) is str for k in value)
+            if plain_keys and not (len(value) == 1 and "$" in "".join(value)):
+                return {k: self.encode(v) for k, v in value.items()}
+            return {
+                "$d": [[self.encode(k), self.encode(v)]
+                       for k, v in value.items()]
+                }
+        elif isinstance(value, float):
+            return float(value)
+        # anything else, numpy scalars for example
+        return {"$j": jsonpickle.encode(value, keys=True)}
+
+    def _register(self, obj: "Persistent") -> list[Any]:
+        ref = self.index.get(id(obj))
+        if ref is None:
+            cls = type(obj)
+            cls_name = f"{cls.__module__}:{cls.__qualname__}"
+            rows = self.tables.setdefault(cls_name, [])
+            ref = [cls_name, len(rows)]
+            self.index[id(obj)] = ref
+            # reserve the row before encoding, objects may be nested
+            rows.append(None)
+            rows[ref[1]] = {
+                k: self.encode(v) for k, v in obj.__getstate__().items()
+                }
+        return ref
+
+    def columns(self) -> dict[str, dict[str, Any]]:
+        """Give the tables of the registered objects, by columns."""
+        tables: dict[str, dict[str, Any]] = {}
+        for cls_name, rows in self.tables.items():
+            names = list(dict.fromkeys(k for row in rows for k in row))
+            columns: dict[str, Any] = {}
+            for name in names:
+                column = [row.get(name, _ABSENT) for row in rows]
+                if column.count(column[0]) == len(column):
+                    columns[name] = {"$c": column[0]}
+                else:
+                    columns[name] = column
+            tables[cls_name] = {"size": len(rows), "columns": columns}
+        return tables
+
+
+class _RegistryDecoder:
+    """
+    Decode values written by :py:class:`_RegistryEncoder`.
+
+    Persistent objects are only created when first referenced, and are
+    created once, so that references to the same object are shared.
+    """
+
+    def __init__(self, tables: dict[str, dict[str, Any]]) -> None:
+        self.tables = tables
+        self.objects: dict[str, list[Any]] = {
+            cls_name: [None] * table["size"]
+            for cls_name, table in tables.items()
+            }
+
+    def decode(self, value: Any) -> Any:
+        """Decode a value, creating the referenced objects."""
+        if type(value) is list:
+            return [self.decode(v) for v in value]
+        elif type(value) is not dict:
+            return value
+        elif len(value) == 1:
+            key, item = next(iter(value.items()))
+            if key == "$r":
+                return self._get_object(*item)
+            elif key == "$t":
+                return tuple(self.decode(v) for v in item)
+            elif key == "$p":
+                return Path(item)
+            elif key == "$f":
+                return Format[item]
+            elif key == "$d":
+                return {self.decode(k): self.decode(v) for k, v in item}
+            elif key == "$j":
+                return jsonpickle.decode(item, keys=True)
+        return {k: self.decode(v) for k, v in value.items()}
+
+    def _get_object(self, cls_name: str, idx: int) -> "Persistent":
+        objects = self.objects[cls_name]
+        obj = objects[idx]
+        if obj is None:
+            module_name, qualname = cls_name.split(":")
+            cls = importlib.import_module(module_name)
+            for attr in qualname.split("."):
+                cls = getattr(cls, attr)
+            obj = objects[idx] = cls.__new__(cls)
+            state: dict[str, Any] = {}
+            for name, column in self.tables[cls_name]["columns"].items():
+                if isinstance(column, dict):
+                    value = column["$c"]
+                else:
+                    value = column[idx]
+                if value != _ABSENT:
+                    state[name] = self.decode(value)
+            obj.__setstate__(state)
+        return obj
+
+
 class ModuleIO:
     """Intercommunicating modules and exchange input/output information."""
 
     def __init__(self) -> None:
+        self._pending: dict[str, Callable[[], List[Any]]] = {}
         self.input: List[Any] = []
         self.output: List[Any] = []
 
+    @property
+    def input(self) -> List[Any]:
+        """Input of the module, decoded on first access."""
+        if "input" in self._pending:
+            self._input = self._pending.pop("input")()
+        return self._input
+
+    @input.setter
+    def input(self, value: List[Any]) -> None:
+        self._pending.pop("input", None)
+        self._input = value
+
+    @property
+    def output(self) -> List[Any]:
+        """Output of the module, decoded on first access."""
+        if "output" in self._pending:
+            self._output = self._pending.pop("output")()
+        return self._output
+
+    @output.setter
+    def output(self, value: List[Any]) -> None:
+        self._pending.pop("output", None)
+        self._output = value
+
     def add(self, persistent, mode="i"):
         """Add a given filename as input or output."""
         if mode == "i":
@@ -137,20 +411,48 @@ class ModuleIO:
                 self.output.append(persistent)
 
     def save(self, path: FilePath = ".", filename: FilePath = MODULE_IO_FILE) -> Path:
-        """Save Input/Output needed files by this module to disk."""
+        """
+        Save Input/Output needed files by this module to disk.
+
+        The file is a compact JSON document where each persistent object
+        is stored once, with its attributes stored by columns.
+        """
         fpath = Path(path, filename)
-        with open(fpath, "w") as output_handler:
-            to_save = {"input": self.input, "output": self.output}
-            jsonpickle.set_encoder_options("json", sort_keys=True, indent=4)
-            output_handler.write(jsonpickle.encode(to_save))  # type: ignore
+        with record_phase("io"):
+            encoder = _RegistryEncoder()
+            to_save = {
+                "format": IO_REGISTRY_FORMAT,
+                "version": IO_REGISTRY_VERSION,
+                "input": encoder.encode(self.input),
+                "output": encoder.encode(self.output),
+                }
+            # tables are complete only after encoding input and output
+            to_save["tables"] = encoder.columns()
+            with open(fpath, "w") as output_handler:
+                json.dump(to_save, output_handler, separators=(",", ":"))
         return fpath
 
     def load(self, filename: FilePath) -> None:
-        """Load the content of a given IO filename."""
+        """
+        Load the content of a given IO filename.
+
+        `input` and `output` are decoded only when first accessed. Files
+        written with `jsonpickle` by previous versions are also read.
+        """
         with open(filename) as json_file:
-            content = jsonpickle.decode(json_file.read())
+            text = json_file.read()
+        content = json.loads(text)
+        if content.get("format") != IO_REGISTRY_FORMAT:
+            content = jsonpickle.decode(text)
             self.input = content["input"]  # type: ignore
             self.output = content["output"]  # type: ignore
+            return
+
+        decoder = _RegistryDecoder(content["tables"])
+        self._pending = {
+            "input": lambda: decoder.decode(content["input"]),
+            "output": lambda: decoder.decode(content["output"]),
+            }
 
     def retrieve_models(
         self, crossdock: bool = False, individualize: bool = False
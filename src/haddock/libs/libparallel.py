@@ -1,9 +1,12 @@
 """Module in charge of parallelizing the execution of tasks."""
 import math
-from multiprocessing import Process
+import os
+import queue
+from multiprocessing import Process, Queue
 
 from haddock import log
 from haddock.core.typing import (
+    Any,
     AnyT,
     FilePath,
     Generator,
@@ -12,9 +15,22 @@ from haddock.core.typing import (
     SupportsRunT,
     Union,
     )
+from haddock.libs.libtimer import (
+    get_task_usage,
+    get_usage,
+    record_phase,
+    record_task,
+    )
 from haddock.libs.libutil import parse_ncores
 
 
+_SHARED_DATA: dict[str, Any] = {}
+"""Read-only data shared with the workers, see :py:func:`share_data`."""
+
+_ACTIVE_POOL: Optional["WorkerPool"] = None
+"""The :py:class:`WorkerPool` in use, if any."""
+
+
 def split_tasks(lst: Sequence[AnyT],
                 n: int) -> Generator[Sequence[AnyT], None, None]:
     """Split tasks into N-sized chunks."""
@@ -39,13 +55,319 @@ class Worker(Process):
         log.debug(f"{self.name} executed")
 
 
+class QueueWorker(Process):
+    """
+    Work on tasks pulled from a shared queue.
+
+    Instead of receiving a fixed chunk of tasks, the worker pulls chunks
+    of task indexes from `task_queue` until it finds the `None`
+    sentinel. The index of each task is put in `done_queue` as soon as
+    the task finishes, so the parent process can report progress. If
+    `return_results` is `True`, the value returned by the `run()` method
+    of the task is sent along with its index. The resources used by the
+    task are always sent, see :py:func:`haddock.libs.libtimer.get_usage`.
+    """
+
+    def __init__(
+            self,
+            tasks: Sequence[SupportsRunT],
+            task_queue: Queue,
+            done_queue: Queue,
+            return_results: bool = False,
+            ) -> None:
+        super(QueueWorker, self).__init__()
+        self.tasks = tasks
+        self.task_queue = task_queue
+        self.done_queue = done_queue
+        self.return_results = return_results
+        log.debug("QueueWorker ready")
+
+    def run(self) -> None:
+        """Execute tasks until the queue is exhausted."""
+        while True:
+            chunk = self.task_queue.get()
+            if chunk is None:
+                break
+            for idx in chunk:
+                task = self.tasks[idx]
+                start = get_usage()
+                try:
+                    result = task.run()
+                except Exception as err:
+                    log.error(f"Task {idx} failed in {self.name}: {err}")
+                    usage = get_task_usage(task, start)
+                    self.done_queue.put((idx, False, None, usage))
+                else:
+                    if not self.return_results:
+                        result = None
+                    usage = get_task_usage(task, start)
+                    self.done_queue.put((idx, True, result, usage))
+        log.debug(f"{self.name} executed")
+
+
+class PoolWorker(Process):
+    """
+    Long-lived worker of a :py:class:`WorkerPool`.
+
+    The worker reads messages from its own `inbox` until it finds the
+    `None` sentinel. Messages either share data with the worker or ask
+    it to run a chunk of tasks, in which case the outcome of each task is
+    put in `done_queue` once the chunk finishes.
+    """
+
+    def __init__(
+            self,
+            worker_idx: int,
+            inbox: Queue,
+            done_queue: Queue,
+            ) -> None:
+        super(PoolWorker, self).__init__()
+        self.worker_idx = worker_idx
+        self.inbox = inbox
+        self.done_queue = done_queue
+
+    def run(self) -> None:
+        """Process messages until the pool is closed."""
+        while True:
+            message = self.inbox.get()
+            if message is None:
+                break
+            action, payload = message
+            if action == "share":
+                key, value = payload
+                _SHARED_DATA[key] = value
+            elif action == "unshare":
+                _SHARED_DATA.pop(payload, None)
+            elif action == "run":
+                cwd, chunk, return_results = payload
+                # steps run in their own folder, follow the parent
+                os.chdir(cwd)
+                outcome: list[tuple[int, bool, Any, dict[str, Any]]] = []
+                for idx, task in chunk:
+                    start = get_usage()
+                    try:
+                        result = task.run()
+                    except Exception as err:
+                        log.error(f"Task {idx} failed in {self.name}: {err}")
+                        usage = get_task_usage(task, start)
+                        outcome.append((idx, False, None, usage))
+                    else:
+                        if not return_results:
+                            result = None
+                        usage = get_task_usage(task, start)
+                        outcome.append((idx, True, result, usage))
+                self.done_queue.put((self.worker_idx, outcome))
+        log.debug(f"{self.name} closed")
+
+
+class WorkerPool:
+    """
+    Pool of long-lived worker processes.
+
+    The workers are started once and reused by every
+    :py:class:`Scheduler` running while the pool is active, so that
+    several workflow steps do not pay the cost of starting processes and
+    importing modules again. Tasks are pickled and sent to the workers
+    in chunks. Use the pool as a context manager to activate it::
+
+        with WorkerPool(ncores=4):
+            Scheduler(tasks).run()
+    """
+
+    def __init__(
+            self,
+            ncores: Optional[int] = None,
+            max_cpus: bool = False,
+            ) -> None:
+        """
+        Start the worker processes.
+
+        Parameters
+        ----------
+        ncores : None or int
+            The number of workers. If `None` is given uses the maximum
+            number of CPUs allowed by `libs.libututil.parse_ncores`.
+
+        max_cpus : bool
+            Whether to allow the use of all available CPUs.
+        """
+        self.num_processes = parse_ncores(ncores, max_cpus=max_cpus)
+        self.done_queue: Queue = Queue()
+        self.inboxes: list[Queue] = [
+            Queue() for _ in range(self.num_processes)
+            ]
+        self.worker_list = [
+            PoolWorker(i, inbox, self.done_queue)
+            for i, inbox in enumerate(self.inboxes)
+            ]
+        # data shared before the pool started is sent to the workers
+        for key, value in _SHARED_DATA.items():
+            self.share(key, value)
+        for worker in self.worker_list:
+            worker.start()
+        log.info(f"Started a pool of {self.num_processes} workers")
+
+    def __enter__(self) -> "WorkerPool":
+        global _ACTIVE_POOL
+        _ACTIVE_POOL = self
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        global _ACTIVE_POOL
+        _ACTIVE_POOL = None
+        if exc[0] is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def share(self, key: str, value: Any) -> None:
+        """Send read-only data to all workers."""
+        for inbox in self.inboxes:
+            inbox.put(("share", (key, value)))
+
+    def unshare(self, key: str) -> None:
+        """Remove shared data from all workers."""
+        for inbox in self.inboxes:
+            inbox.put(("unshare", key))
+
+    def run(
+            self,
+            tasks: Sequence[SupportsRunT],
+            nworkers: Optional[int] = None,
+            chunksize: int = 1,
+            return_results: bool = False,
+            ) -> Generator[tuple[int, bool, Any, dict[str, Any]], None, None]:
+        """
+        Run tasks in the workers of the pool.
+
+        Chunks are dispatched to a worker as soon as it finishes the
+        previous one.
+
+        Parameters
+        ----------
+        tasks : list
+            The tasks to run. Tasks must have method `run()` and be
+            picklable.
+
+        nworkers : None or int
+            Use at most this number of workers. Defaults to all.
+
+        chunksize : int
+            Number of tasks sent to a worker at once.
+
+        return_results : bool
+            Whether to send back the values returned by the tasks.
+
+        Yields
+        ------
+        tuple
+            The index of the task, whether it succeeded, its result and
+            the resources it used, as tasks finish.
+        """
+        nworkers = min(nworkers or self.num_processes, self.num_processes)
+        cwd = os.getcwd()
+        chunks = [
+            [(idx, tasks[idx]) for idx in range(j, j + chunksize)
+             if idx < len(tasks)]
+            for j in range(0, len(tasks), chunksize)
+            ]
+        chunks.reverse()
+        pending = [0] * nworkers
+
+        def dispatch(worker_idx: int) -> None:
+            if chunks:
+                message = ("run", (cwd, chunks.pop(), return_results))
+                self.inboxes[worker_idx].put(message)
+                pending[worker_idx] += 1
+
+        # two chunks per worker so that it never waits for the next one
+        for _ in range(2):
+            for worker_idx in range(nworkers):
+                dispatch(worker_idx)
+
+        while any(pending):
+            try:
+                worker_idx, outcome = self.done_queue.get(timeout=1)
+            except queue.Empty:
+                dead = [
+                    w for w, n in zip(self.worker_list, pending)
+                    if n and not w.is_alive()
+                    ]
+                if dead:
+                    log.warning(
+                        f"{len(dead)} workers of the pool died, "
+                        "not all tasks were completed"
+                        )
+                    break
+                continue
+
+            pending[worker_idx] -= 1
+            dispatch(worker_idx)
+            yield from outcome
+
+    def close(self) -> None:
+        """Stop the workers once they finish their work."""
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for worker in self.worker_list:
+            worker.join()
+        log.debug("Worker pool closed")
+
+    def terminate(self) -> None:
+        """Terminate the workers immediately."""
+        for worker in self.worker_list:
+            worker.terminate()
+        log.info("The pool workers terminated in a controlled way")
+
+
+def get_active_pool() -> Optional[WorkerPool]:
+    """Get the :py:class:`WorkerPool` in use, if any."""
+    return _ACTIVE_POOL
+
+
+def share_data(key: str, value: Any) -> None:
+    """
+    Share read-only data with the workers.
+
+    The data is kept in this process and sent once to the workers of the
+    active :py:class:`WorkerPool`, if any. Processes started afterwards
+    by a :py:class:`Scheduler` inherit it. Tasks read it with
+    :py:func:`get_shared_data` instead of carrying their own copy.
+
+    Parameters
+    ----------
+    key : str
+        The name of the data.
+    value : Any
+        The data. It must be picklable to be sent to a pool.
+    """
+    _SHARED_DATA[key] = value
+    if _ACTIVE_POOL is not None:
+        _ACTIVE_POOL.share(key, value)
+
+
+def unshare_data(key: str) -> None:
+    """Remove data shared with :py:func:`share_data`."""
+    _SHARED_DATA.pop(key, None)
+    if _ACTIVE_POOL is not None:
+        _ACTIVE_POOL.unshare(key)
+
+
+def get_shared_data(key: str) -> Any:
+    """Get data shared with :py:func:`share_data`."""
+    return _SHARED_DATA[key]
+
+
 class Scheduler:
     """Schedules tasks to run in multiprocessing."""
 
     def __init__(self,
                  tasks: list[SupportsRunT],
                  ncores: Optional[int] = None,
-                 max_cpus: bool = False) -> None:
+                 max_cpus: bool = False,
+                 dynamic: bool = True,
+                 chunksize: Optional[int] = 1,
+                 return_results: bool = False) -> None:
         """
         Schedule tasks to a defined number of processes.
 
@@ -58,10 +380,42 @@ class Scheduler:
             The number of cores to use. If `None` is given uses the
             maximum number of CPUs allowed by
             `libs.libututil.parse_ncores` function.
+
+        max_cpus : bool
+            Whether to allow the use of all available CPUs.
+
+        dynamic : bool
+            If `True` (default), workers pull tasks from a shared queue
+            as they become free, so a slow task does not stall the
+            others. If `False`, tasks are split into `ncores` contiguous
+            chunks up front, one per worker.
+
+        chunksize : None or int
+            Number of tasks a worker pulls from the queue at once in
+            `dynamic` mode. Larger values reduce queue traffic for many
+            short tasks. If `None`, about four chunks per worker are
+            created. Defaults to 1.
+
+        return_results : bool
+            Whether to send the values returned by the `run()` method of
+            the tasks back to the parent process, where they are stored
+            in `results`, in the order of `tasks`. Returned values must
+            be picklable. Only available in `dynamic` mode.
+
+        In `dynamic` mode, tasks run in the active :py:class:`WorkerPool`
+        if there is one, instead of in new processes.
         """
+        if return_results and not dynamic:
+            raise ValueError("`return_results` requires `dynamic` mode.")
         self.max_cpus = max_cpus
+        self.dynamic = dynamic
+        self.return_results = return_results
         self.num_tasks = len(tasks)
         self.num_processes = ncores  # first parses num_cores
+        if chunksize is None:
+            chunksize = self.num_tasks // (4 * self.num_processes)
+        self.chunksize = max(1, chunksize)
+        self.results: list[Any] = [None] * self.num_tasks
 
         # Sort the tasks by input_file name and its length,
         #  so we know that 2 comes before 10
@@ -79,8 +433,25 @@ class Scheduler:
             idx = e[0]
             sorted_task_list.append(tasks[idx])
 
-        job_list = split_tasks(sorted_task_list, self.num_processes)
-        self.worker_list = [Worker(jobs) for jobs in job_list]
+        self.task_list = sorted_task_list
+        self.pool = get_active_pool() if self.dynamic else None
+        if self.pool is not None:
+            self.worker_list = []
+        elif self.dynamic:
+            self.task_queue: Queue = Queue()
+            self.done_queue: Queue = Queue()
+            self.worker_list = [
+                QueueWorker(
+                    self.task_list,
+                    self.task_queue,
+                    self.done_queue,
+                    return_results=self.return_results,
+                    )
+                for _ in range(self.num_processes)
+                ]
+        else:
+            job_list = split_tasks(sorted_task_list, self.num_processes)
+            self.worker_list = [Worker(jobs) for jobs in job_list]
 
         log.info(f"Using {self.num_processes} cores")
         log.debug(f"{self.num_tasks} tasks ready.")
@@ -102,28 +473,13 @@ class Scheduler:
     def run(self) -> None:
         """Run tasks in parallel."""
         try:
-            for worker in self.worker_list:
-                # Start the worker
-                worker.start()
-
-            c = 1
-            for worker in self.worker_list:
-                # Wait for the worker to finish
-                worker.join()
-                for t in worker.tasks:
-                    per = (c / float(self.num_tasks)) * 100
-                    try:
-                        task_ident = (
-                            f'{t.input_file.parents[0].name}/'
-                            f'{t.input_file.name}'
-                            )
-                    except AttributeError:
-                        task_ident = (
-                            f'{t.output.parents[0].name}/'
-                            f'{t.output.name}'
-                            )
-                    log.info(f'>> {task_ident} completed {per:.0f}% ')
-                    c += 1
+            with record_phase("execution"):
+                if self.pool is not None:
+                    self._run_pool()
+                elif self.dynamic:
+                    self._run_dynamic()
+                else:
+                    self._run_static()
 
             log.info(f"{self.num_tasks} tasks finished")
 
@@ -136,8 +492,117 @@ class Scheduler:
             # whichever has to catch it
             raise err
 
+    def _run_static(self) -> None:
+        """Run pre-split chunks of tasks, one chunk per worker."""
+        for worker in self.worker_list:
+            # Start the worker
+            worker.start()
+        start = get_usage()
+
+        c = 1
+        for worker in self.worker_list:
+            # Wait for the worker to finish
+            worker.join()
+            # the tasks of the worker are only known to be done now
+            record_task({
+                "task": worker.name,
+                "ntasks": len(worker.tasks),
+                "pid": worker.pid,
+                "start": start["wall"],
+                "wall": get_usage()["wall"] - start["wall"],
+                })
+            for t in worker.tasks:
+                self._log_progress(t, c)
+                c += 1
+
+    def _run_pool(self) -> None:
+        """Run tasks in the workers of the active pool."""
+        outcomes = self.pool.run(  # type: ignore
+            self.task_list,
+            nworkers=self.num_processes,
+            chunksize=self.chunksize,
+            return_results=self.return_results,
+            )
+        for c, (idx, success, result, usage) in enumerate(outcomes, start=1):
+            self.results[idx] = result
+            self._record_task(self.task_list[idx], success, usage)
+            self._log_progress(self.task_list[idx], c, success)
+
+    def _run_dynamic(self) -> None:
+        """Run tasks pulled from a shared queue by the workers."""
+        for j in range(0, self.num_tasks, self.chunksize):
+            self.task_queue.put(
+                list(range(j, min(j + self.chunksize, self.num_tasks)))
+                )
+        # one sentinel per worker, signalling there is no more work
+        for _ in self.worker_list:
+            self.task_queue.put(None)
+
+        for worker in self.worker_list:
+            worker.start()
+
+        c = 1
+        while c <= self.num_tasks:
+            try:
+                idx, success, result, usage = self.done_queue.get(timeout=1)
+            except queue.Empty:
+                # a worker may have died without reporting its tasks
+                if not any(w.is_alive() for w in self.worker_list):
+                    log.warning(
+                        f"{self.num_tasks - c + 1} tasks were not "
+                        "reported as completed"
+                        )
+                    break
+                continue
+
+            self.results[idx] = result
+            self._record_task(self.task_list[idx], success, usage)
+            self._log_progress(self.task_list[idx], c, success)
+            c += 1
+
+        for worker in self.worker_list:
+            worker.join()
+
+    @staticmethod
+    def _task_ident(task: SupportsRunT) -> str:
+        """Identify a task by its input file, or its output."""
+        try:
+            return (
+                f'{task.input_file.parents[0].name}/'
+                f'{task.input_file.name}'
+                )
+        except AttributeError:
+            return (
+                f'{task.output.parents[0].name}/'
+                f'{task.output.name}'
+                )
+
+    def _record_task(
+            self,
+            task: SupportsRunT,
+            success: bool,
+            usage: dict[str, Any],
+            ) -> None:
+        """Record the resources used by a task."""
+        record_task({"task": self._task_ident(task), "success": success,
+                     **usage})
+
+    def _log_progress(
+            self,
+            task: SupportsRunT,
+            count: int,
+            success: bool = True,
+            ) -> None:
+        """Log the completion of a task."""
+        per = (count / float(self.num_tasks)) * 100
+        task_ident = self._task_ident(task)
+        status = "completed" if success else "failed"
+        log.info(f'>> {task_ident} {status} {per:.0f}% ')
+
     def terminate(self) -> None:
         """Terminate tasks in a controlled way."""
+        if self.pool is not None:
+            self.pool.terminate()
         for worker in self.worker_list:
             worker.terminate()
 
@@ -4,10 +4,12 @@ import shlex
 import subprocess
 from contextlib import suppress
 from pathlib import Path
+from time import time
 
 from haddock.core.defaults import cns_exec as global_cns_exec
 from haddock.core.exceptions import CNSRunningError, JobRunningError
 from haddock.core.typing import Any, FilePath, Optional, ParamDict
+from haddock.gear.haddockmodel import read_energies
 from haddock.libs.libio import gzip_files
 
 
@@ -93,6 +95,7 @@ class CNSJob:
             output_file: FilePath,
             envvars: Optional[ParamDict] = None,
             cns_exec: Optional[FilePath] = None,
+            output_pdbs: Optional[list[FilePath]] = None,
             ) -> None:
         """
         CNS subprocess.
@@ -112,11 +115,18 @@ class CNSJob:
             A dictionary containing the environment variables needed for
             the CNSJob. These will be passed to subprocess.Popen.env
             argument.
+
+        output_pdbs : list of str or pathlib.Path, optional
+            The PDB files written by the job. Their energies are read
+            right after the run, see :py:meth:`CNSJob.run`.
         """
         self.input_file = input_file
         self.output_file = output_file
         self.envvars = envvars
         self.cns_exec = cns_exec
+        self.output_pdbs = output_pdbs or []
+        # wall time of the phases of the last run, in seconds
+        self.timings: dict[str, float] = {}
 
     def __repr__(self) -> str:
         return (
@@ -166,7 +176,7 @@ class CNSJob:
             compress_inp: bool = False,
             compress_out: bool = True,
             compress_seed: bool = False,
-            ) -> bytes:
+            ) -> dict[str, dict[str, float]]:
         """
         Run this CNS job script.
 
@@ -183,7 +193,15 @@ class CNSJob:
         compress_seed : bool
             Compress the *.seed file to '.gz' after the run. Defaults to
             ``False``.
+
+        Returns
+        -------
+        dict
+            The energies of the `output_pdbs` generated by the run, keyed
+            by file name. Reading them here lets the workers of the
+            engine parse the energies in parallel.
         """
+        start = time()
         with open(self.input_file) as inp, \
                 open(self.output_file, 'w+') as outf:
 
@@ -196,8 +214,9 @@ class CNSJob:
                 env=self.envvars,
                 )
 
-            out, error = p.communicate()
+            _, error = p.communicate()
             p.kill()
+        cns_end = time()
 
         if compress_inp:
             gzip_files(self.input_file, remove_original=True)
@@ -211,7 +230,19 @@ class CNSJob:
                     Path(Path(self.output_file).stem).with_suffix('.seed'),
                     remove_original=True)
 
+        compress_end = time()
+        self.timings = {
+            "cns": cns_end - start,
+            "compress": compress_end - cns_end,
+            }
+
         if error:
             raise CNSRunningError(error)
 
-        return out
+        energies = {
+            str(pdb_f): read_energies(pdb_f)
+            for pdb_f in self.output_pdbs
+            if Path(pdb_f).exists()
+            }
+        self.timings["energies"] = time() - compress_end
+        return energies
@@ -1,11 +1,36 @@
-"""Tools related to timing functions."""
+"""
+Tools related to timing functions.
+
+Besides logging elapsed times, this module records the resources used by
+the workflow steps. While a :py:class:`Telemetry` is active, the phases
+of the step (:py:func:`record_phase`) and the tasks run by the engines
+(:py:func:`record_task`) are recorded and then saved to the
+``timings.json`` file of the step folder.
+"""
+import json
+import os
+import resource
+import sys
 from contextlib import contextmanager
+from pathlib import Path
 from time import time
-from typing import Generator
+from typing import Any, Generator, Iterable, Optional, Union
 
 from haddock import log
 
 
+TIMINGS_FNAME = "timings.json"
+"""Name of the files where the telemetry is saved."""
+
+_ACTIVE_TELEMETRY: Optional["Telemetry"] = None
+"""The :py:class:`Telemetry` recording, if any."""
+
+# `ru_maxrss` is given in kilobytes in Linux and in bytes in macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+# `ru_inblock` and `ru_oublock` count blocks of 512 bytes
+_BLOCK_SIZE = 512
+
+
 @contextmanager
 def log_time(pre_msg: str) -> Generator[None, None, None]:
     """
@@ -73,3 +98,259 @@ def convert_seconds_to_min_sec(seconds: float) -> str:
 
     s = "" if seconds == 1 else "s"
     return f"{seconds} seconds"
+
+
+def get_usage() -> dict[str, float]:
+    """
+    Get the resources used so far by this process and its children.
+
+    Only children that have finished are accounted, this is the case of
+    the CNS processes run by the tasks.
+
+    Returns
+    -------
+    dict
+        * ``wall``: the current time, in seconds since the epoch.
+        * ``cpu``: user and system CPU time, in seconds.
+        * ``max_rss``: peak resident set size of the process or of its
+          largest child, in bytes.
+        * ``read_bytes`` and ``write_bytes``: volume of the block I/O.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "wall": time(),
+        "cpu": own.ru_utime + own.ru_stime
+        + children.ru_utime + children.ru_stime,
+        "max_rss": max(own.ru_maxrss, children.ru_maxrss) * _RSS_UNIT,
+        "read_bytes": (own.ru_inblock + children.ru_inblock) * _BLOCK_SIZE,
+        "write_bytes": (own.ru_oublock + children.ru_oublock) * _BLOCK_SIZE,
+        }
+
+
+def get_usage_since(start: dict[str, float]) -> dict[str, float]:
+    """
+    Get the resources used since `start`, given by :py:func:`get_usage`.
+
+    The peak RSS is not a difference but the peak reached so far.
+    """
+    end = get_usage()
+    return {
+        "start": start["wall"],
+        "wall": end["wall"] - start["wall"],
+        "cpu": end["cpu"] - start["cpu"],
+        "max_rss": end["max_rss"],
+        "read_bytes": end["read_bytes"] - start["read_bytes"],
+        "write_bytes": end["write_bytes"] - start["write_bytes"],
+        }
+
+
+def get_task_usage(task: Any, start: dict[str, float]) -> dict[str, Any]:
+    """
+    Get the resources used by a task in a worker process.
+
+    Parameters
+    ----------
+    task : Any
+        The task, once run. If the task sets a `timings` attribute, a
+        dictionary of the wall time of its own phases, it is included.
+    start : dict
+        The usage before running the task, see :py:func:`get_usage`.
+
+    Returns
+    -------
+    dict
+        The usage since `start` and the PID of the worker.
+    """
+    usage: dict[str, Any] = get_usage_since(start)
+    usage["pid"] = os.getpid()
+    timings = getattr(task, "timings", None)
+    if timings:
+        usage["phases"] = timings
+    return usage
+
+
+class Telemetry:
+    """
+    Record the resources used by a workflow step.
+
+    Use it as a context manager to activate it, it records the whole
+    step as the ``step`` phase::
+
+        with Telemetry("1_rigidbody") as telemetry:
+            with record_phase("execution"):
+                Scheduler(tasks).run()
+        telemetry.save(Path("1_rigidbody", TIMINGS_FNAME))
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.phases: list[dict[str, Any]] = []
+        self.tasks: list[dict[str, Any]] = []
+        self._step_usage: Optional[dict[str, float]] = None
+
+    def __enter__(self) -> "Telemetry":
+        global _ACTIVE_TELEMETRY
+        _ACTIVE_TELEMETRY = self
+        self._step_usage = get_usage()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        global _ACTIVE_TELEMETRY
+        _ACTIVE_TELEMETRY = None
+        if self._step_usage is not None:
+            self.phases.append({
+                "name": "step",
+                **get_usage_since(self._step_usage),
+                })
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        """Record the resources used by the code under the context."""
+        start = get_usage()
+        try:
+            yield
+        finally:
+            self.phases.append({"name": name, **get_usage_since(start)})
+
+    def add_task(self, record: dict[str, Any]) -> None:
+        """Add the usage of a task."""
+        self.tasks.append(record)
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Summarize the phases and tasks recorded.
+
+        Returns
+        -------
+        dict
+            The total wall and CPU time of each phase name, the time
+            spent before, in and after the ``execution`` phases, the peak
+            RSS, the statistics of the task wall times and the busy and
+            idle time of each worker process during the ``execution``
+            phases.
+        """
+        phases: dict[str, dict[str, float]] = {}
+        for phase in self.phases:
+            total = phases.setdefault(
+                phase["name"],
+                {"count": 0, "wall": 0.0, "cpu": 0.0},
+                )
+            total["count"] += 1
+            total["wall"] += phase["wall"]
+            total["cpu"] += phase["cpu"]
+
+        max_rss = [record["max_rss"] for record in self.phases + self.tasks
+                   if "max_rss" in record]
+        task_walls = [task["wall"] for task in self.tasks if "wall" in task]
+        busy: dict[str, float] = {}
+        for task in self.tasks:
+            if "pid" in task:
+                busy[str(task["pid"])] = (
+                    busy.get(str(task["pid"]), 0.0) + task["wall"]
+                    )
+        execution_wall = phases.get("execution", {}).get("wall", 0.0)
+
+        # time spent before the first and after the last engine run,
+        # preparing the jobs and processing their results
+        breakdown: dict[str, float] = {}
+        executions = [p for p in self.phases if p["name"] == "execution"]
+        steps = [p for p in self.phases if p["name"] == "step"]
+        if executions and steps:
+            step_end = steps[-1]["start"] + steps[-1]["wall"]
+            breakdown = {
+                "preparation": executions[0]["start"] - steps[-1]["start"],
+                "execution": execution_wall,
+                "post_execution": step_end - max(
+                    p["start"] + p["wall"] for p in executions
+                    ),
+                }
+
+        return {
+            "name": self.name,
+            "phases": phases,
+            "breakdown": breakdown,
+            "max_rss": max(max_rss, default=0),
+            "tasks": {
+                "count": len(self.tasks),
+                "failed": sum(not t.get("success", True) for t in self.tasks),
+                "wall_total": sum(task_walls),
+                "wall_mean": sum(task_walls) / max(len(task_walls), 1),
+                "wall_max": max(task_walls, default=0.0),
+                },
+            "workers": {
+                pid: {"busy": wall, "idle": max(execution_wall - wall, 0.0)}
+                for pid, wall in busy.items()
+                },
+            }
+
+    def save(self, fname: Path) -> Path:
+        """Save the summary, phases and tasks to a JSON file."""
+        content = {
+            "summary": self.summary(),
+            "phases": self.phases,
+            "tasks": self.tasks,
+            }
+        Path(fname).write_text(json.dumps(content, separators=(",", ":")))
+        return Path(fname)
+
+
+def get_active_telemetry() -> Optional[Telemetry]:
+    """Get the :py:class:`Telemetry` recording, if any."""
+    return _ACTIVE_TELEMETRY
+
+
+@contextmanager
+def record_phase(name: str) -> Generator[None, None, None]:
+    """Record a phase of the step, if a :py:class:`Telemetry` is active."""
+    if _ACTIVE_TELEMETRY is None:
+        yield
+    else:
+        with _ACTIVE_TELEMETRY.phase(name):
+            yield
+
+
+def record_task(record: dict[str, Any]) -> None:
+    """Record a task, if a :py:class:`Telemetry` is active."""
+    if _ACTIVE_TELEMETRY is not None:
+        _ACTIVE_TELEMETRY.add_task(record)
+
+
+def write_run_summary(
+        step_folders: Iterable[Union[str, Path]],
+        fname: Path = Path(TIMINGS_FNAME),
+        ) -> Optional[Path]:
+    """
+    Gather the summaries of the steps into a run-level file.
+
+    Parameters
+    ----------
+    step_folders : list of str or pathlib.Path
+        The step folders. Those without telemetry are skipped, for
+        example steps run before a restart with an older version.
+    fname : pathlib.Path
+        The file to write.
+
+    Returns
+    -------
+    pathlib.Path or None
+        The file written, `None` if no step had telemetry.
+    """
+    steps = []
+    for folder in step_folders:
+        step_f = Path(folder, TIMINGS_FNAME)
+        if step_f.exists():
+            steps.append(json.loads(step_f.read_text())["summary"])
+    if not steps:
+        return None
+
+    content = {
+        "wall": sum(s["phases"].get("step", {}).get("wall", 0.0)
+                    for s in steps),
+        "cpu": sum(s["phases"].get("step", {}).get("cpu", 0.0)
+                   for s in steps),
+        "max_rss": max(s["max_rss"] for s in steps),
+        "steps": steps,
+        }
+    fname.write_text(json.dumps(content, indent=2))
+    return fname
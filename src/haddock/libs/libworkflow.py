@@ -1,6 +1,7 @@
 """HADDOCK3 workflow logic."""
 import importlib
 import sys
+from contextlib import nullcontext
 from pathlib import Path
 from time import time
 
@@ -8,18 +9,54 @@ from haddock import log
 from haddock.clis.cli_analyse import main as cli_analyse
 from haddock.clis.cli_traceback import main as cli_traceback
 from haddock.core.exceptions import HaddockError, HaddockTermination, StepError
-from haddock.core.typing import Any, ModuleParams, Optional
+from haddock.core.typing import (
+    Any,
+    ContextManager,
+    ModuleParams,
+    Optional,
+    ParamMap,
+)
 from haddock.gear.clean_steps import clean_output
 from haddock.gear.config import get_module_name
 from haddock.gear.zerofill import zero_fill
-from haddock.libs.libtimer import convert_seconds_to_min_sec, log_time
+from haddock.libs.libalign import remove_structure_store
+from haddock.libs.libparallel import WorkerPool
+from haddock.libs.libtimer import (
+    TIMINGS_FNAME,
+    Telemetry,
+    convert_seconds_to_min_sec,
+    log_time,
+    write_run_summary,
+)
 from haddock.libs.libutil import recursive_dict_update
 from haddock.modules import (
+    get_module_steps_folders,
     modules_category,
     non_mandatory_general_parameters_defaults,
 )
 
 
+def get_worker_pool(params: ParamMap) -> ContextManager[Optional[WorkerPool]]:
+    """
+    Get the persistent worker pool requested by the general parameters.
+
+    Parameters
+    ----------
+    params : dict
+        The general parameters of the workflow.
+
+    Returns
+    -------
+    :py:class:`haddock.libs.libparallel.WorkerPool` or nullcontext
+        The pool to use as context manager while running the steps, or
+        an empty context if `persistent_pool` is not set.
+    """
+    params = {**non_mandatory_general_parameters_defaults, **params}
+    if not params["persistent_pool"]:
+        return nullcontext()
+    return WorkerPool(ncores=params["ncores"], max_cpus=params["max_cpus"])
+
+
 class WorkflowManager:
     """Read and execute workflows."""
 
@@ -31,6 +68,7 @@ class WorkflowManager:
     ) -> None:
         self.start = 0 if start is None else start
         self.recipe = Workflow(workflow_params, start=0, **other_params)
+        self.general_params = other_params
         # terminate is used to synchronize the `clean` option with the
         # `exit` module. If the `exit` module is removed in the future,
         # you can also remove and clean the `terminate` part here.
@@ -38,12 +76,19 @@ class WorkflowManager:
 
     def run(self) -> None:
         """High level workflow composer."""
-        for i, step in enumerate(self.recipe.steps[self.start :], start=self.start):
-            try:
-                step.execute()
-            except HaddockTermination:
-                self._terminated = i  # type: ignore
-                break
+        try:
+            with get_worker_pool(self.general_params):
+                steps = self.recipe.steps[self.start :]
+                for i, step in enumerate(steps, start=self.start):
+                    try:
+                        step.execute()
+                    except HaddockTermination:
+                        self._terminated = i  # type: ignore
+                        break
+        finally:
+            remove_structure_store(Path.cwd())
+        # steps executed before a restart are summarized too
+        write_run_summary(get_module_steps_folders(Path.cwd()))
 
     def clean(self, terminated: Optional[int] = None) -> None:
         """
@@ -144,9 +189,12 @@ class Step:
         # Run module
         start = time()
         try:
-            self.module.update_params(**self.config)  # type: ignore
-            self.module.save_config(Path(self.working_path, "params.cfg"))  # type: ignore
-            self.module.run()  # type: ignore
+            with Telemetry(self.working_path.name) as telemetry:
+                self.module.update_params(**self.config)  # type: ignore
+                self.module.save_config(  # type: ignore
+                    Path(self.working_path, "params.cfg")
+                )
+                self.module.run()  # type: ignore
         except KeyboardInterrupt:
             log.info("You have halted subprocess execution by hitting Ctrl+c")
             log.info("Exiting...")
@@ -155,6 +203,7 @@ class Step:
         end = time()
         elapsed = convert_seconds_to_min_sec(end - start)
         self.module.log(f"took {elapsed}")  # type: ignore
+        telemetry.save(Path(self.working_path, TIMINGS_FNAME))
 
     def clean(self) -> None:
         """Clean step output."""
@@ -29,7 +29,7 @@ from haddock.libs.libio import folder_exists, working_directory
 from haddock.libs.libmpi import MPIScheduler
 from haddock.libs.libontology import ModuleIO, PDBFile
 from haddock.libs.libparallel import Scheduler
-from haddock.libs.libtimer import log_time
+from haddock.libs.libtimer import log_time, record_phase
 from haddock.libs.libutil import recursive_dict_update
 
 
@@ -277,19 +277,20 @@ class BaseHaddockModule(ABC):
         """
         self.output_models: Union[list[PDBFile], dict[int, PDBFile]]
         assert self.output_models, "`self.output_models` cannot be empty."
-        io = ModuleIO()
-        # add the input models
-        io.add(self.previous_io.output, "i")
-        # add the output models
-        io.add(self.output_models, "o")
-        faulty = io.check_faulty()
-        if faulty > faulty_tolerance:
-            _msg = (
-                f"{faulty:.2f}% of output was not generated for this module "
-                f"and tolerance was set to {faulty_tolerance:.2f}%."
-            )
-            self.finish_with_error(_msg)
-        io.save()
+        with record_phase("export"):
+            io = ModuleIO()
+            # add the input models
+            io.add(self.previous_io.output, "i")
+            # add the output models
+            io.add(self.output_models, "o")
+            faulty = io.check_faulty()
+            if faulty > faulty_tolerance:
+                _msg = (
+                    f"{faulty:.2f}% of output was not generated for this "
+                    f"module and tolerance was set to {faulty_tolerance:.2f}%."
+                )
+                self.finish_with_error(_msg)
+            io.save()
 
     def finish_with_error(self, reason: object = "Module has failed.") -> None:
         """Finish with error message."""
@@ -380,6 +381,7 @@ def get_engine(
             target_queue=params["queue"],
             queue_limit=params["queue_limit"],
             concat=params["concat"],
+            sliding_window=params["sliding_window"],
         )
 
     elif mode == "local":
@@ -387,6 +389,7 @@ def get_engine(
             Scheduler,
             ncores=params["ncores"],
             max_cpus=params["max_cpus"],
+            return_results=True,
         )
     elif mode == "mpi":
         return partial(MPIScheduler, ncores=params["ncores"])  # type: ignore
@@ -1,14 +1,18 @@
 """Calculate CAPRI metrics."""
+import contextlib
 from pathlib import Path
 
 from haddock.core.typing import Any, FilePath
+from haddock.libs.libalign import shared_structure_store
 from haddock.libs.libparallel import Scheduler
+from haddock.libs.libutil import parse_ncores
 from haddock.modules import BaseHaddockModule
 from haddock.modules.analysis.caprieval.capri import (
     CAPRI,
+    ReferenceProfile,
     capri_cluster_analysis,
-    merge_data,
-    rearrange_ss_capri_output,
+    merge_records,
+    write_ss_capri_output,
     )
 
 
@@ -56,35 +60,60 @@ class HaddockModule(BaseHaddockModule):
                 "Using the structure with the lowest score from previous step")
             reference = best_model_fname
 
-        # Each model is a job; this is not the most efficient way
-        #  but by assigning each model to an individual job
-        #  we can handle scenarios in wich the models are hetergoneous
-        #  for example during CAPRI scoring
-        capri_jobs: list[CAPRI] = []
-        for i, model_to_be_evaluated in enumerate(models, start=1):
-            capri_jobs.append(
-                CAPRI(
-                    identificator=str(i),
-                    model=model_to_be_evaluated,
-                    path=Path("."),
-                    reference=reference,
-                    params=self.params
-                    )
+        # The models are parsed once, in parallel, and shared with the jobs
+        if self.params["structure_store"]:
+            structures = shared_structure_store(
+                [*models, reference],
+                ncores=parse_ncores(
+                    n=self.params["ncores"],
+                    njobs=len(models),
+                    ),
                 )
+        else:
+            structures = contextlib.nullcontext()
 
-        ncores = self.params['ncores']
-        capri_engine = Scheduler(capri_jobs, ncores=ncores)
-        capri_engine.run()
+        with structures:
+            # Reference-only data is computed once and shared by all jobs
+            reference_profile = ReferenceProfile(
+                reference,
+                CAPRI._load_atoms(models[0], reference),
+                )
+            # the alignment of the models sharing the topology of the first one
+            #  is computed here, once, instead of in every job
+            reference_profile.precompute(self.params, model=models[0])
+
+            # Each model is a job; this is not the most efficient way
+            #  but by assigning each model to an individual job
+            #  we can handle scenarios in wich the models are hetergoneous
+            #  for example during CAPRI scoring
+            capri_jobs: list[CAPRI] = []
+            for i, model_to_be_evaluated in enumerate(models, start=1):
+                capri_jobs.append(
+                    CAPRI(
+                        identificator=str(i),
+                        model=model_to_be_evaluated,
+                        path=Path("."),
+                        reference=reference,
+                        params=self.params,
+                        reference_profile=reference_profile,
+                        )
+                    )
 
-        # very ugly way of loading the capri metrics back into
-        #  the CAPRI object, there's definitively a better way
-        #  of doing this
-        capri_jobs = merge_data(capri_jobs)
+            # Workers evaluate chunks of models and send the metrics back,
+            #  no intermediate file is written per model
+            ncores = self.params['ncores']
+            capri_engine = Scheduler(
+                capri_jobs,
+                ncores=ncores,
+                chunksize=None,
+                return_results=True,
+                )
+            capri_engine.run()
 
-        # Each job created one .tsv, unify them:
-        rearrange_ss_capri_output(
+        ss_records = merge_records(capri_jobs, capri_engine.results)
+        write_ss_capri_output(
+            ss_records,
             output_name="capri_ss.tsv",
-            output_count=len(capri_jobs),
             sort_key=self.params["sortby"],
             sort_ascending=self.params["sort_ascending"],
             path=Path(".")
@@ -7,7 +7,7 @@ from pathlib import Path
 
 import numpy as np
 from pdbtools import pdb_segxchain
-from scipy.spatial.distance import cdist
+from scipy.spatial import cKDTree
 from typing import Any
 
 from haddock import log
@@ -27,18 +27,32 @@ from haddock.libs.libalign import (
     centroid,
     get_align,
     get_atoms,
+    get_seq_signature,
     kabsch,
     load_coords,
     make_range,
 )
-from haddock.libs.libio import write_dic_to_file, write_nested_dic_to_file
+from haddock.libs.libio import (
+    format_value,
+    write_dic_to_file,
+    write_nested_dic_to_file,
+)
 from haddock.libs.libontology import PDBFile, PDBPath
 
 
+CONTACT_SEARCH_MARGIN = 1e-6
+"""Extra distance used when searching candidate contacts in `load_contacts`."""
+
+
 def load_contacts(pdb_f, cutoff=5.0, numbering_dic=None, model2ref_chain_dict=None):
     """
     Load residue-based contacts.
 
+    Contacts between each pair of chains are found with a KD-tree, the
+    distances of the candidate atom pairs are then computed exactly as
+    :py:func:`scipy.spatial.distance.cdist` does, so the contact set is
+    identical to an all-against-all distance calculation.
+
     Parameters
     ----------
     pdb_f : PosixPath or :py:class:`haddock.libs.libontology.PDBFile`
@@ -71,27 +85,211 @@ def load_contacts(pdb_f, cutoff=5.0, numbering_dic=None, model2ref_chain_dict=No
             coord_arrays[chain], coord_ids[chain] = [], []  # type: ignore
         coord_arrays[chain].append(ref_coord_dic[atom])  # type: ignore
         coord_ids[chain].append(atom[1])  # only the resid is appended
+    trees: dict[str, cKDTree] = {}
     for chain in coord_arrays.keys():
         coord_arrays[chain] = np.array(coord_arrays[chain])
+        coord_ids[chain] = np.array(coord_ids[chain])  # type: ignore
+        trees[chain] = cKDTree(coord_arrays[chain])
 
     # combinations of chains
     unique_chain_combs = list(combinations(sorted(coord_arrays.keys()), 2))
 
     # calculating contacts
-    for pair in unique_chain_combs:
-        # cycling over each coordinate of the first chain
-        for s in range(coord_arrays[pair[0]].shape[0]):
-            s_xyz = coord_arrays[pair[0]][s].reshape(1, 3)
-            s_cid = coord_ids[pair[0]][s]
-            dist = cdist(s_xyz, coord_arrays[pair[1]])
-            npw = np.where(dist < cutoff)
-            del dist
-            for k in range(npw[0].shape[0]):
-                con = (pair[0], s_cid, pair[1], coord_ids[pair[1]][npw[1][k]])
-                con_list.append(con)
+    for first, second in unique_chain_combs:
+        # candidate pairs, with a margin for rounding differences
+        candidates = trees[first].sparse_distance_matrix(
+            trees[second],
+            cutoff + CONTACT_SEARCH_MARGIN,
+            output_type="ndarray",
+        )
+        first_idx = candidates["i"]
+        second_idx = candidates["j"]
+        diff = coord_arrays[first][first_idx] - coord_arrays[second][second_idx]
+        dist = np.sqrt((diff * diff).sum(axis=1))
+        within = dist < cutoff
+        first_ids = coord_ids[first]
+        second_ids = coord_ids[second]
+        first_resids = first_ids[first_idx[within]].tolist()  # type: ignore
+        second_resids = second_ids[second_idx[within]].tolist()  # type: ignore
+        con_list.extend(
+            (first, first_resid, second, second_resid)
+            for first_resid, second_resid in zip(first_resids, second_resids)
+        )
     return set(con_list)
 
 
+def get_interface_resdic(contacts: Iterable[tuple]) -> dict[str, list[int]]:
+    """
+    Get the residues of each chain involved in a set of contacts.
+
+    Parameters
+    ----------
+    contacts : set
+        Contacts, as given by :py:func:`load_contacts`.
+
+    Returns
+    -------
+    interface_resdic : dict
+        Interface residues (one list per chain).
+    """
+    interface_resdic: dict[str, list[int]] = {}
+    for contact in contacts:
+        first_chain, first_resid, sec_chain, sec_resid = contact
+
+        if first_chain not in interface_resdic:
+            interface_resdic[first_chain] = []
+        if sec_chain not in interface_resdic:
+            interface_resdic[sec_chain] = []
+
+        if first_resid not in interface_resdic[first_chain]:
+            interface_resdic[first_chain].append(first_resid)
+        if sec_resid not in interface_resdic[sec_chain]:
+            interface_resdic[sec_chain].append(sec_resid)
+
+    return interface_resdic
+
+
+class ReferenceProfile:
+    """
+    Reference-only data shared by the CAPRI evaluation of all models.
+
+    Contacts, interfaces and coordinates of the reference are computed on
+    first use and kept, so a profile computed once can be given to every
+    :py:class:`CAPRI` job. Sequence alignments to the reference are kept
+    per model sequence signature, since models sharing a topology align
+    identically.
+    """
+
+    def __init__(self, reference: PDBPath, atoms: AtomsDict) -> None:
+        """
+        Initialize the class.
+
+        Parameters
+        ----------
+        reference : PosixPath or :py:class:`haddock.libs.libontology.PDBFile`
+            The reference structure.
+        atoms : dict
+            Dictionary of atoms used to load the reference coordinates.
+        """
+        self.reference = reference
+        self.atoms = atoms
+        self._contacts: dict[float, set] = {}
+        self._interfaces: dict[float, dict[str, list[int]]] = {}
+        self._coords: dict[Optional[float], dict] = {}
+        self._alignments: dict[tuple[tuple[str, str], ...], Any] = {}
+
+    def contacts(self, cutoff: float = 5.0) -> set:
+        """Residue-based contacts of the reference."""
+        if cutoff not in self._contacts:
+            self._contacts[cutoff] = load_contacts(self.reference, cutoff)
+        return self._contacts[cutoff]
+
+    def interface(self, cutoff: float = 5.0) -> dict[str, list[int]]:
+        """Interface residues of the reference."""
+        if cutoff not in self._interfaces:
+            self._interfaces[cutoff] = get_interface_resdic(
+                self.contacts(cutoff)
+            )
+        return self._interfaces[cutoff]
+
+    def coords(self, atoms: AtomsDict, cutoff: Optional[float] = None) -> dict:
+        """
+        Coordinates of the reference.
+
+        Parameters
+        ----------
+        atoms : dict
+            Dictionary of atoms to load. Coordinates are only kept when
+            it matches the atoms of the profile.
+        cutoff : float, optional
+            If given, load only the interface residues at this cutoff,
+            otherwise load all residues.
+        """
+        if atoms != self.atoms:
+            resdic = self.interface(cutoff) if cutoff is not None else None
+            coord_dic, _ = load_coords(self.reference, atoms, resdic)
+            return coord_dic
+        if cutoff not in self._coords:
+            resdic = self.interface(cutoff) if cutoff is not None else None
+            self._coords[cutoff], _ = load_coords(
+                self.reference, self.atoms, resdic
+            )
+        return self._coords[cutoff]
+
+    def alignment(
+            self,
+            model: PDBPath,
+            method: str,
+            lovoalign_exec: Optional[FilePath],
+            output_path: FilePath,
+            ) -> Any:
+        """
+        Align a model to the reference.
+
+        Sequence alignments are cached by the sequence signature of the
+        model, see :py:func:`haddock.libs.libalign.get_seq_signature`,
+        so the alignment and its `.izone`/`.aln` files are computed once
+        per topology. Structural alignments depend on the coordinates
+        and are always computed.
+
+        Parameters
+        ----------
+        model : PosixPath or :py:class:`haddock.libs.libontology.PDBFile`
+            The model to align.
+        method : str
+            The alignment method, see
+            :py:func:`haddock.libs.libalign.get_align`.
+        lovoalign_exec : str or Path
+            Path to the lovoalign executable.
+        output_path : Path
+            Where to write the alignment files.
+
+        Returns
+        -------
+        The result of the alignment function.
+        """
+        align_func = get_align(method=method, lovoalign_exec=lovoalign_exec)
+        if method != "sequence":
+            return align_func(self.reference, model, output_path)
+
+        signature = get_seq_signature(model)
+        if signature not in self._alignments:
+            self._alignments[signature] = align_func(
+                self.reference, model, output_path
+            )
+        return self._alignments[signature]
+
+    def precompute(
+            self,
+            params: ParamMap,
+            model: Optional[PDBPath] = None,
+            path: FilePath = ".",
+            ) -> None:
+        """
+        Compute the reference data needed by the selected metrics.
+
+        If `model` is given, its sequence alignment to the reference is
+        also computed and its files written to `path`.
+        """
+        try:
+            if model is not None:
+                self.alignment(
+                    model,
+                    params["alignment_method"],
+                    params["lovoalign_exec"],
+                    path,
+                )
+            if params["fnat"]:
+                self.contacts(params["fnat_cutoff"])
+            if params["irmsd"] or params["ilrmsd"]:
+                self.coords(self.atoms, params["irmsd_cutoff"])
+            if params["lrmsd"]:
+                self.coords(self.atoms)
+        except ALIGNError as err:
+            # each job will report the error for its own model
+            log.warning(f"Could not precompute the reference data: {err}")
+
+
 class CAPRI:
     """CAPRI class."""
 
@@ -102,6 +300,7 @@ class CAPRI:
         path: Path,
         reference: PDBPath,
         params: ParamMap,
+        reference_profile: Optional[ReferenceProfile] = None,
     ) -> None:
         """
         Initialize the class.
@@ -118,6 +317,9 @@ class CAPRI:
             The reference structure.
         params : dict
             The parameters for the CAPRI evaluation.
+        reference_profile : :py:class:`ReferenceProfile`, optional
+            Reference data shared with other models. If not given, the
+            reference data is computed for this model only.
         """
         self.reference = reference
         if not isinstance(model, PDBFile):
@@ -132,6 +334,9 @@ class CAPRI:
         self.fnat = float("nan")
         self.dockq = float("nan")
         self.atoms = self._load_atoms(model, reference)
+        if reference_profile is None:
+            reference_profile = ReferenceProfile(reference, self.atoms)
+        self.reference_profile = reference_profile
         self.r_chain = params["receptor_chain"]
         self.l_chains = params["ligand_chains"]
         self.model2ref_numbering = None
@@ -152,15 +357,13 @@ class CAPRI:
             The cutoff distance for the intermolecular contacts.
         """
         # Identify reference interface
-        ref_interface_resdic = self.identify_interface(self.reference, cutoff)
+        ref_interface_resdic = self.reference_profile.interface(cutoff)
 
         if len(ref_interface_resdic) == 0:
             log.warning("No reference interface found")
         else:
             # Load interface coordinates
-            ref_coord_dic, _ = load_coords(
-                self.reference, self.atoms, ref_interface_resdic
-            )
+            ref_coord_dic = self.reference_profile.coords(self.atoms, cutoff)
 
             mod_coord_dic, _ = load_coords(
                 self.model,
@@ -199,7 +402,7 @@ class CAPRI:
 
     def calc_lrmsd(self) -> None:
         """Calculate the L-RMSD."""
-        ref_coord_dic, _ = load_coords(self.reference, self.atoms)
+        ref_coord_dic = self.reference_profile.coords(self.atoms)
 
         mod_coord_dic, _ = load_coords(
             self.model,
@@ -302,12 +505,10 @@ class CAPRI:
             The cutoff distance for the intermolecular contacts.
         """
         # Identify interface
-        ref_interface_resdic = self.identify_interface(self.reference, cutoff)
+        ref_interface_resdic = self.reference_profile.interface(cutoff)
         # Load interface coordinates
 
-        ref_int_coord_dic, _ = load_coords(
-            self.reference, self.atoms, ref_interface_resdic
-        )
+        ref_int_coord_dic = self.reference_profile.coords(self.atoms, cutoff)
 
         mod_int_coord_dic, _ = load_coords(
             self.model,
@@ -401,7 +602,7 @@ class CAPRI:
         cutoff : float
             The cutoff distance for the intermolecular contacts.
         """
-        ref_contacts = load_contacts(self.reference, cutoff)
+        ref_contacts = self.reference_profile.contacts(cutoff)
         if len(ref_contacts) != 0:
             model_contacts = load_contacts(
                 self.model,
@@ -440,9 +641,16 @@ class CAPRI:
             has_cluster_info = True
         return has_cluster_info
 
-    def make_output(self) -> None:
-        """Output the CAPRI results to a .tsv file."""
-        data = {}
+    def get_data(self) -> ParamDict:
+        """
+        Collect the CAPRI results of the model.
+
+        Returns
+        -------
+        data : dict
+            The columns of the `capri_ss` table for this model.
+        """
+        data: ParamDict = {}
         # keep always "model" the first key
         data["model"] = self.model
         data["md5"] = self.model.md5
@@ -470,26 +678,57 @@ class CAPRI:
             for key in self.model.unw_energies:
                 data[key] = self.model.unw_energies[key]
 
+        return data
+
+    def get_record(self) -> ParamDict:
+        """
+        Collect the CAPRI results of the model as written to a .tsv file.
+
+        The record is lightweight and picklable, so it can be sent from a
+        worker back to the parent process.
+
+        Returns
+        -------
+        record : dict
+            The columns of the `capri_ss` table for this model, with the
+            values formatted and parsed back as in the .tsv file.
+        """
+        return {
+            key: parse_tsv_value(format_value(value))
+            for key, value in self.get_data().items()
+            }
+
+    def make_output(self) -> None:
+        """Output the CAPRI results to a .tsv file."""
         output_fname = Path(self.path, self.output_ss_fname)
+        write_dic_to_file(self.get_data(), output_fname)
 
-        write_dic_to_file(data, output_fname)
+    def run(self) -> Optional[ParamDict]:
+        """
+        Get the CAPRI metrics.
 
-    def run(self) -> None:
-        """Get the CAPRI metrics."""
+        Returns
+        -------
+        record : dict or None
+            The CAPRI record of the model, see :py:meth:`get_record`.
+            `None` if the model could not be aligned to the reference.
+        """
         try:
-            align_func = get_align(
-                method=self.params["alignment_method"],
-                lovoalign_exec=self.params["lovoalign_exec"],
-            )
-            self.model2ref_numbering, self.model2ref_chain_dict = align_func(
-                self.reference, self.model, self.path
+            (
+                self.model2ref_numbering,
+                self.model2ref_chain_dict,
+            ) = self.reference_profile.alignment(
+                self.model,
+                self.params["alignment_method"],
+                self.params["lovoalign_exec"],
+                self.path,
             )
         except ALIGNError:
             log.warning(
                 f"Alignment failed between {self.reference} "
                 f"and {self.model}, skipping..."
             )
-            return
+            return None
         # print(f"model2ref_numbering {self.model2ref_numbering}")
         # print(f"model2ref_chain_dict {self.model2ref_chain_dict}")
         if self.params["fnat"]:
@@ -518,7 +757,7 @@ class CAPRI:
             log.debug(f"id {self.identificator}, calculating DockQ metric")
             self.calc_dockq()
 
-        self.make_output()
+        return self.get_record()
 
     def check_chains(self, obs_chains):
         """
@@ -595,23 +834,8 @@ class CAPRI:
         if isinstance(pdb_f, PDBFile):
             pdb_f = pdb_f.rel_path
 
-        interface_resdic: dict[str, list[int]] = {}
         contacts = load_contacts(pdb_f, cutoff)
-
-        for contact in contacts:
-            first_chain, first_resid, sec_chain, sec_resid = contact
-
-            if first_chain not in interface_resdic:
-                interface_resdic[first_chain] = []
-            if sec_chain not in interface_resdic:
-                interface_resdic[sec_chain] = []
-
-            if first_resid not in interface_resdic[first_chain]:
-                interface_resdic[first_chain].append(first_resid)
-            if sec_resid not in interface_resdic[sec_chain]:
-                interface_resdic[sec_chain].append(sec_resid)
-
-        return interface_resdic
+        return get_interface_resdic(contacts)
 
     @staticmethod
     def add_chain_from_segid(pdb_path: PDBPath) -> Path:
@@ -635,6 +859,29 @@ class CAPRI:
         return new_pdb_path
 
 
+def parse_tsv_value(value: str) -> Union[int, float, str]:
+    """
+    Parse a field of a .tsv file into its type.
+
+    Parameters
+    ----------
+    value : str
+        The field as written in the file.
+
+    Returns
+    -------
+    int, float or str
+        The parsed value.
+    """
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return str(value).strip(os.linesep)
+
+
 def merge_data(capri_jobs: list[CAPRI]) -> list[CAPRI]:
     """Merge CAPRI data."""
     capri_dic: dict[str, dict[str, float]] = {}
@@ -654,20 +901,136 @@ def merge_data(capri_jobs: list[CAPRI]) -> list[CAPRI]:
             capri_dic[model_name][key] = float(content_data[header_data.index(key)])
 
     for j in capri_jobs:
-        for m in capri_dic:
-            jm = j.model
-            file_name = jm.name if isinstance(jm, Path) else jm.file_name
-            if m == file_name:
-                # add the data
-                j.irmsd = capri_dic[m]["irmsd"]
-                j.fnat = capri_dic[m]["fnat"]
-                j.lrmsd = capri_dic[m]["lrmsd"]
-                j.ilrmsd = capri_dic[m]["ilrmsd"]
-                j.dockq = capri_dic[m]["dockq"]
+        jm = j.model
+        file_name = jm.name if isinstance(jm, Path) else jm.file_name
+        if file_name in capri_dic:
+            # add the data
+            j.irmsd = capri_dic[file_name]["irmsd"]
+            j.fnat = capri_dic[file_name]["fnat"]
+            j.lrmsd = capri_dic[file_name]["lrmsd"]
+            j.ilrmsd = capri_dic[file_name]["ilrmsd"]
+            j.dockq = capri_dic[file_name]["dockq"]
 
     return capri_jobs
 
 
+def merge_records(
+        capri_jobs: list[CAPRI],
+        records: list[Optional[ParamDict]],
+        ) -> list[ParamDict]:
+    """
+    Load the CAPRI records returned by the jobs back into the jobs.
+
+    Parameters
+    ----------
+    capri_jobs : list
+        The CAPRI jobs, in the order they were run.
+    records : list
+        The record returned by each job, `None` if the job failed.
+
+    Returns
+    -------
+    list
+        The records of the successful jobs, in the order of the jobs.
+    """
+    merged: list[ParamDict] = []
+    for job, record in zip(capri_jobs, records):
+        if record is None:
+            log.warning(
+                f"No CAPRI metrics for {job.model}. "
+                "Caprieval will not be exhaustive..."
+                )
+            continue
+        job.irmsd = record["irmsd"]
+        job.fnat = record["fnat"]
+        job.lrmsd = record["lrmsd"]
+        job.ilrmsd = record["ilrmsd"]
+        job.dockq = record["dockq"]
+        merged.append(record)
+    return merged
+
+
+def rank_ss_capri_data(
+        data: dict[int, ParamDict],
+        sort_key: str,
+        sort_ascending: bool,
+        ) -> dict[int, ParamDict]:
+    """
+    Rank the CAPRI data according to the score and sort it.
+
+    Parameters
+    ----------
+    data : dict
+        The CAPRI record of each model, keyed by an identifier.
+    sort_key : str
+        Key to sort the data.
+    sort_ascending : bool
+        Whether to sort in ascending order.
+
+    Returns
+    -------
+    dict
+        The records, with the `caprieval_rank` set, keyed by their
+        position after sorting.
+    """
+    # Rank according to the score
+    score_rankkey_values = [(k, v["score"]) for k, v in data.items()]
+    score_rankkey_values.sort(key=lambda x: x[1])
+
+    for i, k in enumerate(score_rankkey_values):
+        data_idx, _ = k
+        data[data_idx]["caprieval_rank"] = i + 1
+
+    # Sort according to the sort key
+    rankkey_values = [(k, v[sort_key]) for k, v in data.items()]
+    rankkey_values.sort(
+        key=lambda x: x[1], reverse=True if not sort_ascending else False
+    )
+
+    _data = {}
+    for i, (data_idx, _) in enumerate(rankkey_values):
+        _data[i + 1] = data[data_idx]
+    return _data
+
+
+def write_ss_capri_output(
+        records: list[ParamDict],
+        output_name: str,
+        sort_key: str,
+        sort_ascending: bool,
+        path: FilePath,
+        ) -> None:
+    """
+    Write the CAPRI records of all models to a single file.
+
+    Parameters
+    ----------
+    records : list
+        The CAPRI record of each model, see :py:meth:`CAPRI.get_record`.
+    output_name : str
+        Name of the output file.
+    sort_key : str
+        Key to sort the output.
+    sort_ascending : bool
+        Whether to sort in ascending order.
+    path : Path
+        Path to the output directory.
+    """
+    output_fname = Path(path, output_name)
+    log.info(f"Writing CAPRI records into {output_fname}")
+    data = rank_ss_capri_data(
+        dict(enumerate(records, start=1)),
+        sort_key,
+        sort_ascending,
+        )
+    if not data:
+        log.warning(
+            f"No CAPRI records to write, {output_fname} was not created"
+            )
+        return
+    write_nested_dic_to_file(data, output_fname)
+
+
 def rearrange_ss_capri_output(
     output_name: str,
     output_count: int,
@@ -719,37 +1082,12 @@ def rearrange_ss_capri_output(
         content_data = content.split("\t")
 
         # find out the data type of each field
-        value: Union[float, str]
         for key, value in zip(header_data, content_data):
-            try:
-                value = int(value)
-            except ValueError:
-                try:
-                    value = float(value)
-                except ValueError:
-                    value = str(value).strip(os.linesep)
-            data[ident][key] = value
+            data[ident][key] = parse_tsv_value(value)
 
         out_file.unlink()
 
-    # Rank according to the score
-    score_rankkey_values = [(k, v["score"]) for k, v in data.items()]
-    score_rankkey_values.sort(key=lambda x: x[1])
-
-    for i, k in enumerate(score_rankkey_values):
-        data_idx, _ = k
-        data[data_idx]["caprieval_rank"] = i + 1
-
-    # Sort according to the sort key
-    rankkey_values = [(k, v[sort_key]) for k, v in data.items()]
-    rankkey_values.sort(
-        key=lambda x: x[1], reverse=True if not sort_ascending else False
-    )
-
-    _data = {}
-    for i, (data_idx, _) in enumerate(rankkey_values):
-        _data[i + 1] = data[data_idx]
-    data = _data
+    data = rank_ss_capri_data(data, sort_key, sort_ascending)
 
     if not data:
         # This means no files have been collected
@@ -841,7 +1179,7 @@ def capri_cluster_analysis(
             if clt_data[element][0][1].unw_energies:
                 try:
                     key_array = [
-                        vars(e[1])["unw_energies"][key]
+                        e[1].unw_energies[key]
                         for e in clt_data[element][:clt_threshold]  # type: ignore
                     ]
                     data[key], data[std_key] = calc_stats(key_array)
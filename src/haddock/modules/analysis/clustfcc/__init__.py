@@ -1,15 +1,30 @@
 """Cluster modules with FCC."""
+import contextlib
 import os
 from pathlib import Path
 
 import numpy as np
-from fcc.scripts import calc_fcc_matrix, cluster_fcc
+from fcc.scripts import cluster_fcc
 from typing import Any, Union
-from haddock import FCC_path, log
-from haddock.libs.libclust import write_structure_list
+from haddock import log
+from haddock.libs.libalign import shared_structure_store
+from haddock.libs.libclust import (
+    get_cache_file,
+    get_model_md5,
+    load_model_cache,
+    save_model_cache,
+    write_structure_list,
+)
 from haddock.libs.libparallel import Scheduler
-from haddock.libs.libsubprocess import JobInputFirst
-from haddock.modules import BaseHaddockModule, read_from_yaml_config
+from haddock.libs.libutil import parse_ncores
+from haddock.modules import BaseHaddockModule
+from haddock.modules.analysis.clustfcc.clustfcc import (
+    ContactJob,
+    get_fingerprints,
+    get_neighbors,
+    write_contacts,
+    write_fcc_matrix,
+)
 
 
 RECIPE_PATH = Path(__file__).resolve().parent
@@ -28,85 +43,112 @@ class HaddockModule(BaseHaddockModule):
 
     @classmethod
     def confirm_installation(cls) -> None:
-        """Confirm if FCC is installed and available."""
-        dcfg = read_from_yaml_config(DEFAULT_CONFIG)
-        exec_path = Path(FCC_path, dcfg["executable"])
-
-        if not os.access(exec_path, mode=os.F_OK):
-            raise Exception(f"Required {str(exec_path)} file does not exist.")
-
-        if not os.access(exec_path, mode=os.X_OK):
-            raise Exception(f"Required {str(exec_path)} file is not executable")
-
+        """Confirm module is installed."""
         return
 
     def _run(self) -> None:
         """Execute module."""
-        contact_executable = Path(FCC_path, self.params["executable"])
-
         # Get the models generated in previous step
         models_to_cluster = self.previous_io.retrieve_models(individualize=True)
 
-        # Calculate the contacts for each model
+        # Reuse the contacts of the models seen in previous executions
+        cached_contacts: dict[str, set[Any]] = {}
+        if self.params["incremental"]:
+            model_keys = [get_model_md5(model) for model in models_to_cluster]
+            cache_f = get_cache_file(
+                self.name,
+                {"cutoff": self.params["contact_distance_cutoff"]},
+                suffix=".pkl",
+            )
+            cached_contacts = load_model_cache(cache_f)
+            if cached_contacts:
+                log.info(f"Contacts read from {cache_f}")
+        else:
+            model_keys = [""] * len(models_to_cluster)
+
+        # Calculate the contacts for each model, in memory
         log.info("Calculating contacts")
-        contact_jobs: list[JobInputFirst] = []
-        for model in models_to_cluster:
+        parsed_contacts: list[Any] = [None] * len(models_to_cluster)
+        contact_jobs: list[ContactJob] = []
+        job_models: list[int] = []
+        for idx, (model, key) in enumerate(zip(models_to_cluster, model_keys)):
             pdb_f = Path(model.rel_path)  # type: ignore
-            contact_f = Path(model.file_name.replace(".pdb", ".con"))  # type: ignore
-            job = JobInputFirst(
+            contact_f = None
+            if self.params["write_contacts"]:
+                contact_f = Path(model.file_name.replace(".pdb", ".con"))  # type: ignore
+            if key in cached_contacts:
+                parsed_contacts[idx] = cached_contacts[key]
+                if contact_f is not None:
+                    write_contacts(cached_contacts[key], contact_f)
+                continue
+            job = ContactJob(
                 pdb_f,
-                contact_f,
-                contact_executable,
                 self.params["contact_distance_cutoff"],
+                contact_f=contact_f,
             )
             contact_jobs.append(job)
+            job_models.append(idx)
+
+        job_results: list[Any] = []
+        if contact_jobs:
+            # The models are parsed once, in parallel, and shared with the jobs
+            if self.params["structure_store"]:
+                structures = shared_structure_store(
+                    [job.input for job in contact_jobs],
+                    ncores=parse_ncores(
+                        n=self.params["ncores"], njobs=len(contact_jobs)
+                    ),
+                )
+            else:
+                structures = contextlib.nullcontext()
+            with structures:
+                contact_engine = Scheduler(
+                    contact_jobs,
+                    ncores=self.params["ncores"],
+                    chunksize=None,
+                    return_results=True,
+                )
+                contact_engine.run()
+            job_results = contact_engine.results
 
-        contact_engine = Scheduler(contact_jobs, ncores=self.params["ncores"])
-        contact_engine.run()
-
-        contact_file_l: list[str] = []
         not_found: list[str] = []
-        for job in contact_jobs:
-            if not job.output.exists():
-                # NOTE: If there is no output, most likely the models are not in
-                # contact there is no way of knowing how many models are not in
-                # contact, it can be only one, or could be all of them.
+        for idx, job, contacts in zip(job_models, contact_jobs, job_results):
+            parsed_contacts[idx] = contacts
+            if contacts is None:
                 not_found.append(job.input.name)
                 log.warning(f"Contact was not calculated for {job.input.name}")
-            else:
-                contact_file_l.append(str(job.output))
+            elif self.params["incremental"]:
+                cached_contacts[model_keys[idx]] = contacts
 
         if not_found:
             # No contacts were calculated, we cannot cluster
             self.finish_with_error("Several files were not generated:" f" {not_found}")
 
+        if self.params["incremental"] and contact_jobs:
+            save_model_cache(cache_f, cached_contacts)
+
         log.info("Calculating the FCC matrix")
-        parsed_contacts = calc_fcc_matrix.parse_contact_file(
-            contact_file_l, False
-        )  # noqa: E501
-
-        # Imporant: matrix is a generator object, be careful with it
-        matrix = calc_fcc_matrix.calculate_pairwise_matrix(
-            parsed_contacts, False
-        )  # noqa: E501
-
-        # write the matrix to a file, so we can read it afterwards and don't
-        #  need to reinvent the wheel handling this
-        fcc_matrix_f = Path("fcc.matrix")
-        with open(fcc_matrix_f, "w") as fh:
-            for data in list(matrix):
-                data_str = f"{data[0]} {data[1]} {data[2]:.2f} {data[3]:.3f}"
-                data_str += os.linesep
-                fh.write(data_str)
-        fh.close()
+        fingerprints = get_fingerprints(parsed_contacts)
+        if self.params["write_matrix"]:
+            write_fcc_matrix(fingerprints, Path("fcc.matrix"))
 
         # Cluster
         log.info("Clustering...")
-        pool = cluster_fcc.read_matrix(
-            fcc_matrix_f,
+        neighbors = get_neighbors(
+            fingerprints,
             self.params["fraction_cutoff"],
             self.params["strictness"],
         )
+        # the same pool of elements `cluster_fcc.read_matrix` builds
+        pool: dict[int, Any] = {}
+        if len(neighbors) > 1:
+            pool = {
+                idx: cluster_fcc.Element(idx)
+                for idx in range(1, len(neighbors) + 1)
+            }
+        for element, element_neighbors in zip(pool.values(), neighbors):
+            for neighbor_idx in element_neighbors:
+                element.add_neighbor(pool[neighbor_idx + 1])
 
         cluster_check = False
         while not cluster_check:
@@ -0,0 +1,366 @@
+"""Contacts and FCC values of the models."""
+import os
+from pathlib import Path
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from haddock.core.typing import FilePath, Iterable, Iterator, Optional
+from haddock.libs.libalign import parse_pdb
+
+
+Contact = int
+"""A residue contact, encoded as by `contact_fcc`: the residue number plus
+10000 and the segment index of both residues, concatenated."""
+
+FCC_CHUNK_SIZE = 1024
+"""Number of models compared at once when calculating FCC values."""
+
+
+def read_atoms(pdb_f: FilePath) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read the atoms of a PDB file used for the contacts.
+
+    As in `contact_fcc`, only the heavy atoms of ATOM records are used and
+    the segments are numbered from 1, the number increasing every time
+    the segment identifier changes. The file is parsed by
+    :py:func:`haddock.libs.libalign.parse_pdb`, so its atoms are read
+    from the active structure store, if any.
+
+    Parameters
+    ----------
+    pdb_f : str or pathlib.Path
+        The PDB file.
+
+    Returns
+    -------
+    segments : np.ndarray
+        Segment number of each atom.
+    resnums : np.ndarray
+        Residue number of each atom.
+    coords : np.ndarray
+        Coordinates of the atoms, shape (N, 3).
+    """
+    structure = parse_pdb(pdb_f)
+    hydrogen = np.array(
+        [
+            name[:1] == "H" or (name[:1].isdigit() and name[1:2] == "H")
+            for name in structure.atom_names
+        ],
+        dtype=bool,
+    )
+    heavy = ~structure.hetatm & ~hydrogen
+    segids = structure.segids[heavy]
+    segments = np.cumsum(np.r_[True, segids[1:] != segids[:-1]])
+    return segments, structure.resnums[heavy], structure.coords[heavy]
+
+
+def get_atom_contacts(pdb_f: FilePath, cutoff: float) -> list[Contact]:
+    """
+    Get the contacts between the segments of a model, as `contact_fcc`.
+
+    Two atoms of different segments are in contact if their distance is
+    lower than `cutoff`. The atoms of each segment are indexed in a
+    KD-tree and only the trees of different segments are compared.
+
+    Parameters
+    ----------
+    pdb_f : str or pathlib.Path
+        The PDB file of the model.
+    cutoff : float
+        The distance cutoff, in Angstrom.
+
+    Returns
+    -------
+    list
+        The residue contact of each pair of atoms in contact, the
+        residue of the lower segment first. A residue contact is
+        repeated for each pair of its atoms in contact.
+    """
+    segments, resnums, coords = read_atoms(pdb_f)
+    segment_ids = np.unique(segments)
+    segment_atoms = [np.flatnonzero(segments == seg) for seg in segment_ids]
+    trees = [cKDTree(coords[atoms]) for atoms in segment_atoms]
+
+    contacts: list[Contact] = []
+    for a in range(len(segment_ids)):
+        for b in range(a + 1, len(segment_ids)):
+            pairs = trees[a].query_ball_tree(trees[b], cutoff)
+            atoms_a = np.repeat(segment_atoms[a], [len(p) for p in pairs])
+            if not len(atoms_a):
+                continue
+            atoms_b = segment_atoms[b][np.concatenate(pairs).astype(np.int64)]
+            # the KD-tree includes the atoms at `cutoff`, contact_fcc not
+            dist_sq = ((coords[atoms_a] - coords[atoms_b]) ** 2).sum(axis=1)
+            close = dist_sq < cutoff ** 2
+            contacts.extend(
+                int(f"{res_a + 10000}{segment_ids[a]}"
+                    f"{res_b + 10000}{segment_ids[b]}")
+                for res_a, res_b in zip(
+                    resnums[atoms_a[close]],
+                    resnums[atoms_b[close]],
+                )
+            )
+    return contacts
+
+
+def get_contacts(pdb_f: FilePath, cutoff: float) -> set[Contact]:
+    """
+    Get the residue contacts between the segments of a model.
+
+    See :py:func:`get_atom_contacts`.
+
+    Parameters
+    ----------
+    pdb_f : str or pathlib.Path
+        The PDB file of the model.
+    cutoff : float
+        The distance cutoff, in Angstrom.
+
+    Returns
+    -------
+    set
+        The residue contacts.
+    """
+    return set(get_atom_contacts(pdb_f, cutoff))
+
+
+def write_contacts(contacts: Iterable[Contact], contact_f: FilePath) -> Path:
+    """
+    Write the contacts of a model, one per line, as `contact_fcc`.
+
+    The file can be read by the `parse_contact_file` function of fcc.
+    """
+    with open(contact_f, "w") as fh:
+        for contact in contacts:
+            fh.write(f"{contact}{os.linesep}")
+    return Path(contact_f)
+
+
+class ContactJob:
+    """Calculate the contacts of a model."""
+
+    def __init__(
+        self,
+        pdb_f: Path,
+        cutoff: float,
+        contact_f: Optional[Path] = None,
+    ) -> None:
+        """
+        Prepare the job.
+
+        Parameters
+        ----------
+        pdb_f : pathlib.Path
+            The PDB file of the model.
+        cutoff : float
+            The distance cutoff, in Angstrom.
+        contact_f : pathlib.Path, optional
+            If given, the contacts are also written to this file.
+        """
+        self.input = pdb_f
+        self.output = contact_f or pdb_f
+        self.cutoff = cutoff
+        self.contact_f = contact_f
+
+    def run(self) -> set[Contact]:
+        """Calculate the contacts."""
+        contacts = get_atom_contacts(self.input, self.cutoff)
+        if self.contact_f is not None:
+            write_contacts(contacts, self.contact_f)
+        return set(contacts)
+
+
+def get_fingerprints(contact_sets: list[set[Contact]]) -> np.ndarray:
+    """
+    Encode contact sets as bit vectors.
+
+    All models share a vocabulary of the contacts found in any of them,
+    bit `k` of a fingerprint is set if the model has the `k`-th contact.
+
+    Parameters
+    ----------
+    contact_sets : list of sets
+        The contacts of each model.
+
+    Returns
+    -------
+    np.ndarray
+        The packed fingerprints, one row of `uint8` per model.
+    """
+    vocabulary: dict[Contact, int] = {}
+    rows: list[int] = []
+    columns: list[int] = []
+    for idx, contacts in enumerate(contact_sets):
+        for contact in contacts:
+            rows.append(idx)
+            columns.append(vocabulary.setdefault(contact, len(vocabulary)))
+
+    nbytes = (len(vocabulary) + 7) // 8
+    fingerprints = np.zeros((len(contact_sets), nbytes), dtype=np.uint8)
+    bits = np.array(columns, dtype=np.int64)
+    np.bitwise_or.at(
+        fingerprints,
+        (np.array(rows, dtype=np.int64), bits >> 3),
+        (128 >> (bits & 7)).astype(np.uint8),
+    )
+    return fingerprints
+
+
+def iter_fcc_chunks(
+    fingerprints: np.ndarray,
+    chunk_size: int = FCC_CHUNK_SIZE,
+) -> Iterator[tuple[slice, np.ndarray, np.ndarray]]:
+    """
+    Calculate the FCC values of all pairs of models, by chunks of rows.
+
+    The number of common contacts is obtained with products of the
+    unpacked fingerprints of `chunk_size` models, so memory is bounded by
+    the chunk size and not by the number of pairs.
+
+    Parameters
+    ----------
+    fingerprints : np.ndarray
+        The packed fingerprints, see :py:func:`get_fingerprints`.
+    chunk_size : int
+        Number of models compared at once.
+
+    Yields
+    ------
+    rows : slice
+        The models of the chunk.
+    fcc : np.ndarray
+        Fraction of the contacts of each model of the chunk (rows) found
+        in every model (columns).
+    fcc_v : np.ndarray
+        Fraction of the contacts of every model (columns) found in each
+        model of the chunk (rows).
+    """
+    n_models = len(fingerprints)
+    n_contacts = np.unpackbits(fingerprints, axis=1).sum(axis=1)
+    # models without contacts have FCC values of 0
+    inv_contacts = np.divide(
+        1.0,
+        n_contacts,
+        out=np.zeros(n_models),
+        where=n_contacts > 0,
+    )
+    for start in range(0, n_models, chunk_size):
+        rows = slice(start, min(start + chunk_size, n_models))
+        block = np.unpackbits(fingerprints[rows], axis=1).astype(np.float32)
+        common = np.empty((block.shape[0], n_models))
+        for col_start in range(0, n_models, chunk_size):
+            cols = slice(col_start, min(col_start + chunk_size, n_models))
+            other = np.unpackbits(fingerprints[cols], axis=1)
+            common[:, cols] = block @ other.astype(np.float32).T
+        fcc = common * inv_contacts[rows, None]
+        fcc_v = common * inv_contacts[None, :]
+        yield rows, fcc, fcc_v
+
+
+def get_rounding_threshold(cutoff: float, decimals: int) -> float:
+    """
+    Get the lowest value reaching `cutoff` once rounded to `decimals`.
+
+    Values are rounded as when written with `decimals` decimals in the
+    text FCC matrix, so `round(x, decimals) >= cutoff` if and only if
+    `x >= threshold`. The threshold is found by bisection on the floats.
+
+    Parameters
+    ----------
+    cutoff : float
+        The cutoff of the rounded values.
+    decimals : int
+        The number of decimals.
+
+    Returns
+    -------
+    float
+        The threshold of the values before rounding.
+    """
+    step = 10.0 ** -decimals
+    # `low` never reaches the cutoff once rounded, `high` always does
+    low, high = cutoff - step, cutoff + step
+    while np.nextafter(low, high) < high:
+        middle = low + (high - low) / 2
+        if middle in (low, high):
+            middle = np.nextafter(low, high)
+        if round(middle, decimals) >= cutoff:
+            high = middle
+        else:
+            low = middle
+    return float(high)
+
+
+def get_neighbors(
+    fingerprints: np.ndarray,
+    cutoff: float,
+    strictness: float,
+    chunk_size: int = FCC_CHUNK_SIZE,
+) -> list[np.ndarray]:
+    """
+    Get the neighbors of each model for the FCC clustering.
+
+    Model `j` is a neighbor of model `i` if at least `cutoff` of the
+    contacts of `i` are found in `j` and at least `cutoff * strictness`
+    of the contacts of `j` are found in `i`. As in the text FCC matrix,
+    the values of each pair `i < j` are rounded to two decimals for `i`
+    and to three decimals for `j` before comparing them, see
+    :py:func:`get_rounding_threshold`.
+
+    Parameters
+    ----------
+    fingerprints : np.ndarray
+        The packed fingerprints, see :py:func:`get_fingerprints`.
+    cutoff : float
+        The FCC cutoff.
+    strictness : float
+        The factor applied to `cutoff` for the reverse FCC value.
+    chunk_size : int
+        Number of models compared at once.
+
+    Returns
+    -------
+    list of np.ndarray
+        The indexes of the neighbors of each model.
+    """
+    partner_cutoff = cutoff * strictness
+    ref_2, ref_3 = (get_rounding_threshold(cutoff, d) for d in (2, 3))
+    mobi_2, mobi_3 = (
+        get_rounding_threshold(partner_cutoff, d) for d in (2, 3)
+    )
+    neighbors: list[np.ndarray] = []
+    for rows, fcc, fcc_v in iter_fcc_chunks(fingerprints, chunk_size):
+        upper = np.arange(fcc.shape[1])[None, :] > np.arange(
+            rows.start, rows.stop
+        )[:, None]
+        # the model of the row is the reference of the pairs above the
+        # diagonal and the mobile of the pairs below it
+        is_neighbor = (fcc >= np.where(upper, ref_2, ref_3)) & (
+            fcc_v >= np.where(upper, mobi_3, mobi_2)
+        )
+        for row_idx, idx in enumerate(range(rows.start, rows.stop)):
+            is_neighbor[row_idx, idx] = False
+            neighbors.append(np.flatnonzero(is_neighbor[row_idx]))
+    return neighbors
+
+
+def write_fcc_matrix(
+    fingerprints: np.ndarray,
+    fname: FilePath,
+    chunk_size: int = FCC_CHUNK_SIZE,
+) -> Path:
+    """
+    Write the FCC matrix as text, one `i j fcc fcc_v` line per pair.
+
+    Model numbers start at 1.
+    """
+    with open(fname, "w") as fh:
+        for rows, fcc, fcc_v in iter_fcc_chunks(fingerprints, chunk_size):
+            for row_idx, idx in enumerate(range(rows.start, rows.stop)):
+                for j in range(idx + 1, fcc.shape[1]):
+                    fh.write(
+                        f"{idx + 1} {j + 1} {fcc[row_idx, j]:.2f} "
+                        f"{fcc_v[row_idx, j]:.3f}{os.linesep}"
+                    )
+    return Path(fname)
@@ -46,6 +46,7 @@ from haddock.libs.libontology import ModuleIO
 from haddock.modules import BaseHaddockModule
 from haddock.modules.analysis.clustrmsd.clustrmsd import (
     get_cluster_center,
+    get_cluster_elements,
     get_clusters,
     get_dendrogram,
     iterate_threshold,
@@ -124,9 +125,8 @@ class HaddockModule(BaseHaddockModule):
         log.info("Saving output to cluster.out")
         cluster_out = Path("cluster.out")
         with open(cluster_out, "w") as fh:
-            for cl_id in clusters:
+            for cl_id, npw in get_cluster_elements(cluster_arr).items():
                 if cl_id != -1:
-                    npw = np.where(cluster_arr == cl_id)[0]
                     clt_dic[cl_id] = [models[n] for n in npw]
                     fh.write(f"Cluster {cl_id} -> ")
                     clt_center = get_cluster_center(npw, n_obs, rmsd_matrix)
@@ -5,13 +5,21 @@ import numpy as np
 from scipy.cluster.hierarchy import fcluster, linkage
 
 from haddock import log
+from haddock.libs.libclust import open_matrix_file
 from haddock.libs.libontology import RMSDFile
 
 
+CENTER_BATCH_SIZE = 2**22
+"""Maximum number of distances looked up at once by `get_cluster_center`."""
+
+
 def read_matrix(rmsd_matrix: RMSDFile) -> np.ndarray:
     """
     Read the RMSD matrix.
 
+    Binary `.npy` matrices are memory-mapped without parsing, any other
+    file is read as a text matrix with one `i j rmsd` line per pair.
+
     Parameters
     ----------
     rmsd_matrix : :obj:`RMSDFile`
@@ -26,8 +34,13 @@ def read_matrix(rmsd_matrix: RMSDFile) -> np.ndarray:
         err = f"{type(rmsd_matrix)} is not a RMSDFile object."
         raise TypeError(err)
     filename = Path(rmsd_matrix.path, rmsd_matrix.file_name)
-    # count lines
-    nlines = sum(1 for line in open(filename))
+    binary = filename.suffix == ".npy"
+    if binary:
+        matrix = open_matrix_file(filename)
+        nlines = len(matrix)
+    else:
+        # count lines
+        nlines = sum(1 for line in open(filename))
     log.info(f"input rmsd matrix has {nlines} entries")
     # must be a 1D condensed distance matrix
     d = int(np.ceil(np.sqrt(nlines * 2)))
@@ -37,6 +50,8 @@ def read_matrix(rmsd_matrix: RMSDFile) -> np.ndarray:
     if nlines != rmsd_matrix.npairs:
         err = f"number of pairs {nlines} != expected ({rmsd_matrix.npairs})"
         raise ValueError(err)
+    if binary:
+        return matrix
     # creating and filling matrix obj
     matrix = np.zeros((nlines))
     c = 0
@@ -82,16 +97,17 @@ def apply_threshold(cluster_arr: np.ndarray, threshold: int) -> np.ndarray:
     """
     new_cluster_arr = cluster_arr.copy()
     log.info(f"Applying threshold {threshold} to cluster list")
-    cluster_pops = np.unique(cluster_arr, return_counts=True)
-    uncl_idx = np.where(cluster_pops[1] < threshold)[0]
-    invalid_clusters = cluster_pops[0][uncl_idx]
+    cluster_ids, inverse, counts = np.unique(
+        cluster_arr,
+        return_inverse=True,
+        return_counts=True,
+        )
+    invalid_clusters = cluster_ids[counts < threshold]
     log.info(f"Invalid clusters: {invalid_clusters}")
     # replacing invalid clusters with -1
-    uncl_models = 0
-    for cl_idx, cl_id in enumerate(new_cluster_arr):
-        if cl_id in invalid_clusters:
-            new_cluster_arr[cl_idx] = -1
-            uncl_models += 1
+    unclustered = (counts < threshold)[inverse]
+    new_cluster_arr[unclustered] = -1
+    uncl_models = np.count_nonzero(unclustered)
     log.info(f"Threshold applied, {uncl_models} models left unclustered")
     return new_cluster_arr
 
@@ -124,20 +140,47 @@ def iterate_threshold(cluster_arr: np.ndarray, threshold: int) -> np.ndarray:
     return new_cluster_arr
 
 
-def cond_index(i: int, j: int, n: int) -> float:
+def cond_index(i: int, j: int, n: int) -> int:
     """
     Get the condensed index from two matrix indexes.
 
+    Works element-wise on integer arrays.
+
     Parameters
     ----------
     i : int
-        Index of the first element.
+        Index of the first element, lower than `j`.
     j : int
         Index of the second element.
     n : int
         Number of observations.
     """
-    return n * (n - 1) / 2 - (n - i) * (n - i - 1) / 2 + j - i - 1
+    return n * i - (i * (i + 1)) // 2 + j - i - 1
+
+
+def get_cluster_elements(cluster_arr: np.ndarray) -> dict[int, np.ndarray]:
+    """
+    Get the indexes of the elements of each cluster.
+
+    Parameters
+    ----------
+    cluster_arr : np.ndarray
+        Array of clusters (unclustered structures are labelled with -1).
+
+    Returns
+    -------
+    dict
+        Sorted indexes of the elements of each cluster, excluding the
+        unclustered ones, by cluster id in ascending order.
+    """
+    order = np.argsort(cluster_arr, kind="stable")
+    cluster_ids, starts = np.unique(cluster_arr[order], return_index=True)
+    elements = np.split(order, starts[1:])
+    return {
+        int(cl_id): npw
+        for cl_id, npw in zip(cluster_ids, elements)
+        if cl_id != -1
+        }
 
 
 def get_cluster_center(npw: np.ndarray, n_obs: int, rmsd_matrix: np.ndarray) -> int:
@@ -158,14 +201,22 @@ def get_cluster_center(npw: np.ndarray, n_obs: int, rmsd_matrix: np.ndarray) ->
     cluster_center : int
         Index of cluster center
     """
-    intra_cl_distances = {el: 0.0 for el in npw}
-
-    # iterating over the elements of the cluster
-    for m_idx in range(len(npw)):
-        npws = npw[m_idx + 1 :]
-        pairs = [int(cond_index(npw[m_idx], npw_el, n_obs)) for npw_el in npws]
-        for pair_idx in range(len(pairs)):
-            intra_cl_distances[npw[m_idx]] += rmsd_matrix[pairs[pair_idx]]
-            intra_cl_distances[npws[pair_idx]] += rmsd_matrix[pairs[pair_idx]]
-    cluster_center = min(intra_cl_distances, key=intra_cl_distances.get)  # type: ignore
+    npw = np.asarray(npw, dtype=np.int64)
+    intra_cl_distances = np.empty(len(npw))
+
+    # sum of the distances of each element to the rest of the cluster,
+    # looking up the condensed matrix for batches of rows of the
+    # square-form matrix of the cluster
+    batch = max(1, CENTER_BATCH_SIZE // len(npw))
+    for start in range(0, len(npw), batch):
+        rows = npw[start:start + batch, None]
+        i = np.minimum(rows, npw)
+        j = np.maximum(rows, npw)
+        diagonal = i == j
+        pairs = cond_index(i, j, n_obs)
+        pairs[diagonal] = 0
+        distances = rmsd_matrix[pairs]
+        distances[diagonal] = 0.0
+        intra_cl_distances[start:start + batch] = distances.sum(axis=1)
+    cluster_center = int(npw[np.argmin(intra_cl_distances)])
     return cluster_center
@@ -4,16 +4,28 @@ RMSD matrix module.
 This module calculates of the RMSD matrix between all the models
 generated in the previous step.
 
-As all the pairwise RMSD calculations are independent, the module distributes
-them over all the available cores in an optimal way.
+The coordinates of all models are parsed only once into a single array, and
+the pairwise RMSD values are computed in batches. As all the pairwise RMSD
+calculations are independent, the module distributes them over all the
+available cores in an optimal way.
 
-Once created, the RMSD matrix is saved in text form in the current `rmsdmatrix`
-folder. The path to this file is then shared with the following step of the
-workflow by means of the json file `rmsd_matrix.json`.
+Once created, the RMSD matrix is saved as a binary condensed distance matrix
+(`rmsd.npy`) in the current `rmsdmatrix` folder. Each core writes its values
+directly into its own slice of the file. The path to this file is then shared
+with the following step of the workflow by means of the json file
+`rmsd_matrix.json`.
 
-The module accepts two parameters in input, namely:
+The module accepts the following parameters in input:
 
 * `max_models` (default = 10000)
+* `text_matrix` (default = false) : additionally export the matrix in text
+  form (`rmsd.matrix`), with one `i j rmsd` line per pair
+* `incremental` (default = false) : keep the matrix in a cache of the run
+  directory, keyed by the MD5 hash of the models, so that re-executions
+  only calculate the pairs involving new or changed models
+* `structure_store` (default = false) : parse the models in parallel into a
+  memory-mapped store of the run directory, shared with the following
+  analysis steps so that they do not parse the models again
 * `resdic_` : an expandable parameter to specify which residues must be
   considered for the alignment and the RMSD calculation. If there are
   two proteins denoted by chain IDs A and B, then the user can operate
@@ -26,10 +38,22 @@ thus telling the module to consider residues from 1 to 4 of chain A and from 2
 to 4 of chain B for the alignment and RMSD calculation.
 """
 import contextlib
+import os
 from pathlib import Path
 
+import numpy as np
+
 from haddock import log
-from haddock.core.typing import Any, FilePath
+from haddock.core.typing import Any, AtomsDict, FilePath
+from haddock.libs.libalign import get_atoms, shared_structure_store
+from haddock.libs.libclust import (
+    create_matrix_file,
+    fill_matrix_from_cache,
+    get_cache_file,
+    get_model_md5,
+    open_matrix_file,
+    save_matrix_cache,
+    )
 from haddock.libs.libontology import ModuleIO, RMSDFile
 from haddock.libs.libparallel import Scheduler
 from haddock.libs.libutil import parse_ncores
@@ -38,6 +62,9 @@ from haddock.modules.analysis import confirm_resdic_chainid_length
 from haddock.modules.analysis.rmsdmatrix.rmsd import (
     RMSD,
     RMSDJob,
+    get_pair,
+    get_pairs,
+    load_coords_array,
     rmsd_dispatcher,
     )
 
@@ -62,21 +89,28 @@ class HaddockModule(BaseHaddockModule):
         """Confirm if contact executable is compiled."""
         return
 
-    def _rearrange_output(self, output_name: FilePath, path: FilePath,
-                          ncores: int) -> None:
-        """Combine different rmsd outputs in a single file."""
-        output_fname = Path(path, output_name)
-        self.log(f"rearranging output files into {output_fname}")
-        # Combine files
-        with open(output_fname, 'w') as out_file:
-            for core in range(ncores):
-                tmp_file = Path(path, "rmsd_" + str(core) + ".matrix")
-                with open(tmp_file) as infile:
-                    out_file.write(infile.read())
-                log.debug(f"File number {core} written")
-                tmp_file.unlink()
-        log.info("Completed reconstruction of rmsd files.")
-        log.info(f"{output_fname} created.")
+    def _export_text_matrix(self, matrix_fname: FilePath,
+                            output_name: FilePath, nmodels: int) -> None:
+        """Export the binary RMSD matrix in text form."""
+        matrix = open_matrix_file(matrix_fname)
+        chunk = 1000000
+        with open(output_name, "w") as out_file:
+            for start in range(0, len(matrix), chunk):
+                npairs = min(chunk, len(matrix) - start)
+                ref_idx, mod_idx = get_pairs(
+                    nmodels,
+                    *get_pair(nmodels, start),
+                    npairs,
+                    )
+                out_file.writelines(
+                    f"{ref + 1} {mod + 1} {rmsd:.3f}{os.linesep}"
+                    for ref, mod, rmsd in zip(
+                        ref_idx,
+                        mod_idx,
+                        matrix[start:start + npairs],
+                        )
+                    )
+        log.info(f"{output_name} created.")
 
     def update_params(self, *args: Any, **kwargs: Any) -> None:
         """Update parameters."""
@@ -105,17 +139,78 @@ class HaddockModule(BaseHaddockModule):
             raise Exception("Too many models for RMSD matrix calculation")
         tot_npairs = nmodels * (nmodels - 1) // 2
         log.info(f"total number of pairs {tot_npairs}")
-        ncores = parse_ncores(n=self.params['ncores'], njobs=tot_npairs)
-        npairs, ref_structs, mod_structs = rmsd_dispatcher(
-            nmodels,
-            tot_npairs,
-            ncores)
+
+        # Parse the coordinates of all models once
+        if self.params["structure_store"]:
+            structures = shared_structure_store(
+                models,
+                ncores=parse_ncores(n=self.params["ncores"], njobs=nmodels),
+                )
+        else:
+            structures = contextlib.nullcontext()
+        filter_resdic = {
+            key[-1]: value for key, value
+            in self.params.items()
+            if key.startswith("resdic")
+            }
+        with structures:
+            atoms: AtomsDict = {}
+            for model in models:
+                atoms.update(get_atoms(model))
+            coords, coords_mask = load_coords_array(
+                models,
+                atoms,
+                filter_resdic,
+                )
+        # The jobs memory-map the coordinates instead of carrying them
+        coords_f, coords_mask_f = Path("coords.npy"), Path("coords_mask.npy")
+        np.save(coords_f, coords)
+        np.save(coords_mask_f, coords_mask)
+        del coords, coords_mask
+
+        # Preallocate the binary matrix, each core fills its own slice
+        output_name = "rmsd.npy"
+        create_matrix_file(output_name, tot_npairs)
+
+        # Reuse the distances of the models seen in previous executions
+        pair_indices = None
+        if self.params["incremental"]:
+            model_keys = [get_model_md5(model) for model in models]
+            cache_f = get_cache_file(self.name, filter_resdic)
+            matrix = open_matrix_file(output_name, mode="r+")
+            ncached = fill_matrix_from_cache(cache_f, model_keys, matrix)
+            matrix.flush()
+            if ncached:
+                pair_indices = np.flatnonzero(np.isnan(matrix))
+                log.info(
+                    f"{ncached} pairs read from {cache_f}, "
+                    f"{len(pair_indices)} pairs to calculate"
+                    )
+            del matrix
 
         # Calculate the rmsd for each set of models
         rmsd_jobs: list[RMSDJob] = []
+        if pair_indices is None:
+            ncores = parse_ncores(n=self.params['ncores'], njobs=tot_npairs)
+            npairs, ref_structs, mod_structs = rmsd_dispatcher(
+                nmodels,
+                tot_npairs,
+                ncores)
+            core_indices = [None] * ncores
+        else:
+            ncores = parse_ncores(
+                n=self.params['ncores'],
+                njobs=max(len(pair_indices), 1),
+                )
+            core_indices = [
+                indices for indices in np.array_split(pair_indices, ncores)
+                if len(indices)
+                ]
+            npairs = [len(indices) for indices in core_indices]
+            ref_structs = mod_structs = [0] * len(core_indices)
+
         self.log(f"running Rmsd Jobs with {ncores} cores")
-        for core in range(ncores):
-            output_name = "rmsd_" + str(core) + ".matrix"
+        for core, indices in enumerate(core_indices):
             rmsd_obj = RMSD(
                 models,
                 core,
@@ -124,6 +219,9 @@ class HaddockModule(BaseHaddockModule):
                 mod_structs[core],
                 output_name,
                 path=Path("."),
+                coords=coords_f,
+                coords_mask=coords_mask_f,
+                pair_indices=indices,
                 params=self.params
                 )
             job_f = Path(output_name)
@@ -135,33 +233,30 @@ class HaddockModule(BaseHaddockModule):
                 )
             rmsd_jobs.append(job)
 
-        rmsd_engine = Scheduler(rmsd_jobs, ncores=ncores)
-        rmsd_engine.run()
-
-        rmsd_file_l: list[str] = []
-        not_found: list[str] = []
-        for job in rmsd_jobs:
-            if not job.output.exists():
-                # NOTE: If there is no output, most likely the RMSD calculation
-                # timed out
-                not_found.append(job.output.name)
-                wrn = f'Rmsd results were not calculated for {job.output.name}'
-                log.warning(wrn)
-            else:
-                rmsd_file_l.append(str(job.output))
-
-        if not_found:
+        if rmsd_jobs:
+            rmsd_engine = Scheduler(rmsd_jobs, ncores=ncores)
+            rmsd_engine.run()
+        coords_f.unlink()
+        coords_mask_f.unlink()
+
+        # NOTE: If a slice was not filled, most likely the RMSD calculation
+        # timed out
+        missing = int(np.isnan(open_matrix_file(output_name)).sum())
+        if missing:
             # Not all distances were calculated, cannot create the full matrix
-            self.finish_with_error("Several files were not generated:"
-                                   f" {not_found}")
+            self.finish_with_error(
+                f"Rmsd results were not calculated for {missing} pairs"
+                )
+        log.info(f"{output_name} created.")
+        if self.params["incremental"]:
+            save_matrix_cache(
+                cache_f,
+                model_keys,
+                open_matrix_file(output_name),
+                )
 
-        # Post-processing : single file
-        output_name = "rmsd.matrix"
-        self._rearrange_output(
-            output_name,
-            path=rmsd_obj.path,
-            ncores=ncores
-            )
+        if self.params["text_matrix"]:
+            self._export_text_matrix(output_name, "rmsd.matrix", nmodels)
 
         # Sending models to the next step of the workflow
         self.output_models = models
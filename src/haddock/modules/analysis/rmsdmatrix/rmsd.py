@@ -5,17 +5,25 @@ from pathlib import Path
 import numpy as np
 
 from haddock import log
-from haddock.core.typing import Any, AtomsDict, FilePath, ParamMap
-from haddock.libs.libalign import (
-    calc_rmsd,
-    centroid,
-    get_atoms,
-    kabsch,
-    load_coords,
+from haddock.core.typing import (
+    Any,
+    AtomsDict,
+    FilePath,
+    NDArray,
+    NDFloat,
+    Optional,
+    ParamMap,
+    Union,
     )
+from haddock.libs.libalign import get_atoms, load_coords
+from haddock.libs.libclust import open_matrix_file
 from haddock.libs.libontology import PDBFile
 
 
+BATCH_COORDS_LIMIT = 2_000_000
+"""Maximum number of atom coordinates handled at once by `batch_rmsd`."""
+
+
 class RMSDJob:
     """A Job dedicated to the fast rmsd calculation."""
 
@@ -52,6 +60,9 @@ class RMSD:
             start_mod: int,
             output_name: FilePath,
             path: Path,
+            coords: Optional[Union[NDFloat, FilePath]] = None,
+            coords_mask: Optional[Union[NDArray[np.bool_], FilePath]] = None,
+            pair_indices: Optional[NDArray[np.int_]] = None,
             **params: Any,
             ) -> None:
         """
@@ -77,16 +88,38 @@ class RMSD:
             RMSD calculations starting from the pair (start_ref, start_mod)
 
         output_name : str
-            name of the core-specific output file
+            name of the output file. If it is a `.npy` binary matrix,
+            the values are written to this core's slice of the matrix,
+            otherwise a core-specific text file is written.
 
         path : pathlib.Path
             path to the current directory
 
+        coords : np.ndarray, str or pathlib.Path, optional
+            (n_models, n_atoms, 3) coordinates array, as given by
+            :py:func:`load_coords_array`, or the `.npy` file holding it.
+            Files are memory-mapped when running, so jobs sent to other
+            processes do not carry the coordinates. If not given, the
+            coordinates are loaded from `model_list` when running.
+
+        coords_mask : np.ndarray, str or pathlib.Path, optional
+            (n_models, n_atoms) array flagging the atoms present in each
+            model, or the `.npy` file holding it. Required if `coords`
+            is given.
+
+        pair_indices : np.ndarray, optional
+            Condensed matrix indexes of the pairs to calculate. If given,
+            `npairs`, `start_ref` and `start_mod` are ignored and only
+            these pairs are calculated and written.
+
         **params : dict
             additional parameters
         """
         self.model_list = model_list
         self.core = core
+        self.pair_indices = pair_indices
+        if pair_indices is not None:
+            npairs = len(pair_indices)
         self.npairs = npairs
         self.start_ref = start_ref
         self.start_mod = start_mod
@@ -105,51 +138,49 @@ class RMSD:
             log.info("No filtering dictionary, using all residues")
         self.output_name = output_name
         self.path = path
-        self.atoms: AtomsDict = {}
-        for m in model_list:
-            self.atoms.update(get_atoms(m))
+        self.coords = coords
+        self.coords_mask = coords_mask
         # data array
         self.data = np.zeros((self.npairs, 3))
 
     def run(self) -> None:
         """Run calculations."""
-        # initialising the number of pairs
-        ref = self.start_ref
-        mod = self.start_mod
-        nmodels = len(self.model_list)
-        for n in range(self.npairs):
-
-            ref_coord_dic, _ = load_coords(
-                self.model_list[ref], self.atoms, self.filter_resdic
+        if self.coords is None or self.coords_mask is None:
+            atoms: AtomsDict = {}
+            for m in self.model_list:
+                atoms.update(get_atoms(m))
+            self.coords, self.coords_mask = load_coords_array(
+                self.model_list,
+                atoms,
+                self.filter_resdic,
                 )
+        coords, coords_mask = self.coords, self.coords_mask
+        if isinstance(coords, (str, Path)):
+            coords = np.load(coords, mmap_mode="r")
+        if isinstance(coords_mask, (str, Path)):
+            coords_mask = np.load(coords_mask, mmap_mode="r")
 
-            mod_coord_dic, _ = load_coords(
-                self.model_list[mod], self.atoms, self.filter_resdic
+        if self.pair_indices is None:
+            ref_idx, mod_idx = get_pairs(
+                len(self.model_list),
+                self.start_ref,
+                self.start_mod,
+                self.npairs,
                 )
-            P = []
-            Q = []
-            for k in ref_coord_dic.keys() & mod_coord_dic.keys():
-                ref_xyz = ref_coord_dic[k]
-                mod_xyz = mod_coord_dic[k]
-                Q.append(ref_xyz)
-                P.append(mod_xyz)
-            Q = np.asarray(Q)
-            P = np.asarray(P)
-            Q = Q - centroid(Q)
-            P = P - centroid(P)
-            U = kabsch(P, Q)
-            P = np.dot(P, U)
-            rmsd = calc_rmsd(P, Q)
-            # saving output (adding one for consistency with clusterfcc)
-            self.data[n, 0] = ref + 1
-            self.data[n, 1] = mod + 1
-            self.data[n, 2] = rmsd
-            # updating indices
-            if mod == (nmodels - 1):
-                ref += 1
-                mod = ref + 1
-            else:
-                mod += 1
+        else:
+            ref_idx, mod_idx = get_pairs_from_indices(
+                len(self.model_list),
+                self.pair_indices,
+                )
+        # saving output (adding one for consistency with clusterfcc)
+        self.data[:, 0] = ref_idx + 1
+        self.data[:, 1] = mod_idx + 1
+        self.data[:, 2] = batch_rmsd(
+            coords,
+            coords_mask,
+            ref_idx,
+            mod_idx,
+            )
 
     def output(self) -> None:
         """Write down the RMSD matrix."""
@@ -162,12 +193,178 @@ class RMSD:
             ).any()
         if check_low_values:
             log.warning(f"core {self.core}: low values of RMSD detected.")
+        if output_fname.suffix == ".npy":
+            self.output_binary(output_fname)
+            return
         with open(output_fname, "w") as out_fh:
             for data in list(self.data):
                 data_str = f"{data[0]:.0f} {data[1]:.0f} {data[2]:.3f}"
                 data_str += os.linesep
                 out_fh.write(data_str)
 
+    def output_binary(self, output_fname: Path) -> None:
+        """Write the RMSD values to a slice of the binary matrix."""
+        matrix = open_matrix_file(output_fname, mode="r+")
+        if self.pair_indices is None:
+            start = get_pair_index(
+                len(self.model_list),
+                self.start_ref,
+                self.start_mod,
+                )
+            matrix[start:start + self.npairs] = self.data[:, 2]
+        else:
+            matrix[self.pair_indices] = self.data[:, 2]
+        matrix.flush()
+        del matrix
+
+
+def load_coords_array(
+        model_list: list[PDBFile],
+        atoms: AtomsDict,
+        filter_resdic: Optional[dict[str, list[int]]] = None,
+        ) -> tuple[NDFloat, NDArray[np.bool_]]:
+    """
+    Parse the coordinates of all models into a single array.
+
+    Each model is parsed only once. Atoms are indexed by their
+    (chain, resnum, atom name) identifier in order of first appearance
+    across all models.
+
+    Parameters
+    ----------
+    model_list : list
+        List of models.
+
+    atoms : dict
+        Dictionary of atoms, as given by
+        :py:func:`haddock.libs.libalign.get_atoms`.
+
+    filter_resdic : dict, optional
+        Dictionary of residues to be loaded (one list per chain).
+
+    Returns
+    -------
+    coords : np.ndarray
+        (n_models, n_atoms, 3) array of coordinates. Atoms missing
+        in a model have zero coordinates.
+
+    mask : np.ndarray
+        (n_models, n_atoms) boolean array, `True` where the atom
+        is present in the model.
+    """
+    atom_index: dict[tuple[str, int, str], int] = {}
+    coord_dics = []
+    for model in model_list:
+        coord_dic, _ = load_coords(model, atoms, filter_resdic)
+        for identifier in coord_dic:
+            atom_index.setdefault(identifier, len(atom_index))
+        coord_dics.append(coord_dic)
+
+    coords = np.zeros((len(model_list), len(atom_index), 3))
+    mask = np.zeros((len(model_list), len(atom_index)), dtype=bool)
+    for n, coord_dic in enumerate(coord_dics):
+        idx = [atom_index[identifier] for identifier in coord_dic]
+        coords[n, idx] = list(coord_dic.values())
+        mask[n, idx] = True
+    return coords, mask
+
+
+def batch_rmsd(
+        coords: NDFloat,
+        mask: NDArray[np.bool_],
+        ref_idx: NDArray[np.int_],
+        mod_idx: NDArray[np.int_],
+        ) -> NDFloat:
+    """
+    Calculate the superposition RMSD of many pairs of models at once.
+
+    Only the atoms present in both models of a pair are considered.
+    The optimal rotation is obtained from the singular values of the
+    batched 3x3 covariance matrices, so coordinates are never rotated.
+
+    Parameters
+    ----------
+    coords : np.ndarray
+        (n_models, n_atoms, 3) array of coordinates.
+
+    mask : np.ndarray
+        (n_models, n_atoms) boolean array of the atoms present
+        in each model.
+
+    ref_idx : np.ndarray
+        Indexes of the reference models of each pair.
+
+    mod_idx : np.ndarray
+        Indexes of the mobile models of each pair.
+
+    Returns
+    -------
+    rmsd : np.ndarray
+        RMSD value of each pair.
+    """
+    rmsd = np.zeros(len(ref_idx))
+    natoms = max(coords.shape[1], 1)
+    batch_size = max(1, BATCH_COORDS_LIMIT // natoms)
+    for start in range(0, len(ref_idx), batch_size):
+        ref = ref_idx[start:start + batch_size]
+        mod = mod_idx[start:start + batch_size]
+        weights = (mask[ref] & mask[mod]).astype(float)[:, :, None]
+        natoms_pair = weights.sum(axis=(1, 2))
+
+        Q = coords[ref]
+        P = coords[mod]
+        Q = Q - (Q * weights).sum(axis=1, keepdims=True) \
+            / natoms_pair[:, None, None]
+        P = P - (P * weights).sum(axis=1, keepdims=True) \
+            / natoms_pair[:, None, None]
+        Q *= weights
+        P *= weights
+
+        # covariance matrices and their singular values
+        C = np.einsum("nai,naj->nij", P, Q)
+        S = np.linalg.svd(C, compute_uv=False)
+        # correct for reflections
+        S[np.linalg.det(C) < 0.0, -1] *= -1
+
+        squared = (P * P).sum(axis=(1, 2)) + (Q * Q).sum(axis=(1, 2)) \
+            - 2 * S.sum(axis=1)
+        rmsd[start:start + batch_size] = np.sqrt(
+            np.clip(squared, 0.0, None) / natoms_pair
+            )
+    return rmsd
+
+
+def get_pairs(
+        nmodels: int,
+        start_ref: int,
+        start_mod: int,
+        npairs: int,
+        ) -> tuple[NDArray[np.int_], NDArray[np.int_]]:
+    """
+    Get the indexes of `npairs` consecutive pairs of structures.
+
+    Pairs are enumerated as in the condensed distance matrix, starting
+    from the pair (`start_ref`, `start_mod`).
+    """
+    start = get_pair_index(nmodels, start_ref, start_mod)
+    return get_pairs_from_indices(nmodels, np.arange(start, start + npairs))
+
+
+def get_pairs_from_indices(
+        nmodels: int,
+        idx: NDArray[np.int_],
+        ) -> tuple[NDArray[np.int_], NDArray[np.int_]]:
+    """Get the pairs of structures given their 1D matrix indexes."""
+    b = 1 - (2 * nmodels)
+    i = ((-b - np.sqrt(b ** 2 - 8 * idx)) // 2).astype(int)
+    j = (idx + i * (b + i + 2) // 2 + 1).astype(int)
+    return i, j
+
+
+def get_pair_index(nmodels: int, i: int, j: int) -> int:
+    """Get the 1D matrix index of the pair of structures (i, j)."""
+    return i * (2 * nmodels - i - 1) // 2 + j - i - 1
+
 
 def get_pair(nmodels: int, idx: int) -> tuple[int, int]:
     """Get the pair of structures given the 1D matrix index."""
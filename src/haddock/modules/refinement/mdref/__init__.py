@@ -2,8 +2,8 @@
 from pathlib import Path
 
 from haddock.core.typing import FilePath
-from haddock.gear.haddockmodel import HaddockModel
-from haddock.libs.libcns import prepare_cns_input, prepare_expected_pdb
+from haddock.gear.haddockmodel import HaddockModel, collect_energies
+from haddock.libs.libcns import CNSInputTemplate, prepare_expected_pdb
 from haddock.libs.libontology import PDBFile
 from haddock.libs.libsubprocess import CNSJob
 from haddock.modules import get_engine
@@ -70,6 +70,12 @@ class HaddockModule(BaseCNSModule):
 
         ambig_fnames = self.get_ambig_fnames(prev_ambig_fnames)
 
+        cns_template = CNSInputTemplate(
+            self.recipe_str,
+            self.params,
+            "mdref",
+            native_segid=True,
+        )
         model_idx = 0
         idx = 1
         for model in models_to_refine:
@@ -81,15 +87,10 @@ class HaddockModule(BaseCNSModule):
             model_idx += 1
 
             for _ in range(self.params["sampling_factor"]):
-                inp_file = prepare_cns_input(
+                inp_file = cns_template.render(
                     idx,
                     model,
-                    self.path,
-                    self.recipe_str,
-                    self.params,
-                    "mdref",
                     ambig_fname=ambig_fname,
-                    native_segid=True,
                 )
                 out_file = f"mdref_{idx}.out"
 
@@ -102,7 +103,11 @@ class HaddockModule(BaseCNSModule):
                     expected_pdb.ori_name = None
                 self.output_models.append(expected_pdb)
 
-                job = CNSJob(inp_file, out_file, envvars=self.envvars)
+                job = CNSJob(
+                    inp_file, out_file,
+                    envvars=self.envvars,
+                    output_pdbs=[expected_pdb.file_name],
+                )
 
                 jobs.append(job)
 
@@ -113,6 +118,8 @@ class HaddockModule(BaseCNSModule):
         Engine = get_engine(self.params["mode"], self.params)
         engine = Engine(jobs)
         engine.run()
+        # energies read by the workers right after each CNS job
+        energies = collect_energies(getattr(engine, "results", ()))
         self.log("CNS jobs have finished")
 
         # Get the weights from the defaults
@@ -121,7 +128,10 @@ class HaddockModule(BaseCNSModule):
 
         for pdb in self.output_models:
             if pdb.is_present():
-                haddock_model = HaddockModel(pdb.file_name)
+                haddock_model = HaddockModel(
+                    pdb.file_name,
+                    energies=energies.get(pdb.file_name),
+                )
                 pdb.unw_energies = haddock_model.energies
 
                 haddock_score = haddock_model.calc_haddock_score(**weights)
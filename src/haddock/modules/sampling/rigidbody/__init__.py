@@ -31,8 +31,8 @@ sure to sample enough the possible interaction space.
 from pathlib import Path
 
 from haddock.core.typing import FilePath
-from haddock.gear.haddockmodel import HaddockModel
-from haddock.libs.libcns import prepare_cns_input
+from haddock.gear.haddockmodel import HaddockModel, collect_energies
+from haddock.libs.libcns import CNSInputTemplate
 from haddock.libs.libontology import PDBFile
 from haddock.libs.libsubprocess import CNSJob
 from haddock.modules import get_engine
@@ -98,6 +98,12 @@ class HaddockModule(BaseCNSModule):
             ambig_fnames = None
 
         # Prepare the jobs
+        cns_template = CNSInputTemplate(
+            self.recipe_str,
+            self.params,
+            "rigidbody",
+            native_segid=True,
+        )
         idx = 1
         self.output_models: list[PDBFile] = []
         self.log("Preparing jobs...")
@@ -109,16 +115,10 @@ class HaddockModule(BaseCNSModule):
                 else:
                     ambig_fname = self.params["ambig_fname"]
                 # prepare cns input
-                inp_file = prepare_cns_input(
+                inp_file = cns_template.render(
                     idx,
                     combination,
-                    self.path,
-                    self.recipe_str,
-                    self.params,
-                    "rigidbody",
                     ambig_fname=ambig_fname,
-                    default_params_path=self.toppar_path,
-                    native_segid=True,
                 )
 
                 log_fname = f"rigidbody_{idx}.out"
@@ -131,7 +131,11 @@ class HaddockModule(BaseCNSModule):
                 model.topology = [e.topology for e in combination]
                 self.output_models.append(model)
 
-                job = CNSJob(inp_file, log_fname, envvars=self.envvars)
+                job = CNSJob(
+                    inp_file, log_fname,
+                    envvars=self.envvars,
+                    output_pdbs=[model.file_name],
+                )
                 jobs.append(job)
 
                 idx += 1
@@ -141,6 +145,8 @@ class HaddockModule(BaseCNSModule):
         Engine = get_engine(self.params["mode"], self.params)
         engine = Engine(jobs)
         engine.run()
+        # energies read by the workers right after each CNS job
+        energies = collect_energies(getattr(engine, "results", ()))
         self.log("CNS jobs have finished")
 
         # Get the weights according to CNS parameters
@@ -150,7 +156,10 @@ class HaddockModule(BaseCNSModule):
         for model in self.output_models:
             if model.is_present():
                 # Score the model
-                haddock_model = HaddockModel(model.file_name)
+                haddock_model = HaddockModel(
+                    model.file_name,
+                    energies=energies.get(model.file_name),
+                )
                 model.unw_energies = haddock_model.energies
 
                 haddock_score = haddock_model.calc_haddock_score(**weights)
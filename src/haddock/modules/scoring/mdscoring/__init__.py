@@ -2,8 +2,8 @@
 from pathlib import Path
 
 from haddock.core.typing import FilePath
-from haddock.gear.haddockmodel import HaddockModel
-from haddock.libs.libcns import prepare_cns_input, prepare_expected_pdb
+from haddock.gear.haddockmodel import HaddockModel, collect_energies
+from haddock.libs.libcns import CNSInputTemplate, prepare_expected_pdb
 from haddock.libs.libsubprocess import CNSJob
 from haddock.modules import get_engine
 from haddock.modules.scoring import ScoringModule
@@ -42,16 +42,15 @@ class HaddockModule(ScoringModule):
         except Exception as e:
             self.finish_with_error(e)
 
+        cns_template = CNSInputTemplate(
+            self.recipe_str,
+            self.params,
+            "mdscoring",
+            native_segid=True,
+            )
         self.output_models = []
         for model_num, model in enumerate(models_to_score, start=1):
-            scoring_inp = prepare_cns_input(
-                model_num,
-                model,
-                self.path,
-                self.recipe_str,
-                self.params,
-                "mdscoring",
-                native_segid=True)
+            scoring_inp = cns_template.render(model_num, model)
 
             scoring_out = f"mdscoring_{model_num}.out"
 
@@ -66,7 +65,11 @@ class HaddockModule(ScoringModule):
 
             self.output_models.append(expected_pdb)
 
-            job = CNSJob(scoring_inp, scoring_out, envvars=self.envvars)
+            job = CNSJob(
+                scoring_inp, scoring_out,
+                envvars=self.envvars,
+                output_pdbs=[expected_pdb.file_name],
+                )
 
             jobs.append(job)
 
@@ -75,6 +78,8 @@ class HaddockModule(ScoringModule):
         Engine = get_engine(self.params['mode'], self.params)
         engine = Engine(jobs)
         engine.run()
+        # energies read by the workers right after each CNS job
+        energies = collect_energies(getattr(engine, "results", ()))
         self.log("CNS jobs have finished")
 
         # Get the weights from the defaults
@@ -84,7 +89,10 @@ class HaddockModule(ScoringModule):
         # Check for generated output, fail it not all expected files are found
         for pdb in self.output_models:
             if pdb.is_present():
-                haddock_model = HaddockModel(pdb.file_name)
+                haddock_model = HaddockModel(
+                    pdb.file_name,
+                    energies=energies.get(pdb.file_name),
+                    )
                 pdb.unw_energies = haddock_model.energies
 
                 haddock_score = haddock_model.calc_haddock_score(**weights)
@@ -16,13 +16,23 @@ from haddock.libs.libcns import (
 from haddock.libs.libontology import Format, PDBFile, TopologyFile
 from haddock.libs.libstructure import make_molecules
 from haddock.libs.libsubprocess import CNSJob
-from haddock.modules import get_engine
+from haddock.modules import (
+    get_engine,
+    non_mandatory_general_parameters_defaults,
+)
 from haddock.modules.base_cns_module import BaseCNSModule
+from haddock.modules.topology.topoaa.cache import (
+    TopologyCache,
+    get_topology_key,
+)
 
 
 RECIPE_PATH = Path(__file__).resolve().parent
 DEFAULT_CONFIG = Path(RECIPE_PATH, "defaults.yaml")
 
+NON_TOPOLOGY_PARAMS = {"cache_dir", "cache_size", "limit", "tolerance"}
+"""Parameters of the module not affecting the generated topologies."""
+
 
 def generate_topology(
     input_pdb: Path,
@@ -113,6 +123,17 @@ class HaddockModule(BaseCNSModule):
 
         return md5_dic
 
+    def _open_cache(self) -> Optional[TopologyCache]:
+        """Open the topology cache, if enabled."""
+        if not self.params["cache_dir"]:
+            return None
+        cache_dir = Path(self.params["cache_dir"]).expanduser()
+        if not cache_dir.is_absolute():
+            # relative to the run directory, the parent of the step folder
+            cache_dir = Path("..", cache_dir)
+        self.log(f"Using the topology cache in {cache_dir}")
+        return TopologyCache(cache_dir, self.params["cache_size"] * 1024**2)
+
     def _run(self) -> None:
         """Execute module."""
         if self.order == 0:
@@ -145,6 +166,17 @@ class HaddockModule(BaseCNSModule):
         else:
             mol_params_get = partial(operator.getitem, mol_params_keys, -1)
 
+        # the topologies only depend on the parameters of topoaa
+        cache = self._open_cache()
+        topology_params = {
+            key: value
+            for key, value in self.params.items()
+            if key not in non_mandatory_general_parameters_defaults
+            and key not in NON_TOPOLOGY_PARAMS
+        }
+        # keys of the topologies not found in the cache
+        cache_misses: dict[str, tuple[Path, Path]] = {}
+
         # Pool of jobs to be executed by the CNS engine
         jobs: list[CNSJob] = []
 
@@ -185,6 +217,22 @@ class HaddockModule(BaseCNSModule):
                 else:
                     libpdb.sanitize(model, overwrite=True)
 
+                if cache is not None:
+                    key = get_topology_key(
+                        model,
+                        {**topology_params, **parameters_for_this_molecule},
+                        self.recipe_str,
+                        self.toppar_path,
+                    )
+                    outputs = (
+                        Path(f"{model.stem}_haddock.{Format.PDB}"),
+                        Path(f"{model.stem}_haddock.{Format.TOPOLOGY}"),
+                    )
+                    if cache.fetch(key, *outputs):
+                        self.log(f"Topology of {model.name} found in cache")
+                        continue
+                    cache_misses[key] = outputs
+
                 # Prepare generation of topologies jobs
                 topology_filename = generate_topology(
                     model,
@@ -210,11 +258,18 @@ class HaddockModule(BaseCNSModule):
 
         # Run CNS Jobs
         self.log(f"Running CNS Jobs n={len(jobs)}")
-        Engine = get_engine(self.params["mode"], self.params)
-        engine = Engine(jobs)
-        engine.run()
+        if jobs:
+            Engine = get_engine(self.params["mode"], self.params)
+            engine = Engine(jobs)
+            engine.run()
         self.log("CNS jobs have finished")
 
+        if cache is not None:
+            for key, outputs in cache_misses.items():
+                if all(output.exists() for output in outputs):
+                    cache.store(key, *outputs)
+            cache.prune()
+
         # Check for generated output, fail it not all expected files
         #  are found
         expected: dict[int, dict[int, PDBFile]] = {}
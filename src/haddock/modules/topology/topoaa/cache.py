@@ -0,0 +1,166 @@
+"""
+Content-addressed cache of the topologies generated by topoaa.
+
+Each entry holds the `_haddock.pdb` and `_haddock.psf` files CNS generated
+for a sanitized input PDB. Entries are keyed by a hash of the content of
+the sanitized PDB, the parameters of the molecule, the CNS recipe and the
+force field files, so a molecule is only processed by CNS once for a given
+setup, whatever the run or the name of its file.
+
+The cache is bounded in size, the least recently used entries are
+removed first.
+"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from functools import lru_cache
+from pathlib import Path
+
+from haddock import log, version
+from haddock.core.typing import Any, FilePath, Optional
+
+
+CACHE_SUFFIXES = (".pdb", ".psf")
+"""Suffixes of the files stored in each cache entry."""
+
+
+@lru_cache(maxsize=None)
+def hash_folder(folder: FilePath) -> str:
+    """Get the MD5 hash of the content of all files in a folder."""
+    md5 = hashlib.md5()
+    for path in sorted(Path(folder).rglob("*")):
+        if path.is_file():
+            md5.update(str(path.relative_to(folder)).encode())
+            md5.update(path.read_bytes())
+    return md5.hexdigest()
+
+
+def get_topology_key(
+        pdb_f: FilePath,
+        params: dict[str, Any],
+        recipe_str: str,
+        toppar_path: FilePath,
+        ) -> str:
+    """
+    Get the cache key of the topology of a sanitized PDB.
+
+    Parameters
+    ----------
+    pdb_f : str or pathlib.Path
+        The sanitized PDB file.
+    params : dict
+        The parameters the topology depends on. Values pointing to
+        existing files are replaced by the hash of their content.
+    recipe_str : str
+        The CNS recipe generating the topology.
+    toppar_path : str or pathlib.Path
+        The folder of the force field files.
+
+    Returns
+    -------
+    str
+        The key, a SHA-256 hash.
+    """
+    resolved: dict[str, Any] = {}
+    for key, value in params.items():
+        if key.endswith("_fname") and value and Path(value).is_file():
+            value = hashlib.md5(Path(value).read_bytes()).hexdigest()
+        resolved[key] = value
+
+    sha = hashlib.sha256()
+    sha.update(version.encode())
+    sha.update(Path(pdb_f).read_bytes())
+    sha.update(json.dumps(resolved, sort_keys=True, default=str).encode())
+    sha.update(recipe_str.encode())
+    sha.update(hash_folder(Path(toppar_path).resolve()).encode())
+    return sha.hexdigest()
+
+
+class TopologyCache:
+    """A size-bounded folder of topologies, keyed by content."""
+
+    def __init__(self, path: FilePath, max_size: int) -> None:
+        """
+        Open the cache, creating its folder if needed.
+
+        Parameters
+        ----------
+        path : str or pathlib.Path
+            The folder of the cache. It can be shared by many runs.
+        max_size : int
+            The maximum size of the cache, in bytes.
+        """
+        self.path = Path(path)
+        self.max_size = max_size
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _entry(self, key: str) -> Path:
+        return Path(self.path, key[:2], key)
+
+    def fetch(self, key: str, pdb_f: FilePath, psf_f: FilePath) -> bool:
+        """
+        Copy the topology of an entry, if present.
+
+        Parameters
+        ----------
+        key : str
+            The key, see :py:func:`get_topology_key`.
+        pdb_f, psf_f : str or pathlib.Path
+            The files to create.
+
+        Returns
+        -------
+        bool
+            Whether the entry was found.
+        """
+        entry = self._entry(key)
+        try:
+            for suffix, dest in zip(CACHE_SUFFIXES, (pdb_f, psf_f)):
+                shutil.copyfile(Path(entry, f"topology{suffix}"), dest)
+        except FileNotFoundError:
+            return False
+        # mark the entry as recently used
+        os.utime(entry)
+        return True
+
+    def store(self, key: str, pdb_f: FilePath, psf_f: FilePath) -> None:
+        """
+        Add a topology to the cache.
+
+        The entry is written in a temporary folder and then renamed, so
+        runs sharing the cache never read incomplete entries.
+        """
+        entry = self._entry(key)
+        if entry.exists():
+            return
+        entry.parent.mkdir(exist_ok=True)
+        tmp_entry = Path(self.path, f".tmp-{uuid.uuid4().hex}")
+        tmp_entry.mkdir()
+        for suffix, src in zip(CACHE_SUFFIXES, (pdb_f, psf_f)):
+            shutil.copyfile(src, Path(tmp_entry, f"topology{suffix}"))
+        try:
+            tmp_entry.rename(entry)
+        except OSError:
+            # another run stored the same entry meanwhile
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    def prune(self, max_size: Optional[int] = None) -> None:
+        """Remove the least recently used entries above the maximum size."""
+        max_size = self.max_size if max_size is None else max_size
+        entries: list[tuple[float, int, Path]] = []
+        for entry in self.path.glob("??/*"):
+            try:
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except FileNotFoundError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= max_size:
+                break
+            log.debug(f"Removing {entry} from the topology cache")
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -4,7 +4,7 @@ from pathlib import Path
 
 import pytest
 
-from haddock.gear.extend_run import add_extend_run
+from haddock.gear.extend_run import WorkflowManagerExtend, add_extend_run
 
 
 @pytest.mark.parametrize(
@@ -26,3 +26,34 @@ def test_add_argument_copy_none():
     add_extend_run(ap)
     cmd = ap.parse_args([])
     assert cmd.extend_run is None
+
+
+class Step:
+    """Workflow step stand-in."""
+
+    def __init__(self, error=None):
+        self.error = error
+
+    def execute(self):
+        if self.error:
+            raise self.error
+
+
+@pytest.mark.parametrize("error", [None, RuntimeError])
+def test_extend_run_removes_structure_store(error, monkeypatch, tmp_path):
+    """Test the structure store is removed when the extended run ends."""
+    monkeypatch.chdir(tmp_path)
+    store_dir = Path(tmp_path, "cache", "structures")
+    store_dir.mkdir(parents=True)
+
+    workflow = WorkflowManagerExtend.__new__(WorkflowManagerExtend)
+    workflow.recipe = argparse.Namespace(steps=[Step(error)])
+    workflow.general_params = {}
+    workflow._terminated = 0
+    if error:
+        with pytest.raises(error):
+            workflow.run()
+    else:
+        workflow.run()
+
+    assert not store_dir.exists()
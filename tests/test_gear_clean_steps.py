@@ -4,6 +4,7 @@ from pathlib import Path
 
 from haddock.gear.clean_steps import (
     clean_output,
+    scan_folder,
     unpack_compressed_and_archived_files,
     update_unpacked_names,
     )
@@ -264,3 +265,19 @@ def test_update_unpacked_names():
     new = ['run_dir/0_topoaa', '1_flexref', 'run_dir/2_seletopclusts']
     update_unpacked_names(prev, new, original)
     assert original == ['0_topoaa', Path('1_flexref'), '2_seletopclusts']
+
+
+def test_scan_folder(tmp_path):
+    """Test listing the files of a folder by extension."""
+    for name in ("m_10.pdb", "m_2.pdb", "m_1.inp.gz", "m_1.inp", ".h.pdb"):
+        Path(tmp_path, name).touch()
+    Path(tmp_path, "dir.pdb").mkdir()
+
+    found = scan_folder(tmp_path, (".pdb", ".inp", ".inp.gz", ".con"))
+
+    assert found == {
+        ".pdb": [Path(tmp_path, "m_2.pdb"), Path(tmp_path, "m_10.pdb")],
+        ".inp": [Path(tmp_path, "m_1.inp")],
+        ".inp.gz": [Path(tmp_path, "m_1.inp.gz")],
+        ".con": [],
+        }
@@ -1,5 +1,11 @@
 """Test HaddockModel gear."""
-from haddock.gear.haddockmodel import HaddockModel
+from pathlib import Path
+
+from haddock.gear.haddockmodel import (
+    HaddockModel,
+    collect_energies,
+    read_energies,
+    )
 
 from tests.test_module_caprieval import (
     protprot_input_list,
@@ -59,3 +65,32 @@ def test_haddockmodel_score(protprot_input_list):
     weights["w_bsa"] = -0.01
 
     assert haddock_mod.calc_haddock_score(**weights) == -13.38146
+
+
+def test_read_energies_header_only(protprot_input_list, tmp_path):
+    """Test energies are only read from the header."""
+    pdb_f = protprot_input_list[0].rel_path
+    energies = read_energies(pdb_f)
+    assert energies == HaddockModel(pdb_f).energies
+
+    # REMARKs after the coordinates are not part of the header
+    shifted = Path(tmp_path, "shifted.pdb")
+    lines = Path(pdb_f).read_text().splitlines(keepends=True)
+    header = [line for line in lines if line.startswith("REMARK")]
+    body = [line for line in lines if not line.startswith("REMARK")]
+    shifted.write_text("".join(body + header))
+    assert read_energies(shifted) == {}
+
+
+def test_haddockmodel_given_energies(protprot_input_list):
+    """Test a model with energies read beforehand."""
+    pdb_f = protprot_input_list[0].rel_path
+    energies = collect_energies([
+        None,
+        {"other.pdb": {"vdw": 1.0}},
+        {str(pdb_f): {"vdw": 2.0, "elec": -1.0}},
+        ])
+    assert list(energies) == ["other.pdb", str(pdb_f)]
+
+    haddock_mod = HaddockModel(pdb_f, energies=energies[str(pdb_f)])
+    assert haddock_mod.calc_haddock_score(w_vdw=1.0, w_elec=0.5) == 1.5
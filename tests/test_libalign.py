@@ -1,5 +1,6 @@
 """Test the libalign library."""
 import os
+import pickle
 import tempfile
 from pathlib import Path
 
@@ -11,13 +12,20 @@ from haddock.libs.libalign import (
     align_seq,
     calc_rmsd,
     centroid,
+    clear_pdb_cache,
     dump_as_izone,
     get_align,
     get_atoms,
+    get_seq_signature,
     kabsch,
     load_coords,
     make_range,
+    StructureStore,
+    _parse_pdb,
+    parse_pdb,
     pdb2fastadic,
+    remove_structure_store,
+    shared_structure_store,
     )
 
 from . import golden_data
@@ -193,6 +201,130 @@ def test_error_load_coords():
         load_coords(pdb_f, atoms, filter_resdic)
 
 
+def test_parse_pdb():
+    """Test the cached parsing of PDB files."""
+    clear_pdb_cache()
+    pdb_f = Path(golden_data, "protprot_complex_1.pdb")
+    structure = parse_pdb(pdb_f)
+
+    atom_lines = [
+        line for line in pdb_f.read_text().splitlines()
+        if line.startswith(("ATOM", "HETATM"))
+        ]
+    assert len(structure) == len(atom_lines)
+    assert structure.coords.shape == (len(atom_lines), 3)
+    assert structure.chains[0] == atom_lines[0][21]
+    assert structure.resnums[0] == int(atom_lines[0][22:26])
+    assert structure.atom_names[0] == atom_lines[0][12:16].strip()
+    assert structure.coords[0, 0] == float(atom_lines[0][30:38])
+
+    # the same file is served from the cache
+    assert parse_pdb(str(pdb_f)) is structure
+
+
+def test_parse_pdb_modified(tmp_path):
+    """Test a modified PDB file is parsed again."""
+    pdb_f = Path(tmp_path, "model.pdb")
+    lines = Path(golden_data, "protprot_complex_1.pdb").read_text()
+    pdb_f.write_text(lines)
+    structure = parse_pdb(pdb_f)
+
+    pdb_f.write_text(lines.replace("ATOM  ", "HETATM", 1))
+    os.utime(pdb_f, ns=(0, 0))
+    new_structure = parse_pdb(pdb_f)
+
+    assert new_structure is not structure
+    assert new_structure.hetatm[0]
+    assert not structure.hetatm[0]
+
+
+def test_structure_store(tmp_path):
+    """Test storing parsed PDB files and reading them back."""
+    pdb_files = []
+    for n in (1, 2):
+        pdb_f = Path(tmp_path, f"model_{n}.pdb")
+        pdb_f.write_bytes(
+            Path(golden_data, f"protprot_complex_{n}.pdb").read_bytes()
+            )
+        pdb_files.append(pdb_f)
+
+    store = StructureStore(Path(tmp_path, "store"))
+    assert store.add(pdb_files, ncores=2) == 2
+    assert store.add(pdb_files) == 0
+    assert len(StructureStore(Path(tmp_path, "store"))) == 2
+
+    clear_pdb_cache()
+    with shared_structure_store(pdb_files, Path(tmp_path, "store")):
+        structures = [parse_pdb(pdb_f) for pdb_f in pdb_files]
+        atoms = get_atoms(pdb_files[0])
+        coord_dic, _ = load_coords(pdb_files[0], atoms)
+    # the files were read from the store, not parsed
+    assert _parse_pdb.cache_info().currsize == 0
+
+    for pdb_f, structure in zip(pdb_files, structures):
+        parsed = parse_pdb(pdb_f)
+        for name in (
+                "hetatm",
+                "chains",
+                "resnums",
+                "resnames",
+                "atom_names",
+                "elements",
+                "segids",
+                ):
+            np.testing.assert_array_equal(
+                getattr(structure, name),
+                getattr(parsed, name),
+                )
+        np.testing.assert_array_equal(structure.coords, parsed.coords)
+    parsed_dic, _ = load_coords(pdb_files[0], atoms)
+    assert list(coord_dic) == list(parsed_dic)
+    np.testing.assert_array_equal(
+        list(coord_dic.values()),
+        list(parsed_dic.values()),
+        )
+
+    # only the path is pickled, the chunks are opened again
+    new_store = pickle.loads(pickle.dumps(store))
+    assert not new_store._chunks
+    stat = os.stat(pdb_files[0])
+    np.testing.assert_array_equal(
+        new_store.get(str(pdb_files[0]), stat.st_mtime_ns, stat.st_size).coords,
+        structures[0].coords,
+        )
+
+    # changed files are parsed again, and their old chunk is removed
+    pdb_files[0].write_text(pdb_files[1].read_text())
+    assert store.add(pdb_files) == 1
+    assert len(list(Path(tmp_path, "store").glob("*.npy"))) == 2
+
+    # stores of the same folder keep the files added by each other
+    other = StructureStore(Path(tmp_path, "store"))
+    assert len(other) == 2
+    new_f = Path(tmp_path, "model_3.pdb")
+    new_f.write_text(pdb_files[1].read_text())
+    assert store.add([new_f]) == 1
+    new_f = Path(tmp_path, "model_4.pdb")
+    new_f.write_text(pdb_files[1].read_text())
+    assert other.add([new_f]) == 1
+    assert len(StructureStore(Path(tmp_path, "store"))) == 4
+
+
+def test_remove_structure_store(tmp_path):
+    """Test the structure store of a run is removed."""
+    store = StructureStore(Path(tmp_path, "cache", "structures"))
+    pdb_f = Path(tmp_path, "model_1.pdb")
+    pdb_f.write_bytes(
+        Path(golden_data, "protprot_complex_1.pdb").read_bytes()
+        )
+    store.add([pdb_f])
+    remove_structure_store(tmp_path)
+    assert not store.path.exists()
+    assert Path(tmp_path, "cache").exists()
+    # nothing to remove
+    remove_structure_store(tmp_path)
+
+
 def test_get_atoms():
     """Test the identification of atoms."""
     pdb_list = [
@@ -327,6 +459,29 @@ def test_get_atoms():
     assert observed_atom_dic == expected_atom_dic
 
 
+def test_get_seq_signature(tmp_path):
+    """Test the sequence signature of a structure."""
+    pdb_f = Path(golden_data, "protprot_complex_1.pdb")
+    signature = get_seq_signature(pdb_f)
+    assert [chain for chain, _ in signature] == list(pdb2fastadic(pdb_f))
+
+    # same sequence, different coordinates
+    assert get_seq_signature(
+        Path(golden_data, "protprot_complex_2.pdb")
+        ) == signature
+
+    # renumbering changes the signature
+    lines = pdb_f.read_text().splitlines(keepends=True)
+    renumbered = [
+        line[:22] + f"{int(line[22:26]) + 1:>4}" + line[26:]
+        if line.startswith("ATOM") else line
+        for line in lines
+        ]
+    renumbered_f = Path(tmp_path, "renumbered.pdb")
+    renumbered_f.write_text("".join(renumbered))
+    assert get_seq_signature(renumbered_f) != signature
+
+
 def test_pdb2fastadic():
     """Test the generation of the fastadic."""
     protein_f = Path(golden_data, "protein.pdb")
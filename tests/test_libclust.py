@@ -2,9 +2,19 @@
 import os
 from pathlib import Path
 
+import numpy as np
 import pytest
 
-from haddock.libs.libclust import write_structure_list
+from haddock.libs.libclust import (
+    create_matrix_file,
+    fill_matrix_from_cache,
+    get_cache_file,
+    load_model_cache,
+    open_matrix_file,
+    save_matrix_cache,
+    save_model_cache,
+    write_structure_list,
+    )
 from haddock.libs.libontology import PDBFile
 
 from . import golden_data
@@ -43,3 +53,56 @@ def test_write_structure_list(protprot_input_models):
         )
     assert observed_file_content == expected_file_content
     os.unlink(cl_fname)
+
+
+def test_matrix_file(tmp_path):
+    """Test the binary condensed matrix file."""
+    fname = Path(tmp_path, "matrix.npy")
+    create_matrix_file(fname, 6)
+
+    matrix = open_matrix_file(fname)
+    assert matrix.shape == (6,)
+    assert np.isnan(matrix).all()
+
+    matrix = open_matrix_file(fname, mode="r+")
+    matrix[2:4] = [1.5, 2.5]
+    matrix.flush()
+    del matrix
+
+    matrix = open_matrix_file(fname)
+    assert np.isnan(matrix).sum() == 4
+    assert list(matrix[2:4]) == [1.5, 2.5]
+
+
+def test_matrix_cache(tmp_path):
+    """Test reusing cached distances for a new set of models."""
+    cache_f = get_cache_file("rmsdmatrix", {"A": [1, 2]}, cache_dir=tmp_path)
+    assert cache_f != get_cache_file("rmsdmatrix", {}, cache_dir=tmp_path)
+    # pairs (a, b), (a, c), (b, c)
+    save_matrix_cache(cache_f, ["a", "b", "c"], [1.0, 2.0, 3.0])
+
+    # pairs (c, d), (c, a), (c, b), (d, a), (d, b), (a, b)
+    matrix = np.full(6, np.nan)
+    nfilled = fill_matrix_from_cache(cache_f, ["c", "d", "a", "b"], matrix)
+    assert nfilled == 3
+    np.testing.assert_array_equal(
+        matrix,
+        [np.nan, 2.0, 3.0, np.nan, np.nan, 1.0],
+        )
+
+    # models with the same key are never taken from the cache
+    matrix = np.full(3, np.nan)
+    assert fill_matrix_from_cache(cache_f, ["a", "a", "b"], matrix) == 2
+    assert np.isnan(matrix[0])
+
+    missing_f = Path(tmp_path, "missing.npz")
+    assert fill_matrix_from_cache(missing_f, ["a", "b"], matrix) == 0
+
+
+def test_model_cache(tmp_path):
+    """Test caching values per model key."""
+    cache_f = Path(tmp_path, "cache", "contacts.pkl")
+    assert load_model_cache(cache_f) == {}
+    save_model_cache(cache_f, {"a": {("A", 1, "B", 2)}})
+    assert load_model_cache(cache_f) == {"a": {("A", 1, "B", 2)}}
+    assert os.listdir(cache_f.parent) == [cache_f.name]
@@ -6,6 +6,9 @@ import pytest
 
 from haddock import EmptyPath
 from haddock.libs import libcns
+from haddock.libs.libontology import PDBFile, Persistent
+
+from . import golden_data
 
 
 @pytest.mark.parametrize(
@@ -83,3 +86,44 @@ def test_load_workflow_params():
         )
 
     assert result == expected
+
+
+def test_cns_input_template(monkeypatch, tmp_path):
+    """Test the CNS input template of a step."""
+    monkeypatch.chdir(tmp_path)
+    pdb = PDBFile(Path(golden_data, "protein.pdb"), path=golden_data)
+    pdb.topology = Persistent(
+        Path(golden_data, "protein.psf"),
+        "topology",
+        path=golden_data,
+        )
+    params = {"w_vdw": 1.0, "mode": "local"}
+
+    calls = []
+    identify_chainseg = libcns.libpdb.identify_chainseg
+
+    def count_calls(pdb_f, sort=True):
+        calls.append(pdb_f)
+        return identify_chainseg(pdb_f, sort=sort)
+
+    monkeypatch.setattr(libcns.libpdb, "identify_chainseg", count_calls)
+
+    template = libcns.CNSInputTemplate(
+        "stop", params, "emref", native_segid=True
+        )
+    for i in range(1, 4):
+        template.render(i, pdb, ambig_fname="ambig.tbl")
+    # once sorted and once unsorted
+    assert len(calls) == 2
+
+    # the same input as prepared from scratch
+    libcns.RND.random.seed(1)
+    observed = template.render(1, pdb, ambig_fname="ambig.tbl").read_text()
+    libcns.RND.random.seed(1)
+    expected = libcns.prepare_cns_input(
+        1, pdb, ".", "stop", params, "emref",
+        ambig_fname="ambig.tbl", native_segid=True,
+        ).read_text()
+    assert observed == expected
+    assert 'eval ($ambig_fname="ambig.tbl")' in observed
+    assert 'eval ($output_pdb_filename="emref_1.pdb")' in observed
@@ -0,0 +1,144 @@
+"""Test the HPC library."""
+from haddock.libs import libhpc
+from haddock.libs.libhpc import get_jobs_status, parse_job_states
+
+
+class CompletedProcess:
+    """Output of a subprocess."""
+
+    def __init__(self, stdout, returncode=0):
+        self.stdout = stdout.encode("utf-8")
+        self.stderr = b""
+        self.returncode = returncode
+
+
+def test_parse_job_states():
+    output = (
+        "101 RUNNING\n"
+        "102 PENDING\n"
+        "103|COMPLETED\n"
+        "103.batch|COMPLETED\n"
+        "104|CANCELLED by 42\n"
+        "105 UNKNOWN_STATE\n"
+        "106 CONFIGURING\n"
+        "107|REQUEUED\n"
+        )
+    assert parse_job_states(output) == {
+        101: "running",
+        102: "submitted",
+        103: "finished",
+        104: "failed",
+        # jobs in other states are still alive
+        105: "running",
+        106: "running",
+        107: "submitted",
+        }
+
+
+def test_get_jobs_status(monkeypatch):
+    calls = []
+
+    def run(cmd, capture_output):
+        calls.append(cmd[0])
+        if cmd[0] == "squeue":
+            return CompletedProcess("1 RUNNING\n")
+        if cmd[0] == "sacct":
+            return CompletedProcess("2|FAILED\n")
+        return CompletedProcess(
+            "JobId=3 JobName=job_3 JobState=COMPLETED Reason=None\n"
+            )
+
+    monkeypatch.setattr(libhpc.subprocess, "run", run)
+    assert get_jobs_status([1, 2, 3, 4]) == {
+        1: "running",
+        2: "failed",
+        3: "finished",
+        4: "unknown",
+        }
+    # one query for the queue and one per fallback for the others
+    assert calls == ["squeue", "sacct", "scontrol"]
+
+
+def test_get_jobs_status_failed_query(monkeypatch):
+    """Test jobs are not considered finished when squeue fails."""
+    def run(cmd, capture_output):
+        if cmd[0] == "squeue":
+            return CompletedProcess("", returncode=1)
+        return CompletedProcess("")
+
+    monkeypatch.setattr(libhpc.subprocess, "run", run)
+    assert get_jobs_status([1, 2]) == {1: "unknown", 2: "unknown"}
+
+
+class Task:
+    """CNS job stand-in."""
+
+    def __init__(self, moddir):
+        self.envvars = {
+            "MODDIR": str(moddir),
+            "TOPPAR": "toppar",
+            "MODULE": "module",
+            }
+
+
+def test_hpcscheduler_sliding_window(monkeypatch, tmp_path):
+    """Test jobs are submitted as soon as others finish."""
+    in_queue = set()
+    max_in_queue = []
+
+    def submit(worker):
+        worker.job_id = worker.job_num
+        in_queue.add(worker.job_id)
+        max_in_queue.append(len(in_queue))
+
+    def status(job_ids):
+        # the oldest job finishes at each poll
+        first = min(job_ids)
+        in_queue.discard(first)
+        return {
+            job_id: "finished" if job_id == first else "running"
+            for job_id in job_ids
+            }
+
+    monkeypatch.setattr(libhpc.HPCWorker, "run", submit)
+    monkeypatch.setattr(libhpc, "get_jobs_status", status)
+
+    scheduler = libhpc.HPCScheduler(
+        [Task(tmp_path) for _ in range(7)],
+        queue_limit=3,
+        sliding_window=True,
+        poll_interval=0,
+        )
+    scheduler.run()
+
+    assert not in_queue
+    assert max(max_in_queue) == 3
+    assert all(w.job_status == "finished" for w in scheduler.worker_list)
+
+
+def test_hpcscheduler_sliding_window_unknown(monkeypatch, tmp_path):
+    """Test jobs of unknown status are kept in the queue."""
+    polls = []
+
+    def submit(worker):
+        worker.job_id = worker.job_num
+
+    def status(job_ids):
+        polls.append(list(job_ids))
+        if len(polls) < 3:
+            return {job_id: "unknown" for job_id in job_ids}
+        return {job_id: "finished" for job_id in job_ids}
+
+    monkeypatch.setattr(libhpc.HPCWorker, "run", submit)
+    monkeypatch.setattr(libhpc, "get_jobs_status", status)
+
+    scheduler = libhpc.HPCScheduler(
+        [Task(tmp_path) for _ in range(2)],
+        queue_limit=2,
+        sliding_window=True,
+        poll_interval=0,
+        )
+    scheduler.run()
+
+    assert len(polls) == 3
+    assert all(w.job_status == "finished" for w in scheduler.worker_list)
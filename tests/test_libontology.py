@@ -0,0 +1,116 @@
+"""Test the ontology library."""
+import json
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from haddock.libs.libontology import (
+    IO_REGISTRY_FORMAT,
+    Format,
+    ModuleIO,
+    PDBFile,
+    Persistent,
+    TopologyFile,
+    )
+
+from . import golden_data
+
+
+def _attributes(value):
+    """Give a comparable representation of the ModuleIO content."""
+    if isinstance(value, (list, tuple)):
+        return type(value), [_attributes(v) for v in value]
+    elif isinstance(value, dict):
+        return {k: _attributes(v) for k, v in value.items()}
+    elif isinstance(value, Persistent):
+        # slotted, its attributes are not in `__dict__`
+        return type(value), _attributes(value.__getstate__())
+    elif hasattr(value, "__dict__"):
+        return type(value), _attributes(vars(value))
+    return repr(value)
+
+
+@pytest.fixture
+def models():
+    """Provide models sharing their topologies."""
+    topologies = [TopologyFile("a.psf"), TopologyFile("b.psf")]
+    models = []
+    for i in range(1, 4):
+        model = PDBFile(
+            f"rigidbody_{i}.pdb",
+            topology=topologies,
+            score=-1.5 * i,
+            restr_fname=Path("..", "data", "ambig.tbl"),
+            unw_energies={"vdw": float(i), "elec": -2.0},
+            )
+        model.ori_name = f"model_{i}.pdb"
+        model.clt_id = np.int64(i)
+        models.append(model)
+    models[0].score = float("nan")
+    return models
+
+
+@pytest.mark.parametrize("fname", ["io_rigid.json", "io_flexref.json"])
+def test_load_legacy_io(fname, tmp_path):
+    """Test reading jsonpickle io.json files and converting them."""
+    io = ModuleIO()
+    io.load(Path(golden_data, fname))
+    assert io.output[0].file_type == Format.PDB
+
+    saved = io.save(tmp_path)
+    assert json.loads(saved.read_text())["format"] == IO_REGISTRY_FORMAT
+    assert saved.stat().st_size < Path(golden_data, fname).stat().st_size
+
+    new_io = ModuleIO()
+    new_io.load(saved)
+    assert _attributes(new_io.output) == _attributes(io.output)
+    assert _attributes(new_io.input) == _attributes(io.input)
+
+
+def test_module_io_roundtrip(models, tmp_path):
+    """Test saving and loading the columnar io.json."""
+    io = ModuleIO()
+    io.add(models, "i")
+    io.add(models[1:], "o")
+    io.add({0: models[0], 1: (models[1], "a")}, "o")
+    io.save(tmp_path)
+
+    new_io = ModuleIO()
+    new_io.load(Path(tmp_path, "io.json"))
+    # only accessed attributes are decoded
+    assert set(new_io._pending) == {"input", "output"}
+    output = new_io.output
+    assert set(new_io._pending) == {"input"}
+
+    assert _attributes(output) == _attributes(io.output)
+    assert _attributes(new_io.input) == _attributes(io.input)
+    assert np.isnan(new_io.input[0].score)
+    assert isinstance(output[0].restr_fname, Path)
+    assert output[0].clt_id == np.int64(2)
+    # shared objects are stored and loaded once
+    assert output[0] is new_io.input[1]
+    assert output[-1][0] is new_io.input[0]
+    assert output[0].topology[0] is output[1].topology[0]
+
+
+def test_pdbfile_attributes(monkeypatch, tmp_path):
+    """Test the public attributes of the slotted PDBFile."""
+    monkeypatch.chdir(tmp_path)
+    model = PDBFile(Path("models", "emref_1.pdb"), path="step", score=-2.0)
+    assert not model.__dict__
+    assert model.file_name == "emref_1.pdb"
+    assert model.path == str(Path(tmp_path, "step").resolve())
+    assert model.full_name == str(Path("step", "emref_1.pdb"))
+    assert model.rel_path == Path("..", "step", "models", "emref_1.pdb")
+    assert model.len == model.score == -2.0
+
+    # attributes not declared in the slots are still accepted
+    model.seed = 917
+    model.rel_path = Path("..", "other", "emref_1.pdb")
+
+    new_model = pickle.loads(pickle.dumps(model))
+    assert new_model.seed == 917
+    assert new_model.rel_path == Path("..", "other", "emref_1.pdb")
+    assert new_model.__getstate__() == model.__getstate__()
@@ -0,0 +1,130 @@
+"""Test libparallel."""
+import os
+from pathlib import Path
+
+import pytest
+
+from haddock.libs.libparallel import (
+    Scheduler,
+    WorkerPool,
+    get_active_pool,
+    get_shared_data,
+    share_data,
+    split_tasks,
+    unshare_data,
+    )
+
+
+class Task:
+    """Task writing its own output file."""
+
+    def __init__(self, output, fail=False):
+        self.output = Path(output)
+        self.fail = fail
+
+    def run(self):
+        if self.fail:
+            raise ValueError("failing task")
+        self.output.write_text(self.output.name)
+        return self.output.name
+
+
+class PidTask:
+    """Task returning the worker pid and some shared data."""
+
+    output = Path("pid")
+
+    def run(self):
+        return os.getpid(), get_shared_data("value"), os.getcwd()
+
+
+def test_split_tasks():
+    chunks = list(split_tasks(list(range(10)), 3))
+    assert chunks == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+@pytest.mark.parametrize(
+    "dynamic,chunksize",
+    [
+        (True, 1),
+        (True, 3),
+        (False, 1),
+        ]
+    )
+def test_scheduler_run(tmp_path, dynamic, chunksize):
+    tasks = [Task(Path(tmp_path, f"out_{i}.txt")) for i in range(10)]
+    scheduler = Scheduler(
+        tasks,
+        ncores=2,
+        dynamic=dynamic,
+        chunksize=chunksize,
+        )
+    scheduler.run()
+    for task in tasks:
+        assert task.output.read_text() == task.output.name
+
+
+def test_scheduler_dynamic_failing_task(tmp_path):
+    tasks = [
+        Task(Path(tmp_path, f"out_{i}.txt"), fail=i == 3)
+        for i in range(6)
+        ]
+    Scheduler(tasks, ncores=2).run()
+    for i, task in enumerate(tasks):
+        assert task.output.exists() == (i != 3)
+
+
+def test_scheduler_return_results(tmp_path):
+    tasks = [
+        Task(Path(tmp_path, f"out_{i}.txt"), fail=i == 3)
+        for i in range(9)
+        ]
+    scheduler = Scheduler(
+        tasks,
+        ncores=2,
+        chunksize=None,
+        return_results=True,
+        )
+    scheduler.run()
+    expected = [None if i == 3 else f"out_{i}.txt" for i in range(9)]
+    assert scheduler.results == expected
+
+
+def test_scheduler_return_results_static():
+    with pytest.raises(ValueError):
+        Scheduler([], ncores=1, dynamic=False, return_results=True)
+
+
+def test_worker_pool(tmp_path, monkeypatch):
+    share_data("value", 1)
+    with WorkerPool(ncores=2) as pool:
+        assert get_active_pool() is pool
+        pool_pids = {w.pid for w in pool.worker_list}
+
+        scheduler = Scheduler(
+            [PidTask() for _ in range(6)],
+            return_results=True,
+            )
+        scheduler.run()
+        assert {r[0] for r in scheduler.results} <= pool_pids
+        assert {r[1] for r in scheduler.results} == {1}
+
+        # a second step reuses the same workers and follows the cwd
+        share_data("value", 2)
+        monkeypatch.chdir(tmp_path)
+        scheduler = Scheduler(
+            [PidTask() for _ in range(6)],
+            return_results=True,
+            )
+        scheduler.run()
+        assert {r[0] for r in scheduler.results} <= pool_pids
+        assert {r[1] for r in scheduler.results} == {2}
+        assert {r[2] for r in scheduler.results} == {str(tmp_path)}
+
+        tasks = [Task(Path(tmp_path, f"out_{i}.txt")) for i in range(4)]
+        Scheduler(tasks, ncores=1).run()
+        assert all(task.output.exists() for task in tasks)
+
+    unshare_data("value")
+    assert get_active_pool() is None
+    assert not any(w.is_alive() for w in pool.worker_list)
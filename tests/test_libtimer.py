@@ -1,7 +1,33 @@
 """Test libtimer."""
+import json
+from pathlib import Path
+
 import pytest
 
-from haddock.libs.libtimer import convert_seconds_to_min_sec, log_time
+from haddock.libs.libparallel import Scheduler, WorkerPool
+from haddock.libs.libtimer import (
+    TIMINGS_FNAME,
+    Telemetry,
+    convert_seconds_to_min_sec,
+    get_active_telemetry,
+    log_time,
+    record_phase,
+    write_run_summary,
+    )
+
+
+class Task:
+    """Task reporting the time of its own phases."""
+
+    def __init__(self, output, fail=False):
+        self.output = Path(output)
+        self.fail = fail
+
+    def run(self):
+        if self.fail:
+            raise ValueError("failing task")
+        self.timings = {"write": 0.5}
+        self.output.write_text(self.output.name)
 
 
 def test_logtime():
@@ -29,3 +55,59 @@ def test_convert_seconds(seconds, expected):
     """Convert seconds to min&sec."""
     result = convert_seconds_to_min_sec(seconds)
     assert result == expected
+
+
+@pytest.mark.parametrize("persistent", [False, True])
+def test_telemetry(persistent, tmp_path):
+    """Test recording the phases and tasks of a step."""
+    tasks = [
+        Task(Path(tmp_path, f"out_{i}.txt"), fail=i == 2)
+        for i in range(4)
+        ]
+    with Telemetry("1_rigidbody") as telemetry:
+        assert get_active_telemetry() is telemetry
+        with record_phase("io"):
+            Path(tmp_path, "io.json").write_text("{}")
+        if persistent:
+            with WorkerPool(ncores=2):
+                Scheduler(tasks, ncores=2).run()
+        else:
+            Scheduler(tasks, ncores=2).run()
+    assert get_active_telemetry() is None
+
+    step_dir = Path(tmp_path, "1_rigidbody")
+    step_dir.mkdir()
+    telemetry.save(Path(step_dir, TIMINGS_FNAME))
+    content = json.loads(Path(step_dir, TIMINGS_FNAME).read_text())
+
+    assert [p["name"] for p in content["phases"]] == [
+        "io", "execution", "step"]
+    assert len(content["tasks"]) == 4
+    assert sorted(t["task"] for t in content["tasks"]) == sorted(
+        f"{tmp_path.name}/out_{i}.txt" for i in range(4)
+        )
+    failed = f"{tmp_path.name}/out_2.txt"
+    for task in content["tasks"]:
+        assert task["success"] == (task["task"] != failed)
+        assert task["wall"] >= 0 and task["cpu"] >= 0
+        if task["success"]:
+            assert task["phases"] == {"write": 0.5}
+
+    summary = content["summary"]
+    assert summary["tasks"]["count"] == 4
+    assert summary["tasks"]["failed"] == 1
+    assert summary["max_rss"] > 0
+    assert set(summary["breakdown"]) == {
+        "preparation", "execution", "post_execution"}
+    assert 1 <= len(summary["workers"]) <= 2
+
+    # steps without telemetry are skipped
+    Path(tmp_path, "2_flexref").mkdir()
+    run_f = write_run_summary(
+        [step_dir, Path(tmp_path, "2_flexref")],
+        fname=Path(tmp_path, TIMINGS_FNAME),
+        )
+    run_summary = json.loads(run_f.read_text())
+    assert [s["name"] for s in run_summary["steps"]] == ["1_rigidbody"]
+    assert run_summary["wall"] == summary["phases"]["step"]["wall"]
+    assert write_run_summary([], fname=Path(tmp_path, "none.json")) is None
@@ -6,14 +6,20 @@ from pathlib import Path
 
 import numpy as np
 import pytest
+from scipy.spatial.distance import cdist
 
+from haddock.libs.libalign import get_atoms, load_coords
 from haddock.libs.libontology import PDBFile
+from haddock.modules.analysis.caprieval import capri
 from haddock.modules.analysis.caprieval.capri import (
     CAPRI,
+    ReferenceProfile,
     calc_stats,
     capri_cluster_analysis,
     load_contacts,
+    merge_records,
     rearrange_ss_capri_output,
+    write_ss_capri_output,
     )
 
 from . import golden_data
@@ -334,6 +340,98 @@ def test_make_output(protprot_caprimodule):
     os.unlink(ss_fname)
 
 
+def test_run_returns_record(protprot_caprimodule):
+    """Test the CAPRI record returned by the run."""
+    protprot_caprimodule.params.update({
+        "alignment_method": "sequence",
+        "lovoalign_exec": None,
+        "fnat": True,
+        "fnat_cutoff": 5.0,
+        "irmsd": True,
+        "irmsd_cutoff": 10.0,
+        "lrmsd": False,
+        "ilrmsd": False,
+        "dockq": False,
+        })
+    record = protprot_caprimodule.run()
+
+    ss_fname = Path(
+        protprot_caprimodule.path,
+        f"capri_ss_{protprot_caprimodule.identificator}.tsv"
+        )
+    assert not ss_fname.exists()
+
+    assert record["model"] == str(protprot_caprimodule.model.rel_path)
+    assert record["md5"] == "-"
+    assert record["caprieval_rank"] == "-"
+    assert record["cluster-id"] == "-"
+    # values are rounded as in the .tsv file
+    assert record["irmsd"] == round(protprot_caprimodule.irmsd, 3)
+    assert record["fnat"] == round(protprot_caprimodule.fnat, 3)
+
+
+def test_merge_records(protprot_caprimodule):
+    """Test loading the CAPRI records back into the jobs."""
+    record = {
+        "model": "model.pdb",
+        "irmsd": 1.0,
+        "fnat": 0.5,
+        "lrmsd": 2.0,
+        "ilrmsd": 3.0,
+        "dockq": 0.7,
+        }
+    observed = merge_records(
+        [protprot_caprimodule, protprot_caprimodule],
+        [None, record],
+        )
+    assert observed == [record]
+    assert protprot_caprimodule.irmsd == 1.0
+    assert protprot_caprimodule.fnat == 0.5
+    assert protprot_caprimodule.lrmsd == 2.0
+    assert protprot_caprimodule.ilrmsd == 3.0
+    assert protprot_caprimodule.dockq == 0.7
+
+
+def test_write_ss_capri_output(tmp_path):
+    """Test writing the CAPRI records in a single file."""
+    records = [
+        {"model": f"model_{i}.pdb", "caprieval_rank": "-", "score": score,
+         "irmsd": irmsd}
+        for i, (score, irmsd) in enumerate([(-10.0, 2.0), (-20.0, 1.0),
+                                            (-5.0, 3.0)])
+        ]
+    write_ss_capri_output(
+        records,
+        "capri_ss.tsv",
+        sort_key="irmsd",
+        sort_ascending=False,
+        path=tmp_path,
+        )
+    observed = Path(tmp_path, "capri_ss.tsv").read_text().splitlines()
+    expected = [
+        "model\tcaprieval_rank\tscore\tirmsd",
+        "model_2.pdb\t3\t-5.000\t3.000",
+        "model_0.pdb\t2\t-10.000\t2.000",
+        "model_1.pdb\t1\t-20.000\t1.000",
+        ]
+    assert observed == expected
+
+
+def test_write_ss_capri_output_no_records(monkeypatch, tmp_path):
+    """Test a warning is logged when no model was evaluated."""
+    warnings = []
+    monkeypatch.setattr(capri.log, "warning", warnings.append)
+    write_ss_capri_output(
+        [],
+        "capri_ss.tsv",
+        sort_key="irmsd",
+        sort_ascending=False,
+        path=tmp_path,
+        )
+    assert not Path(tmp_path, "capri_ss.tsv").exists()
+    assert len(warnings) == 1
+
+
 def test_identify_protprotinterface(protprot_caprimodule, protprot_input_list):
     """Test the interface identification."""
     protprot_complex = protprot_input_list[0]
@@ -432,6 +530,78 @@ def test_load_contacts(protprot_input_list):
     assert observed_con_set == expected_con_set
 
 
+@pytest.mark.parametrize("cutoff", [3.9, 5.0, 10.0])
+def test_load_contacts_all_against_all(protdna_input_list, cutoff):
+    """Test contacts match an all-against-all distance calculation."""
+    pdb_f = protdna_input_list[0]
+    atoms = get_atoms(pdb_f, full=True)
+    coord_dic, _ = load_coords(pdb_f, atoms)
+    keys = list(coord_dic.keys())
+    coords = np.array(list(coord_dic.values()))
+    dist = cdist(coords, coords)
+    expected_con_set = set()
+    for i, j in zip(*np.where(dist < cutoff)):
+        if keys[i][0] < keys[j][0]:
+            expected_con_set.add(
+                (keys[i][0], keys[i][1], keys[j][0], keys[j][1])
+                )
+
+    observed_con_set = load_contacts(pdb_f, cutoff=cutoff)
+
+    assert observed_con_set == expected_con_set
+
+
+def test_reference_profile(protprot_input_list, params):
+    """Test the reference data is computed once and shared."""
+    reference = protprot_input_list[0].rel_path
+    atoms = get_atoms(reference)
+    profile = ReferenceProfile(reference, atoms)
+    profile.precompute({
+        "fnat": True,
+        "fnat_cutoff": 5.0,
+        "irmsd": True,
+        "ilrmsd": True,
+        "irmsd_cutoff": 10.0,
+        "lrmsd": True,
+        })
+
+    assert profile.contacts(5.0) == load_contacts(reference, cutoff=5.0)
+    assert profile.contacts(5.0) is profile.contacts(5.0)
+    assert profile.interface(10.0) == CAPRI.identify_interface(reference, 10.0)
+    assert profile.coords(atoms, 10.0) is profile.coords(atoms, 10.0)
+    expected_coords, _ = load_coords(reference, atoms)
+    assert profile.coords(atoms).keys() == expected_coords.keys()
+
+    capri = CAPRI(
+        identificator=42,
+        reference=reference,
+        model=protprot_input_list[1],
+        path=golden_data,
+        params=params,
+        reference_profile=profile,
+        )
+    assert capri.reference_profile is profile
+
+
+def test_reference_profile_alignment(protprot_input_list, tmp_path):
+    """Test sequence alignments are shared by models of the same topology."""
+    reference = protprot_input_list[0].rel_path
+    profile = ReferenceProfile(reference, get_atoms(reference))
+
+    first = profile.alignment(
+        protprot_input_list[0], "sequence", None, tmp_path
+        )
+    assert Path(tmp_path, "blosum62.izone").exists()
+    Path(tmp_path, "blosum62.izone").unlink()
+
+    second = profile.alignment(
+        protprot_input_list[1], "sequence", None, tmp_path
+        )
+    assert second is first
+    # the alignment files are not written again
+    assert not Path(tmp_path, "blosum62.izone").exists()
+
+
 def test_add_chain_from_segid(protprot_caprimodule):
     """Test replacing the chainID with segID."""
     tmp = tempfile.NamedTemporaryFile(delete=True)
@@ -2,11 +2,21 @@
 import os
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 from haddock.libs.libontology import ModuleIO, PDBFile
 from haddock.modules.analysis.clustfcc import DEFAULT_CONFIG as clustfcc_pars
 from haddock.modules.analysis.clustfcc import HaddockModule
+from haddock.modules.analysis.clustfcc.clustfcc import (
+    ContactJob,
+    get_atom_contacts,
+    get_contacts,
+    get_fingerprints,
+    get_neighbors,
+    get_rounding_threshold,
+    iter_fcc_chunks,
+    )
 
 from . import golden_data
 
@@ -47,6 +57,8 @@ def fcc_module():
 def test_clustfcc_output_existence(fcc_module, prot_input_list, output_list):
     """Test clustfcc output."""
     fcc_module.previous_io.output = prot_input_list
+    fcc_module.params["write_contacts"] = True
+    fcc_module.params["write_matrix"] = True
 
     fcc_module._run()
 
@@ -82,6 +94,83 @@ def test_contacts():
     assert observed_output_lengths == expected_output_length
 
 
+def test_get_contacts(prot_input_list, tmp_path):
+    """Test the in-memory contacts calculation."""
+    contacts = get_contacts(prot_input_list[0].rel_path, 5.0)
+    assert len(contacts) == 20
+    # residue 37 of the first segment with residue 52 of the second
+    assert 100371100522 in contacts
+
+    contact_f = Path(tmp_path, "protprot_complex_1.con")
+    job = ContactJob(Path(prot_input_list[0].rel_path), 5.0, contact_f)
+    assert job.run() == contacts
+    assert len(contact_f.read_text().splitlines()) == 100
+
+    # larger cutoffs give more contacts
+    assert contacts < get_contacts(prot_input_list[0].rel_path, 6.0)
+
+
+@pytest.mark.parametrize("model", [1, 2])
+def test_get_contacts_contact_fcc(model):
+    """Compare the contacts with the output of contact_fcc."""
+    pdb_f = Path(golden_data, f"protprot_complex_{model}.pdb")
+    con_f = Path(golden_data, f"protprot_complex_{model}.con")
+    expected = sorted(int(line) for line in con_f.read_text().splitlines())
+    assert sorted(get_atom_contacts(pdb_f, 5.0)) == expected
+
+
+def test_fcc_fingerprints():
+    """Test FCC values calculated from the contact fingerprints."""
+    contact_sets = [
+        {("A", 1, "B", 1), ("A", 2, "B", 1), ("A", 3, "B", 2)},
+        {("A", 1, "B", 1), ("A", 2, "B", 1)},
+        {("A", 9, "B", 9)},
+        set(),
+        ]
+    fingerprints = get_fingerprints(contact_sets)
+    assert fingerprints.shape == (4, 1)
+
+    fcc = np.concatenate([
+        chunk for _, chunk, _ in iter_fcc_chunks(fingerprints, chunk_size=3)
+        ])
+    assert fcc[0, 1] == pytest.approx(2 / 3)
+    assert fcc[1, 0] == 1.0
+    assert not fcc[2, :2].any()
+    assert not fcc[3].any()
+
+    neighbors = get_neighbors(fingerprints, cutoff=0.6, strictness=0.75)
+    assert [n.tolist() for n in neighbors] == [[1], [0], [], []]
+    # model 1 shares only 2/3 of its contacts with model 2
+    neighbors = get_neighbors(fingerprints, cutoff=0.7, strictness=0.75)
+    assert [n.tolist() for n in neighbors] == [[], [0], [], []]
+
+
+def test_fcc_neighbors_rounding():
+    """Test FCC values are rounded as in the text FCC matrix."""
+    # 119 of 200 contacts is written as 0.59 in the text matrix
+    contact_sets = [
+        set(range(200)),
+        set(range(119)) | set(range(1000, 1081)),
+        ]
+    fingerprints = get_fingerprints(contact_sets)
+    neighbors = get_neighbors(fingerprints, cutoff=0.6, strictness=0.75)
+    assert [n.tolist() for n in neighbors] == [[], []]
+    neighbors = get_neighbors(fingerprints, cutoff=0.59, strictness=0.75)
+    assert [n.tolist() for n in neighbors] == [[1], [0]]
+
+
+@pytest.mark.parametrize("cutoff", [0.6, 0.45, 0.605])
+def test_get_rounding_threshold(cutoff):
+    """Test the threshold matches the rounded text values."""
+    for decimals in (2, 3):
+        threshold = get_rounding_threshold(cutoff, decimals)
+        for n in range(1, 300):
+            for common in range(n + 1):
+                value = common * (1.0 / n)
+                text = float(f"{value:.{decimals}f}")
+                assert (text >= cutoff) == (value >= threshold)
+
+
 def remove_clustfcc_files(output_list):
     """Remove clustfcc files."""
     for f in output_list:
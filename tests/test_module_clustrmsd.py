@@ -7,11 +7,12 @@ import pytest
 
 from haddock.libs.libontology import ModuleIO, PDBFile, RMSDFile
 from haddock.modules.analysis.clustrmsd import DEFAULT_CONFIG as clustrmsd_pars
-from haddock.modules.analysis.clustrmsd import HaddockModule
+from haddock.modules.analysis.clustrmsd import HaddockModule, clustrmsd
 from haddock.modules.analysis.clustrmsd.clustrmsd import (
     apply_threshold,
     cond_index,
     get_cluster_center,
+    get_cluster_elements,
     get_clusters,
     get_dendrogram,
     iterate_threshold,
@@ -28,6 +29,7 @@ def output_list():
     """Clustfcc output list."""
     return [
         "rmsd.matrix",
+        "rmsd.npy",
         "rmsd_matrix.json",
         "cluster.out",
         "clustrmsd.txt",
@@ -155,6 +157,22 @@ def test_read_rmsd_matrix(correct_rmsd_vec):
     os.unlink(output_name)
 
 
+def test_read_binary_rmsd_matrix(correct_rmsd_vec):
+    """Check correct reading of a binary rmsd matrix."""
+    output_name = "fake_rmsd.npy"
+    json_name = "fake_rmsd.json"
+    np.save(output_name, np.array([el[2] for el in correct_rmsd_vec]))
+    save_rmsd_json(output_name, json_name, len(correct_rmsd_vec))
+
+    matrix_json = read_rmsd_json(json_name)
+    matrix = read_matrix(matrix_json.input[0])
+
+    np.testing.assert_allclose(matrix, [1.234, 5.678, 4.567])
+
+    os.unlink(json_name)
+    os.unlink(output_name)
+
+
 def test_read_matrix_input(correct_rmsd_vec):
     """Test wrong input to read_matrix."""
     rmsd_vec = correct_rmsd_vec
@@ -318,6 +336,27 @@ def test_get_cluster_center(correct_rmsd_array):
     assert obs_clt_center == exp_clt_center
 
 
+def test_get_cluster_center_batches(monkeypatch):
+    """Test get_cluster_center looking up the matrix in batches."""
+    n_obs = 30
+    rmsd_matrix = np.random.default_rng(42).random(n_obs * (n_obs - 1) // 2)
+    npw = np.arange(3, n_obs, 2)
+    exp_clt_center = get_cluster_center(npw, n_obs, rmsd_matrix)
+
+    monkeypatch.setattr(clustrmsd, "CENTER_BATCH_SIZE", 20)
+    assert get_cluster_center(npw, n_obs, rmsd_matrix) == exp_clt_center
+
+
+def test_get_cluster_elements():
+    """Test get_cluster_elements function."""
+    cluster_arr = np.array([2, 1, -1, 2, 1, 3, -1, 2])
+    obs_elements = get_cluster_elements(cluster_arr)
+    assert list(obs_elements) == [1, 2, 3]
+    assert obs_elements[1].tolist() == [1, 4]
+    assert obs_elements[2].tolist() == [0, 3, 7]
+    assert obs_elements[3].tolist() == [5]
+
+
 def test_cond_index():
     """Test cond_index function."""
     n_obs = 10
@@ -5,13 +5,24 @@ from pathlib import Path
 import numpy as np
 import pytest
 
+from haddock.libs.libalign import (
+    StructureStore,
+    calc_rmsd,
+    centroid,
+    get_atoms,
+    kabsch,
+    )
+from haddock.libs.libclust import create_matrix_file, save_matrix_cache
 from haddock.libs.libontology import PDBFile
 from haddock.modules.analysis.rmsdmatrix import DEFAULT_CONFIG as rmsd_pars
 from haddock.modules.analysis.rmsdmatrix import HaddockModule
 from haddock.modules.analysis.rmsdmatrix.rmsd import (
     RMSD,
     RMSDJob,
+    batch_rmsd,
     get_pair,
+    get_pairs,
+    load_coords_array,
     rmsd_dispatcher,
     )
 
@@ -93,22 +104,115 @@ def test_overall_rmsd(input_protdna_models):
 
     ls = os.listdir()
 
-    assert "rmsd.matrix" in ls
+    assert "rmsd.npy" in ls
+
+    assert "rmsd.matrix" not in ls
 
     assert "rmsd_matrix.json" in ls
 
+    # check correct rmsd matrix
+    rmsd_matrix = np.load("rmsd.npy")
+
+    np.testing.assert_allclose(rmsd_matrix, [2.257], atol=0.001)
+
+    os.unlink(Path("rmsd.npy"))
+    os.unlink(Path("rmsd_matrix.json"))
+    os.unlink(Path("io.json"))
+
+
+def test_overall_rmsd_text_matrix(input_protdna_models):
+    """Test the text export of the rmsd matrix."""
+    rmsd_module = HaddockModule(
+        order=2,
+        path=Path("2_rmsdmatrix"),
+        initial_params=rmsd_pars
+        )
+    rmsd_module.previous_io.output = input_protdna_models
+    rmsd_module.update_params(text_matrix=True)
+    rmsd_module._run()
+
     # check correct rmsd matrix
     rmsd_matrix = open("rmsd.matrix").read()
-    
+
     expected_rmsd_matrix = "1 2 2.257" + os.linesep
 
     assert rmsd_matrix == expected_rmsd_matrix
 
+    os.unlink(Path("rmsd.npy"))
     os.unlink(Path("rmsd.matrix"))
     os.unlink(Path("rmsd_matrix.json"))
     os.unlink(Path("io.json"))
 
 
+def test_overall_rmsd_incremental(input_protdna_models, monkeypatch, tmp_path):
+    """Test reusing the RMSD values of a previous execution."""
+    monkeypatch.chdir(tmp_path)
+    for n in (1, 2):
+        Path(tmp_path, f"model_{n}.pdb").write_bytes(
+            Path(golden_data, f"protdna_complex_{n}.pdb").read_bytes()
+            )
+    models = [
+        PDBFile(Path(tmp_path, f"model_{n}.pdb"), path=tmp_path)
+        for n in (1, 2)
+        ]
+    rmsd_module = HaddockModule(
+        order=2,
+        path=Path("2_rmsdmatrix"),
+        initial_params=rmsd_pars
+        )
+    rmsd_module.previous_io.output = models
+    rmsd_module.update_params(incremental=True)
+    rmsd_module._run()
+    cache_files = list(Path("..", "cache").iterdir())
+    assert len(cache_files) == 1
+    with np.load(cache_files[0]) as cache:
+        np.testing.assert_allclose(cache["matrix"], [2.257], atol=0.001)
+        keys = list(cache["keys"])
+    # mark the cached value to check it is reused
+    save_matrix_cache(cache_files[0], keys, [99.0])
+
+    # a new model, identical to the first one
+    Path(tmp_path, "model_3.pdb").write_bytes(models[0].rel_path.read_bytes())
+    models.insert(0, PDBFile(Path(tmp_path, "model_3.pdb"), path=tmp_path))
+    rmsd_module.previous_io.output = models
+    rmsd_module._run()
+
+    # pairs (3, 1), (3, 2) and (1, 2)
+    np.testing.assert_allclose(
+        np.load("rmsd.npy"),
+        [0.0, 99.0, 99.0],
+        atol=0.001,
+        )
+
+
+def test_overall_rmsd_structure_store(monkeypatch, tmp_path):
+    """Test reading the models from the structure store of the run."""
+    step = Path(tmp_path, "2_rmsdmatrix")
+    step.mkdir()
+    monkeypatch.chdir(step)
+    models = []
+    for n in (1, 2):
+        Path(tmp_path, f"model_{n}.pdb").write_bytes(
+            Path(golden_data, f"protdna_complex_{n}.pdb").read_bytes()
+            )
+        models.append(
+            PDBFile(Path(tmp_path, f"model_{n}.pdb"), path=tmp_path)
+            )
+    rmsd_module = HaddockModule(
+        order=2,
+        path=Path("2_rmsdmatrix"),
+        initial_params=rmsd_pars
+        )
+    rmsd_module.previous_io.output = models
+    rmsd_module.update_params(structure_store=True)
+    rmsd_module._run()
+
+    np.testing.assert_allclose(np.load("rmsd.npy"), [2.257], atol=0.001)
+    # the coordinates memory-mapped by the jobs are removed
+    assert not Path("coords.npy").exists()
+    assert len(StructureStore(Path(tmp_path, "cache", "structures"))) == 2
+
+
 def test_RMSD_class(input_protdna_models):
     """Test focusing on the RMSD class."""
     params = {}
@@ -174,3 +278,66 @@ def test_RMSDJob(input_protdna_models):
     assert job.rmsd_obj == rmsd_obj
 
     assert job.output == job_f
+
+
+def test_get_pairs():
+    """Test the vectorized enumeration of pairs."""
+    nmodels = 10
+    tot_npairs = nmodels * (nmodels - 1) // 2
+    for start in [0, 10, tot_npairs - 3]:
+        start_ref, start_mod = get_pair(nmodels, start)
+        ref_idx, mod_idx = get_pairs(nmodels, start_ref, start_mod, 3)
+        expected = [get_pair(nmodels, start + n) for n in range(3)]
+        assert list(zip(ref_idx, mod_idx)) == expected
+
+
+def test_batch_rmsd():
+    """Test batched RMSD against the per-pair kabsch superposition."""
+    rng = np.random.default_rng(42)
+    coords = rng.normal(size=(4, 30, 3)) * 10
+    # mirror image to check the reflection correction
+    coords[3] = coords[2] * [1, 1, -1]
+    mask = np.ones((4, 30), dtype=bool)
+    mask[1, :5] = False
+    ref_idx, mod_idx = get_pairs(4, 0, 1, 6)
+
+    observed = batch_rmsd(coords, mask, ref_idx, mod_idx)
+
+    for n, (ref, mod) in enumerate(zip(ref_idx, mod_idx)):
+        common = mask[ref] & mask[mod]
+        Q = coords[ref][common] - centroid(coords[ref][common])
+        P = coords[mod][common] - centroid(coords[mod][common])
+        P = np.dot(P, kabsch(P, Q))
+        assert np.isclose(observed[n], calc_rmsd(P, Q))
+
+
+def test_load_coords_array(input_protdna_models):
+    """Test parsing all models into a single array."""
+    atoms = {}
+    for model in input_protdna_models:
+        atoms.update(get_atoms(model))
+    coords, mask = load_coords_array(input_protdna_models, atoms)
+
+    assert coords.shape[0] == 2
+    assert coords.shape[2] == 3
+    assert mask.shape == coords.shape[:2]
+    assert mask.all()
+
+
+def test_RMSD_output_binary(input_protdna_models, tmp_path):
+    """Test writing the RMSD values to the binary matrix."""
+    create_matrix_file(Path(tmp_path, "rmsd.npy"), 1)
+    rmsd_obj = RMSD(
+        input_protdna_models,
+        core=0,
+        npairs=1,
+        start_ref=0,
+        start_mod=1,
+        output_name="rmsd.npy",
+        path=tmp_path,
+        )
+    rmsd_obj.run()
+    rmsd_obj.output()
+
+    observed = np.load(Path(tmp_path, "rmsd.npy"))
+    np.testing.assert_allclose(observed, [2.257], atol=0.001)
@@ -10,6 +10,10 @@ import pytest
 from haddock.gear.yaml2cfg import read_from_yaml_config
 from haddock.modules.topology.topoaa import DEFAULT_CONFIG as topoaa_params
 from haddock.modules.topology.topoaa import HaddockModule, generate_topology
+from haddock.modules.topology.topoaa.cache import (
+    TopologyCache,
+    get_topology_key,
+    )
 
 from . import golden_data
 
@@ -112,3 +116,49 @@ def test__run(topoaa, protein):
     assert out.exists()
     assert topology.exists()
     assert structure.exists()
+
+
+def test_topology_key(protein, tmp_path):
+    """Test the topology cache key depends on content and parameters."""
+    pdb_f = Path(tmp_path, "mol1_1.pdb")
+    shutil.copy(protein, pdb_f)
+    toppar = Path(tmp_path, "toppar")
+    toppar.mkdir()
+    Path(toppar, "protein.top").write_text("RESIdue ALA")
+    key = get_topology_key(pdb_f, {"autohis": True}, "recipe", toppar)
+
+    renamed = Path(tmp_path, "other.pdb")
+    shutil.copy(protein, renamed)
+    assert get_topology_key(renamed, {"autohis": True}, "recipe", toppar) == key
+    assert get_topology_key(pdb_f, {"autohis": False}, "recipe", toppar) != key
+    assert get_topology_key(pdb_f, {"autohis": True}, "other", toppar) != key
+
+    renamed.write_text("ATOM")
+    assert get_topology_key(renamed, {"autohis": True}, "recipe", toppar) != key
+
+
+def test_topology_cache(tmp_path):
+    """Test storing, fetching and pruning topologies."""
+    cache = TopologyCache(Path(tmp_path, "cache"), max_size=10**6)
+    pdb_f = Path(tmp_path, "mol1_1_haddock.pdb")
+    psf_f = Path(tmp_path, "mol1_1_haddock.psf")
+    pdb_f.write_text("ATOM")
+    psf_f.write_text("PSF")
+    key_1, key_2 = "a" * 64, "b" * 64
+
+    assert not cache.fetch(key_1, "new.pdb", "new.psf")
+    cache.store(key_1, pdb_f, psf_f)
+    cache.store(key_2, pdb_f, psf_f)
+    os.utime(Path(tmp_path, "cache", "aa", key_1), (0, 0))
+
+    new_pdb, new_psf = Path(tmp_path, "new.pdb"), Path(tmp_path, "new.psf")
+    assert cache.fetch(key_2, new_pdb, new_psf)
+    assert new_pdb.read_text() == "ATOM"
+    assert new_psf.read_text() == "PSF"
+
+    # the least recently used entry is removed first
+    cache.prune(max_size=7)
+    assert not cache.fetch(key_1, new_pdb, new_psf)
+    assert cache.fetch(key_2, new_pdb, new_psf)
+    cache.prune(max_size=0)
+    assert not cache.fetch(key_2, new_pdb, new_psf)